@@ -0,0 +1,244 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Benchmarks of the indicator pipeline on synthetic charts       #
+# Usage (from `src`): python -m benchmarks.run_benchmarks --help        #
+#########################################################################
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SyntheticChartConfig, generate_universe
+from datatypes.stock_data import StockDataInfo
+from datatypes.stock_indicator import StockIndicators
+from fetch.stocks import update_stock_indicators
+from repository.stock_indicator.i_stock_indicator_repository import IStockIndicatorRepository
+from repository.stock_indicator.stock_indicator_file_repository import StockIndicatorFileRepository
+from repository.stock_value.stock_value_file_repository import StockValueFileRepository
+from stock_indicators.registry import get_stock_indicator_registry
+
+RESULT_FORMAT_VERSION = 1
+
+
+class _MemoryStockIndicatorRepository(IStockIndicatorRepository):
+    """ keeps the last stored value per key only (isolates calculation from storage) """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger=logger)
+        self._values = {}
+
+    def get(self, key: str) -> StockIndicators | None:
+        return self._values.get(key)
+
+    def store(self, key: str, value: StockIndicators):
+        self._values[key] = value
+
+    def list_keys(self) -> list[str]:
+        return list(self._values.keys())
+
+    def delete_after(self, key: str, date: datetime.date) -> None:
+        if key in self._values:
+            self._values[key] = StockIndicators({d: v for d, v in self._values[key].items() if d <= date})
+
+
+def _time(func: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> dict:
+    """ runs `func` `repeat` times (calling `setup` before each run, untimed) """
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return {'min': min(durations),
+            'median': statistics.median(durations),
+            'mean': statistics.fmean(durations),
+            'repeat': repeat}
+
+
+def _calculate_all(universe: list[StockDataInfo], indicator_ids: list[str], logger: logging.Logger) -> dict:
+    """ calculates the indicators of all symbols like `stock-indicators update` does (without storing) """
+    repo = _MemoryStockIndicatorRepository(logger=logger)
+    for stock_info in universe:
+        update_stock_indicators(stock_info=stock_info,
+                                indicators_to_update=indicator_ids,
+                                logger=logger,
+                                repo=repo)
+    return repo._values
+
+
+def run_benchmarks(symbol_count: int,
+                   config: SyntheticChartConfig,
+                   repeat: int,
+                   include_storage: bool = True,
+                   logger: logging.Logger | None = None) -> dict:
+    """ runs all benchmarks
+
+    Args:
+        symbol_count (int): Number of synthetic symbols
+        config (SyntheticChartConfig): Shape of the synthetic charts
+        repeat (int): How often each benchmark is repeated
+        include_storage (bool, optional): Also benchmark the file repositories. Defaults to True.
+        logger (logging.Logger, optional): The logger handed to the code under test. Defaults to a silent one.
+    Returns:
+        dict: benchmark name -> timings in seconds (min, median, mean, repeat)
+    """
+    logger = logger or logging.getLogger('stock_gpt_benchmarks')
+    universe = generate_universe(symbol_count=symbol_count, config=config)
+    registry = get_stock_indicator_registry()
+    indicator_ids = registry.list_ids()
+    results = {}
+
+    # single indicators (grouped ones calculate their whole group)
+    for indicator_id in indicator_ids:
+        indicator = registry.get(indicator_id)()
+        results[f'indicator.{indicator_id}'] = _time(
+            lambda: [indicator.calculate_series(stock_info) for stock_info in universe], repeat=repeat)
+
+    # the full per-symbol path (calculating all indicators and building the stored values)
+    results['pipeline.update_stock_indicators'] = _time(
+        lambda: _calculate_all(universe=universe, indicator_ids=indicator_ids, logger=logger), repeat=repeat)
+
+    if include_storage:
+        indicators = _calculate_all(universe=universe, indicator_ids=indicator_ids, logger=logger)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            base_path = Path(tmp_dir)
+            (base_path / 'stock_values').mkdir()
+            (base_path / 'stock_indicators').mkdir()
+            value_repo = StockValueFileRepository(base_path=base_path / 'stock_values', logger=logger)
+            indicator_repo = StockIndicatorFileRepository(base_path=base_path / 'stock_indicators', logger=logger)
+
+            def clear(path: Path):
+                for file in path.iterdir():
+                    file.unlink()
+
+            results['repository.stock_value.store'] = _time(
+                lambda: [value_repo.store(key=stock_info.symbol, value=stock_info) for stock_info in universe],
+                repeat=repeat, setup=lambda: clear(base_path / 'stock_values'))
+            results['repository.stock_value.get'] = _time(
+                lambda: [value_repo.get(stock_info.symbol) for stock_info in universe], repeat=repeat)
+            results['repository.stock_value.get_many'] = _time(
+                lambda: list(value_repo.get_many(stock_info.symbol for stock_info in universe)), repeat=repeat)
+            results['repository.stock_indicator.store'] = _time(
+                lambda: [indicator_repo.store(key=symbol, value=value) for symbol, value in indicators.items()],
+                repeat=repeat, setup=lambda: clear(base_path / 'stock_indicators'))
+            results['repository.stock_indicator.get'] = _time(
+                lambda: [indicator_repo.get(symbol) for symbol in indicators], repeat=repeat)
+            results['repository.stock_indicator.get_many'] = _time(
+                lambda: list(indicator_repo.get_many(indicators)), repeat=repeat)
+            results['repository.stock_indicator.store_many'] = _time(
+                lambda: indicator_repo.store_many(indicators.items()),
+                repeat=repeat, setup=lambda: clear(base_path / 'stock_indicators'))
+
+    return results
+
+
+def _get_git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare_results(old: dict, new: dict) -> list[tuple[str, float, float, float]]:
+    """ compares the median timings of two result files
+
+    Returns:
+        list[tuple[str, float, float, float]]: (benchmark name, old median, new median, new / old)
+            for all benchmarks contained in both
+    """
+    comparison = []
+    for name, timings in new['results'].items():
+        if name in old['results']:
+            old_median = old['results'][name]['median']
+            comparison.append((name, old_median, timings['median'],
+                               timings['median'] / old_median if old_median else float('nan')))
+
+    return comparison
+
+
+def parse_arguments(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks of the stock indicator pipeline on synthetic charts")
+    parser.add_argument('--symbols', type=int, default=10, help="Number of synthetic symbols (default: 10)")
+    parser.add_argument('--history-length', type=int, default=2500,
+                        help="Trading days per symbol (default: 2500)")
+    parser.add_argument('--nan-density', type=float, default=0.01,
+                        help="Share of days without values (default: 0.01)")
+    parser.add_argument('--gap-density', type=float, default=0.0,
+                        help="Share of days missing completely (default: 0.0)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the generated charts (default: 0)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per benchmark (default: 3)")
+    parser.add_argument('--skip-storage', action='store_true', help="Do not benchmark the file repositories")
+    parser.add_argument('--output', type=Path, help="Write the results as JSON to this file (default: stdout)")
+    parser.add_argument('--compare', type=Path, help="Print the change relative to an earlier result file")
+    return parser.parse_args(args)
+
+
+def main(args: list[str] | None = None) -> None:
+    args = parse_arguments(args)
+    config = SyntheticChartConfig(history_length=args.history_length,
+                                  nan_density=args.nan_density,
+                                  gap_density=args.gap_density,
+                                  seed=args.seed)
+
+    results = {
+        'version': RESULT_FORMAT_VERSION,
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _get_git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'symbols': args.symbols,
+            'history_length': config.history_length,
+            'nan_density': config.nan_density,
+            'gap_density': config.gap_density,
+            'seed': config.seed,
+        },
+        'results': run_benchmarks(symbol_count=args.symbols,
+                                  config=config,
+                                  repeat=args.repeat,
+                                  include_storage=not args.skip_storage),
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+    if args.compare:
+        for name, old_median, new_median, ratio in compare_results(json.loads(args.compare.read_text()), results):
+            print(f'{name:45s} {old_median:10.4f}s -> {new_median:10.4f}s  x{ratio:.2f}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Deterministic synthetic OHLCV charts for benchmarks            #
+#########################################################################
+from __future__ import annotations
+
+import dataclasses
+import datetime
+
+import numpy as np
+
+from datatypes.stock_data import StockDataInfo, StockDataColumns
+
+
+@dataclasses.dataclass(frozen=True)
+class SyntheticChartConfig:
+    """ Shape of the generated charts """
+    history_length: int = 2500
+    """ number of trading days per symbol (before removing gaps) """
+    nan_density: float = 0.01
+    """ share of days without values (as delivered by Yahoo for, e.g., trading halts) """
+    gap_density: float = 0.0
+    """ share of trading days missing completely (no row at all) """
+    start_date: datetime.date = datetime.date(2000, 1, 3)
+    seed: int = 0
+
+
+def generate_stock_data(symbol: str, config: SyntheticChartConfig, seed_offset: int = 0) -> StockDataInfo:
+    """ generates a random walk chart on business days. Same config and offset yield the same chart.
+
+    Args:
+        symbol (str): The symbol of the chart
+        config (SyntheticChartConfig): The shape of the chart
+        seed_offset (int, optional): Added to the config's seed (to get different charts per symbol). Defaults to 0.
+    Returns:
+        StockDataInfo: The generated chart
+    """
+    rng = np.random.default_rng(config.seed + seed_offset)
+    n = config.history_length
+
+    dates = np.busday_offset(np.datetime64(config.start_date, 'D'), np.arange(n), roll='forward')
+    closes = 20 + 80 * rng.random() * np.exp(np.cumsum(rng.normal(0.0002, 0.02, n)))
+    opens = closes * (1 + rng.normal(0, 0.005, n))
+    highs = np.maximum(opens, closes) * (1 + rng.exponential(0.01, n))
+    lows = np.minimum(opens, closes) * (1 - rng.exponential(0.01, n))
+    volumes = rng.integers(10_000, 10_000_000, n).astype(np.float64)
+
+    missing = rng.random(n) < config.nan_density
+    for values in (opens, highs, lows, closes, volumes):
+        values[missing] = np.nan
+
+    kept = rng.random(n) >= config.gap_density
+    columns = StockDataColumns.from_arrays(dates[kept], opens[kept], highs[kept], lows[kept],
+                                           closes[kept], volumes[kept])
+    return StockDataInfo.from_columns(symbol=symbol, columns=columns)
+
+
+def generate_universe(symbol_count: int, config: SyntheticChartConfig) -> list[StockDataInfo]:
+    """ generates `symbol_count` different charts (symbols `SYN0000`, `SYN0001`, ...) """
+    return [generate_stock_data(symbol=f'SYN{i:04d}', config=config, seed_offset=i) for i in range(symbol_count)]
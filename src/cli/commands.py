@@ -16,14 +16,18 @@
 #########################################################################
 from __future__ import annotations
 
+import dataclasses
 import datetime
 import logging
+from pathlib import Path
 
 import pyperclip
 
-from fetch.fredapi import update_market_indicators
+from fetch.fredapi import update_market_indicators, DEFAULT_FETCH_WORKERS, DEFAULT_INDICATOR_OVERLAP_DAYS
 from fetch.newsapi import fetch_latest_stock_news
-from fetch.stocks import update_stock_symbol, update_all_stock_indicators_for_active_stocks, update_stock_indicators
+from fetch.stocks import update_stock_symbol, update_all_stock_indicators_for_active_stocks, update_stock_indicators, \
+    update_all_stock_indicators_batch, update_stock_symbols, DEFAULT_FETCH_CONCURRENCY, \
+    DEFAULT_INCREMENTAL_OVERLAP_DAYS
 from fetch.yfinance import fetch_basic_stock_info
 from generate.gpt import generate_gpt_query
 from misc.config import AppConfig
@@ -32,7 +36,9 @@ import gettext
 from repository.market_indicator.i_market_indicator_repository import IMarketIndicatorRepository
 from repository.news.i_news_article_repository import INewsArticleRepository
 from repository.stock_indicator.i_stock_indicator_repository import IStockIndicatorRepository
+from repository.sqlite_import import import_into_sqlite
 from repository.stock_value.i_stock_value_repository import IStockValueRepository
+from stock_indicators.cache import StockIndicatorCache
 
 _ = gettext.gettext
 
@@ -44,6 +50,9 @@ def update_market_indicator_data(
         indicators: list[str],
         from_date: datetime.date | None = None,
         to_date: datetime.date | None = None,
+        workers: int = DEFAULT_FETCH_WORKERS,
+        incremental: bool = False,
+        overlap_days: int = DEFAULT_INDICATOR_OVERLAP_DAYS,
 ) -> None:
     """Refreshes the indicator data for the given time period
 
@@ -54,6 +63,10 @@ def update_market_indicator_data(
         to_date (datetime.date, optional): The end time. Defaults to `None`.
         app_config (AppConfig): The application configuration
         repo (IMarketIndicatorRepository): The repository to use
+        workers (int, optional): Number of indicators requested at once. Defaults to 4.
+        incremental (bool, optional): Only request the observations since the latest stored ones. Defaults to False.
+        overlap_days (int, optional): Days before the latest stored date requested again when `incremental`.
+            Defaults to 31.
     """
     logger.info(_("Collecting indicators for: {indicators} (from: {d_from} to {d_to})").format(
         indicators=indicators,
@@ -66,7 +79,10 @@ def update_market_indicator_data(
                              repo=repo,
                              indicators=indicators,
                              from_date=from_date,
-                             to_date=to_date)
+                             to_date=to_date,
+                             workers=workers,
+                             incremental=incremental,
+                             overlap_days=overlap_days)
 
 
 def update_stock_symbol_data(
@@ -98,17 +114,98 @@ def update_stock_symbol_data(
                         to_date=to_date)
 
 
+def update_stock_symbols_data(
+        repo: IStockValueRepository,
+        logger: logging.Logger,
+        symbols: list[str],
+        from_date: datetime.date | None = None,
+        to_date: datetime.date | None = None,
+        concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+        incremental: bool = False,
+        overlap_days: int = DEFAULT_INCREMENTAL_OVERLAP_DAYS,
+) -> None:
+    """Refreshes the stock data of many symbols for the given time period (loading several at once)
+
+    Args:
+        logger (logging.Logger): The logger to use
+        symbols (list[str]): The stock symbols to refresh
+        from_date (datetime.date, optional): The start time. Defaults to `None`.
+        to_date (datetime.date, optional): The end time. Defaults to `None`.
+        repo (IStockValueRepository): The repository to use
+        concurrency (int, optional): Number of symbols requested at once. Defaults to 4.
+        incremental (bool, optional): Only request the dates from the latest stored one on (minus `overlap_days`)
+            for symbols already stored. Defaults to False.
+        overlap_days (int, optional): Days requested again before the latest stored date. Defaults to 5.
+    """
+    logger.info(_("Collecting data for {count} symbols (from: {d_from} to {d_to}, {concurrency} at once)").format(
+        count=len(symbols),
+        d_from=from_date,
+        d_to=to_date,
+        concurrency=concurrency,
+    ))
+
+    update_stock_symbols(repo=repo,
+                         logger=logger,
+                         symbols=symbols,
+                         from_date=from_date,
+                         to_date=to_date,
+                         concurrency=concurrency,
+                         incremental=incremental,
+                         overlap_days=overlap_days)
+
+
+def compact_stock_value_data(repo: IStockValueRepository, logger: logging.Logger) -> None:
+    """ Compacts the stored stock data (charts)
+
+    Args:
+        repo (IStockValueRepository): The repository to compact
+        logger (logging.Logger): The logger to use
+    """
+    logger.info(_("Compacting stock data"))
+    repo.compact()
+
+
+def import_data_into_sqlite(app_config: AppConfig, logger: logging.Logger) -> None:
+    """ Imports the file based data into the SQLite database
+
+    Args:
+        app_config (AppConfig): The app config (defines the source directories and the database file)
+        logger (logging.Logger): The logger to use
+    """
+    result = import_into_sqlite(app_config=app_config, logger=logger)
+    logger.info(_("Imported {stock_values} charts, {stock_indicators} stock indicator sets, "
+                  "{market_indicators} market indicators and the news of {news_articles} symbols into {path}")
+                .format(**dataclasses.asdict(result), path=app_config.sqlite_database_file))
+
+
 def update_stock_indicator_data(
         stock_value_repo: IStockValueRepository,
         stock_indicator_repo: IStockIndicatorRepository,
         indicators_to_update: list[str],
-        logger: logging.Logger):
+        logger: logging.Logger,
+        incremental: bool = False,
+        workers: int = 1,
+        engine: str = 'symbol',
+        cache_file: Path | None = None):
     logger.info(_("Updating stock data for all active stocks"))
+    if engine == 'batch':
+        if incremental or workers > 1 or cache_file is not None:
+            logger.warning(_("--incremental, --workers and the cache are not used by the batch engine"))
+        update_all_stock_indicators_batch(
+            stock_value_repo=stock_value_repo,
+            stock_indicator_repo=stock_indicator_repo,
+            indicators_to_update=indicators_to_update,
+            logger=logger)
+        return
+
     update_all_stock_indicators_for_active_stocks(
         stock_value_repo=stock_value_repo,
         stock_indicator_repo=stock_indicator_repo,
         indicators_to_update=indicators_to_update,
-        logger=logger)
+        logger=logger,
+        incremental=incremental,
+        workers=workers,
+        cache=StockIndicatorCache(path=cache_file) if cache_file is not None else None)
 
 
 def update_news_data(
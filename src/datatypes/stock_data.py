@@ -19,8 +19,11 @@ from __future__ import annotations
 
 import dataclasses
 import datetime
+from functools import cached_property
 
-import pandas as pd
+import numpy as np
+
+CHART_FIELDS = ('open', 'high', 'low', 'close', 'volume')
 
 
 @dataclasses.dataclass(frozen=True)
@@ -32,58 +35,181 @@ class StockDataChartEntry:
     volume: float | None = dataclasses.field(default=None)
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, eq=False)
+class StockDataColumns:
+    """ Columnar representation of a chart.
+    All arrays have the same length, `dates` (datetime64[D]) is sorted ascending without duplicates
+    and the value columns are float64 (missing values are NaN)
+    """
+    dates: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    valid: np.ndarray | None = dataclasses.field(default=None)
+    """ rows where all values are available (calculated if not given) """
+
+    def __post_init__(self):
+        if self.valid is None:
+            valid = np.logical_and.reduce([~np.isnan(getattr(self, field)) for field in CHART_FIELDS])
+            object.__setattr__(self, 'valid', valid)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_arrays(cls,
+                    dates: np.ndarray,
+                    open: np.ndarray,
+                    high: np.ndarray,
+                    low: np.ndarray,
+                    close: np.ndarray,
+                    volume: np.ndarray) -> StockDataColumns:
+        """ builds the columns from (possibly unsorted) arrays
+        if a date occurs multiple times the last occurrence wins
+
+        Args:
+            dates (np.ndarray): The dates (anything convertible to datetime64[D])
+            open (np.ndarray): The open values
+            high (np.ndarray): The high values
+            low (np.ndarray): The low values
+            close (np.ndarray): The close values
+            volume (np.ndarray): The volumes
+        """
+        dates = np.asarray(dates).astype('datetime64[D]')
+        values = [np.asarray(column, dtype=np.float64) for column in (open, high, low, close, volume)]
+        if len(dates) > 1 and not np.all(dates[1:] > dates[:-1]):
+            # keep the last occurrence of every date
+            unique_dates, reversed_first = np.unique(dates[::-1], return_index=True)
+            order = len(dates) - 1 - reversed_first
+            dates = unique_dates
+            values = [column[order] for column in values]
+
+        return cls(dates, *(np.ascontiguousarray(column) for column in values))
+
+    def get_index_until(self, until_date: datetime.date) -> int:
+        """ number of rows at or before the given date (binary search) """
+        return int(np.searchsorted(self.dates, np.datetime64(until_date, 'D'), side='right'))
+
+    def get_index_from(self, from_date: datetime.date) -> int:
+        """ index of the first row at or after the given date (binary search) """
+        return int(np.searchsorted(self.dates, np.datetime64(from_date, 'D'), side='left'))
+
+    def slice(self, start: int, stop: int | None = None) -> StockDataColumns:
+        """ returns the rows [start, stop) without copying the underlying arrays """
+        return StockDataColumns(*(getattr(self, field)[start:stop] for field in ('dates',) + CHART_FIELDS),
+                                valid=self.valid[start:stop])
+
+
 class StockDataInfo:
-    symbol: str = dataclasses.field()
-    chart: dict[datetime.date, StockDataChartEntry] = dataclasses.field(default_factory=dict)
+    """ Chart of a stock symbol, stored as columns (see `StockDataColumns`).
+    `chart` offers the (lazily built) dictionary view of the same data
+    """
+    symbol: str
+    columns: StockDataColumns
+
+    def __init__(self,
+                 symbol: str,
+                 chart: dict[datetime.date, StockDataChartEntry] | None = None,
+                 columns: StockDataColumns | None = None):
+        self.symbol = symbol
+        if columns is None:
+            dates = list((chart or {}).keys())
+            entries = list((chart or {}).values())
+            columns = StockDataColumns.from_arrays(
+                np.array(dates, dtype='datetime64[D]'),
+                *(np.array([getattr(entry, field) for entry in entries], dtype=np.float64)
+                  for field in CHART_FIELDS))
+
+        self.columns = columns
+
+    def __repr__(self) -> str:
+        return f'StockDataInfo(symbol={self.symbol!r}, rows={len(self.columns)})'
+
+    @classmethod
+    def from_columns(cls, symbol: str, columns: StockDataColumns) -> StockDataInfo:
+        return cls(symbol=symbol, columns=columns)
+
+    @cached_property
+    def chart(self) -> dict[datetime.date, StockDataChartEntry]:
+        """ dictionary view (date -> entry) of the chart (compatibility; avoid in hot paths) """
+        return self._entries(np.arange(len(self.columns)))
+
+    def _entries(self, rows: np.ndarray) -> dict[datetime.date, StockDataChartEntry]:
+        """ builds chart entries for the given row indices only """
+        columns = self.columns
+        return {date: StockDataChartEntry(*(float(getattr(columns, field)[row]) for field in CHART_FIELDS))
+                for date, row in zip(columns.dates[rows].tolist(), rows.tolist())}
+
+    def get_dates(self) -> list[datetime.date]:
+        """ returns all dates of the chart in ascending order """
+        return self.columns.dates.tolist()
+
+    def get_value_arrays(self, *fields: str) -> tuple[np.ndarray, ...]:
+        """ returns the given chart fields as float arrays aligned to `get_dates()` (no copies)
 
-    def filter_close_dates_until(self, until_date: datetime.date):
+        Args:
+            fields (str): The fields to fetch (any of 'open', 'high', 'low', 'close', 'volume')
+        return (tuple[np.ndarray, ...]): One array per field; missing values are NaN
+        """
+        return tuple(getattr(self.columns, field) for field in fields)
+
+    def slice_from(self, from_date: datetime.date) -> StockDataInfo:
+        """ returns a view only holding the chart entries at or after the given date
+
+        Args:
+            from_date (datetime.date): The first date to keep
+        return (StockDataInfo): The reduced stock data info
+        """
+        return StockDataInfo.from_columns(symbol=self.symbol,
+                                          columns=self.columns.slice(self.columns.get_index_from(from_date)))
+
+    def _filter_until(self, field: str, until_date: datetime.date, available_field: str | None = None) -> np.ndarray:
+        """ values of `field` until the given date where `available_field` (default: `field`) is not NaN """
+        stop = self.columns.get_index_until(until_date)
+        values = getattr(self.columns, field)[:stop]
+        available = ~np.isnan(getattr(self.columns, available_field or field)[:stop])
+        if available.all():
+            return values
+
+        return values[available]
+
+    def filter_close_dates_until(self, until_date: datetime.date) -> np.ndarray:
         """ fetches all close dates until the given date
 
         Args:
             until_date (datetime.date): The date until which to fetch the close dates
-        return (list[float]): The list of close dates
+        return (np.ndarray): The close values
         """
-        filtered = {date: entry for date, entry in self.chart.items()
-                    if date <= until_date and entry.close is not None and pd.notna(entry.close)}
-
-        return [entry.close for date, entry in filtered.items()]
+        return self._filter_until('close', until_date)
 
-    def filter_high_dates_until(self, until_date: datetime.date):
+    def filter_high_dates_until(self, until_date: datetime.date) -> np.ndarray:
         """ fetches all high dates until the given date
 
         Args:
             until_date (datetime.date): The date until which to fetch the close dates
-        return (list[float]): The list of close dates
+        return (np.ndarray): The high values
         """
-        filtered = {date: entry for date, entry in self.chart.items()
-                    if date <= until_date and entry.high is not None and pd.notna(entry.high)}
-
-        return [entry.high for date, entry in filtered.items()]
+        return self._filter_until('high', until_date)
 
-    def filter_low_dates_until(self, until_date: datetime.date):
+    def filter_low_dates_until(self, until_date: datetime.date) -> np.ndarray:
         """ fetches all low dates until the given date
 
         Args:
             until_date (datetime.date): The date until which to fetch the close dates
-        return (list[float]): The list of close dates
+        return (np.ndarray): The low values
         """
-        filtered = {date: entry for date, entry in self.chart.items()
-                    if date <= until_date and entry.low is not None and pd.notna(entry.low)}
+        return self._filter_until('low', until_date)
 
-        return [entry.low for date, entry in filtered.items()]
-
-    def filter_volumes_dates_until(self, until_date: datetime.date):
-        """ fetches all volumes until the given date
+    def filter_volumes_dates_until(self, until_date: datetime.date) -> np.ndarray:
+        """ fetches all volumes until the given date (for all dates with a close value)
 
         Args:
             until_date (datetime.date): The date until which to fetch the close dates
-        return (list[float]): The list of close dates
+        return (np.ndarray): The volumes
         """
-        filtered = {date: entry for date, entry in self.chart.items()
-                    if date <= until_date and entry.volume is not None and pd.notna(entry.close)}
-
-        return [entry.volume for date, entry in filtered.items()]
+        return self._filter_until('volume', until_date, available_field='close')
 
     def get_values_for_date_range(self,
                                   date_from: datetime.date,
@@ -98,11 +224,11 @@ class StockDataInfo:
         Returns:
             StockDataInfo: The stock data info for the given date range.
         """
-        filtered = {date: entry for date, entry in self.chart.items()
-                    if date_from <= date <= date_to and pd.notna(entry.close) and pd.notna(entry.volume) and
-                    pd.notna(entry.high) and pd.notna(entry.low) and pd.notna(entry.open)}
+        start = self.columns.get_index_from(date_from)
+        stop = self.columns.get_index_until(date_to)
+        rows = start + np.flatnonzero(self.columns.valid[start:stop])
 
-        return filtered
+        return self._entries(rows)
 
     def sample_two_values_per_month(self, from_date: datetime.date) -> dict[datetime.date, StockDataChartEntry]:
         """Samples two values per month from the given date.
@@ -113,13 +239,8 @@ class StockDataInfo:
         Returns:
             dict[datetime.date, StockDataChartEntry]: The sampled values.
         """
-        sampled = {}
-        for date, entry in self.chart.items():
-            if date < from_date:
-                if date.day == 1 or date.day == 15:
-                    sampled[date] = entry
-
-        # sort dict by key ascending
-        sampled = {k: v for k, v in sorted(sampled.items(), key=lambda item: item[0])}
+        dates = self.columns.dates[:self.columns.get_index_from(from_date)]
+        day_of_month = (dates - dates.astype('datetime64[M]')).astype(np.int64) + 1
+        rows = np.flatnonzero((day_of_month == 1) | (day_of_month == 15))
 
-        return sampled
+        return self._entries(rows)
@@ -18,20 +18,98 @@ from __future__ import annotations
 
 import datetime
 import logging
-from typing import Iterable
-
-import pandas as pd
-from fredapi import Fred
+import math
+import threading
+from typing import Iterator
 
 from datatypes.market_indicator import MarketIndicator
+from exceptions.base import StockGptException
+from fetch.http_client import HttpClient, get_http_client
 from misc.config import AppConfig
+from repository.i_repository import map_in_threads
 from repository.market_indicator.i_market_indicator_repository import IMarketIndicatorRepository
 
+FRED_OBSERVATIONS_URL = 'https://api.stlouisfed.org/fred/series/observations'
+FRED_MISSING_VALUE = '.'
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_INDICATOR_OVERLAP_DAYS = 31
+""" days before the latest stored date requested again by incremental updates. Most series are monthly, so this
+re-requests (at least) the latest period, which is the one revised most often """
+
 
-def build_fred(app_config: AppConfig) -> Fred:
-    """Build a FRED API client from the given configuration"""
-    fred = Fred(api_key=app_config.fred_api_key)
-    return fred
+class FredClient:
+    """ Requests the observations of FRED series through the shared `HttpClient` (pooled connections, retries and
+    the rate limit of the provider `fred`). Thread safe.
+    """
+    _api_key: str
+    _http_client: HttpClient | None
+
+    def __init__(self, api_key: str, http_client: HttpClient | None = None):
+        """
+        Args:
+            api_key (str): The FRED API key
+            http_client (HttpClient, optional): The client to send the requests with. Defaults to None (the shared
+                one at the time of each request).
+        """
+        self._api_key = api_key
+        self._http_client = http_client
+
+    def get_series(self,
+                   series_id: str,
+                   observation_start: datetime.date | None = None,
+                   observation_end: datetime.date | None = None) -> MarketIndicator:
+        """ loads the observations of a series (missing values are NaN)
+
+        Args:
+            series_id (str): The series (e.g., `UNRATE`)
+            observation_start (datetime.date, optional): The first date. Defaults to None (the first observation).
+            observation_end (datetime.date, optional): The last date. Defaults to None (the latest observation).
+        Returns:
+            MarketIndicator: The values by date
+        Raises:
+            StockGptException: If the series could not be loaded
+        """
+        params = {'series_id': series_id, 'api_key': self._api_key, 'file_type': 'json'}
+        if observation_start is not None:
+            params['observation_start'] = observation_start.isoformat()
+        if observation_end is not None:
+            params['observation_end'] = observation_end.isoformat()
+
+        response = (self._http_client or get_http_client()).get(FRED_OBSERVATIONS_URL,
+                                                                params=params,
+                                                                provider='fred')
+        try:
+            content = response.json()
+        except ValueError:
+            content = {}
+
+        if response.status_code != 200:
+            message = content.get('error_message', response.reason) if isinstance(content, dict) else response.reason
+            raise StockGptException(f'FRED API answered status {response.status_code} for series {series_id}: '
+                                    f'{message} (Code: 42834093)')
+
+        try:
+            return MarketIndicator({
+                datetime.date.fromisoformat(observation['date']):
+                    math.nan if observation['value'] == FRED_MISSING_VALUE else float(observation['value'])
+                for observation in content['observations']})
+        except (KeyError, TypeError, ValueError) as e:
+            raise StockGptException(f'Malformed FRED API response for series {series_id}: {e!r} '
+                                    f'(Code: 42834094)') from e
+
+
+_fred_clients: dict[str, FredClient] = {}
+_fred_clients_lock = threading.Lock()
+
+
+def build_fred(app_config: AppConfig) -> FredClient:
+    """ the FRED API client of the configured API key (shared by all callers) """
+    with _fred_clients_lock:
+        fred = _fred_clients.get(app_config.fred_api_key)
+        if fred is None:
+            fred = _fred_clients[app_config.fred_api_key] = FredClient(api_key=app_config.fred_api_key)
+
+        return fred
 
 
 def get_indicator(
@@ -40,36 +118,52 @@ def get_indicator(
         from_date: datetime.date | None = None,
         to_date: datetime.date | None = None) -> MarketIndicator:
     """ Get the indicator with the given ID from the FRED API  """
-    fred = build_fred(app_config)
     logger.info(f'Fetching indicator {indicator_id} from FRED API (Code: 324234820)')
-    indicator: pd.Series = fred.get_series(indicator_id,
-                                           observation_start=from_date,
-                                           observation_end=to_date
-                                           )
-
-    return MarketIndicator({datetime.date(year=k.year,
-                                          month=k.month,
-                                          day=k.day): v
-                            for k, v in indicator.to_dict().items()})
+    return build_fred(app_config).get_series(indicator_id,
+                                             observation_start=from_date,
+                                             observation_end=to_date)
 
 
 def load_market_indicators(
         logger: logging.Logger,
         app_config: AppConfig, indicators: list[str],
         from_date: datetime.date | None = None,
-        to_date: datetime.date | None = None) -> Iterable[str, dict[datetime.date, float]]:
-    """Loads the market indicators for the given time period"""
+        to_date: datetime.date | None = None,
+        workers: int = DEFAULT_FETCH_WORKERS,
+        from_dates: dict[str, datetime.date | None] | None = None) -> Iterator[tuple[str, MarketIndicator]]:
+    """Loads the market indicators for the given time period
 
-    for indicator in indicators:
+    Up to `workers` indicators are requested at once (all requests share the rate limiter of `fred`, see
+    `fetch.rate_limit`). Indicators which cannot be loaded are skipped.
+
+    Args:
+        logger (logging.Logger): The logger to use
+        app_config (AppConfig): The application configuration
+        indicators (list[str]): The indicators to load
+        from_date (datetime.date, optional): The start time. Defaults to `None`.
+        to_date (datetime.date, optional): The end time. Defaults to `None`.
+        workers (int, optional): Number of requests in flight. Defaults to 4.
+        from_dates (dict[str, datetime.date | None], optional): Start times of single indicators (overriding
+            `from_date`). Defaults to None.
+    Returns:
+        Iterator[tuple[str, MarketIndicator]]: The indicators and their values (in the order of `indicators`)
+    """
+    from_dates = from_dates or {}
+
+    def load(indicator: str) -> tuple[str, MarketIndicator | None]:
         try:
-            indicator_data = get_indicator(app_config=app_config, logger=logger,
-                                           indicator_id=indicator,
-                                           from_date=from_date,
-                                           to_date=to_date)
-            yield indicator, indicator_data
+            return indicator, get_indicator(app_config=app_config, logger=logger,
+                                            indicator_id=indicator,
+                                            from_date=from_dates.get(indicator, from_date),
+                                            to_date=to_date)
         except Exception as e:
             logger.warning(
                 f'Could not load indicator {indicator} from FRED API due to {e}. Skipping. (Code: 42834092)')
+            return indicator, None
+
+    for indicator, indicator_data in map_in_threads(load, indicators, max_workers=workers):
+        if indicator_data is not None:
+            yield indicator, indicator_data
 
 
 def update_market_indicators(
@@ -78,7 +172,10 @@ def update_market_indicators(
         repo: IMarketIndicatorRepository,
         indicators: list[str],
         from_date: datetime.date | None = None,
-        to_date: datetime.date | None = None) -> None:
+        to_date: datetime.date | None = None,
+        workers: int = DEFAULT_FETCH_WORKERS,
+        incremental: bool = False,
+        overlap_days: int = DEFAULT_INDICATOR_OVERLAP_DAYS) -> None:
     """ Updates the market indicators for the given time period (files)
 
     Args:
@@ -88,14 +185,32 @@ def update_market_indicators(
         from_date (datetime.date, optional): The start time. Defaults to `None`.
         to_date (datetime.date, optional): The end time. Defaults to `None`.
         repo (IMarketIndicatorRepository): The repository to use
+        workers (int, optional): Number of indicators requested at once. Defaults to 4.
+        incremental (bool, optional): Only request the observations from the latest stored date of each indicator
+            on (minus `overlap_days`). Indicators without stored values are loaded from `from_date`.
+            Defaults to False.
+        overlap_days (int, optional): Days before the latest stored date which are requested again (to catch
+            revised values). Defaults to 31.
     """
-
-    indicators = load_market_indicators(app_config=app_config,
-                                        logger=logger,
-                                        indicators=indicators,
-                                        from_date=from_date,
-                                        to_date=to_date)
-
-    for indicator, indicator_data in indicators:
-        repo.store(key=indicator,
-                   value=indicator_data)
+    from_dates: dict[str, datetime.date | None] = {}
+    if incremental:
+        for indicator in indicators:
+            latest = repo.get_latest(indicator, 1)
+            if latest:
+                from_dates[indicator] = max(latest) - datetime.timedelta(days=overlap_days)
+
+        logger.info(f'Loading {len(from_dates)} indicators incrementally and {len(indicators) - len(from_dates)} '
+                    f'completely (Code: 42834095)')
+        last_date = to_date or datetime.date.today()
+        indicators = [indicator for indicator in indicators if from_dates.get(indicator, from_date) is None
+                      or from_dates.get(indicator, from_date) <= last_date]
+
+    loaded = load_market_indicators(app_config=app_config,
+                                    logger=logger,
+                                    indicators=indicators,
+                                    from_date=from_date,
+                                    to_date=to_date,
+                                    workers=workers,
+                                    from_dates=from_dates)
+
+    repo.store_many(loaded)
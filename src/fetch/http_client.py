@@ -0,0 +1,196 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Shared HTTP client of all fetchers (connection pooling, timeouts,#
+# retries with backoff)                                                 #
+#########################################################################
+from __future__ import annotations
+
+import datetime
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from exceptions.base import StockGptException
+from fetch.rate_limit import get_rate_limiter
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_TIMEOUT = 30.
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_CONNECTIONS_PER_HOST = 8
+
+
+class HttpClient:
+    """ Sends the requests of all fetchers through one session, so connections (and their TLS handshakes) are
+    reused across requests and threads.
+
+    Every host gets a pool of at most `connections_per_host` connections (further requests wait for a free one).
+    Connection errors, timeouts and the status codes of `RETRY_STATUS_CODES` are retried with exponential backoff
+    and full jitter, waiting at least as long as the server asks for by `Retry-After`.
+    Requests naming a provider take a token of its rate limiter (see `fetch.rate_limit`) before each attempt.
+
+    To serve requests from somewhere else (e.g., a local stand-in server), hand in a session with an adapter
+    mounted for the provider's URL prefix, or replace the shared client (see `set_http_client`).
+    """
+    _session: requests.Session
+    _timeout: float
+    _max_retries: int
+    _backoff_factor: float
+    _max_backoff: float
+    _logger: logging.Logger | None
+    _sleep: Callable[[float], None]
+
+    def __init__(self,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_factor: float = 1.,
+                 max_backoff: float = 60.,
+                 connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST,
+                 session: requests.Session | None = None,
+                 logger: logging.Logger | None = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            timeout (float, optional): Seconds to wait for connecting and for each read. Defaults to 30.
+            max_retries (int, optional): Retries after the first attempt. Defaults to 3.
+            backoff_factor (float, optional): Upper bound (seconds) of the first backoff, doubled for every further
+                retry. Defaults to 1.
+            max_backoff (float, optional): Longest wait between two attempts (also caps `Retry-After`).
+                Defaults to 60.
+            connections_per_host (int, optional): Connections kept (and used at most) per host. Defaults to 8.
+            session (requests.Session, optional): The session to use as is. Defaults to None (a new session with
+                pooled connections).
+            logger (logging.Logger, optional): Logs the retries. Defaults to None.
+            sleep (Callable, optional): Function to wait with. Defaults to `time.sleep`.
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=connections_per_host, pool_block=True)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+
+        self._session = session
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._max_backoff = max_backoff
+        self._logger = logger
+        self._sleep = sleep
+
+    def get_backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """ seconds to wait before the retry following the given attempt (counted from 0) """
+        backoff = random.uniform(0, min(self._max_backoff, self._backoff_factor * 2 ** attempt))
+        if retry_after is not None:
+            backoff = max(backoff, min(retry_after, self._max_backoff))
+
+        return backoff
+
+    def get(self,
+            url: str,
+            params: dict | None = None,
+            headers: dict | None = None,
+            provider: str | None = None) -> requests.Response:
+        """ sends a GET request, retrying transient errors
+
+        Args:
+            url (str): The url
+            params (dict, optional): The query parameters. Defaults to None.
+            headers (dict, optional): The headers. Defaults to None.
+            provider (str, optional): The provider whose rate limit applies (e.g., `yahoo`). Defaults to None.
+        Returns:
+            requests.Response: The response (of the last attempt, which might still have a retried status code)
+        Raises:
+            StockGptException: If the last attempt failed without a response (e.g., a timeout)
+        """
+        attempt = 0
+        while True:
+            if provider is not None:
+                get_rate_limiter(provider).acquire()
+
+            try:
+                response = self._session.get(url, params=params, headers=headers, timeout=self._timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self._max_retries:
+                    raise StockGptException(f'Request to {url} failed after {attempt + 1} attempts due to {e} '
+                                            f'(Code: 48239401)') from e
+
+                reason = repr(e)
+                backoff = self.get_backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self._max_retries:
+                    return response
+
+                reason = f'status {response.status_code}'
+                backoff = self.get_backoff(attempt, retry_after=parse_retry_after(response.headers.get('Retry-After')))
+                # return the connection to the pool
+                response.close()
+
+            if self._logger is not None:
+                self._logger.warning(f'Request to {url} failed due to {reason}. '
+                                     f'Retrying in {backoff:.1f}s (Code: 48239402)')
+            self._sleep(backoff)
+            attempt += 1
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """ seconds to wait as given by a `Retry-After` header (delay in seconds or an HTTP date), None if not given
+    or malformed
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.)
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+
+    return max((date - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.)
+
+
+_http_client: HttpClient | None = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """ the client shared by all fetchers (created with the defaults on first use) """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+
+        return _http_client
+
+
+def set_http_client(client: HttpClient | None) -> None:
+    """ replaces the client shared by all fetchers (None creates a new default one on next use) """
+    global _http_client
+    with _http_client_lock:
+        _http_client = client
@@ -18,17 +18,17 @@ from __future__ import annotations
 
 import datetime
 
-import requests
-
 from datatypes.news_article import NewsArticle, TNewsArticles
 from exceptions.base import StockGptException
+from fetch.http_client import HttpClient, get_http_client
 
 
 def fetch_latest_stock_news(stock_symbol: str,
                             api_key: str,
                             page: int = 1,
                             stock_name: str | None=None,
-                            page_size: int = 15
+                            page_size: int = 15,
+                            http_client: HttpClient | None = None,
                             ) -> TNewsArticles:
     # Set up the endpoint and parameters
     url = 'https://newsapi.org/v2/everything'
@@ -42,7 +42,7 @@ def fetch_latest_stock_news(stock_symbol: str,
     }
 
     # Send the request and parse the response
-    response = requests.get(url, params=params)
+    response = (http_client or get_http_client()).get(url, params=params, provider='newsapi')
 
     if response.status_code == 200:
         data = response.json()
@@ -0,0 +1,121 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Rate limiting of the requests to the data providers            #
+#########################################################################
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+PROVIDER_RATE_LIMITS: dict[str, float] = {
+    'yahoo': 2.,
+    'fred': 2.,
+}
+""" default requests per second of each provider (Yahoo does not document a limit, this is a conservative guess;
+FRED allows 120 requests per minute). Overridden by `AppConfig.provider_rate_limits` """
+
+
+class TokenBucket:
+    """ Allows `rate` requests per second on average and bursts of up to `capacity` requests.
+    The bucket refills continuously; `acquire` blocks until a token is available. Thread safe.
+    """
+    _rate: float
+    _capacity: float
+    _tokens: float
+    _updated_at: float
+    _lock: threading.Lock
+    _clock: Callable[[], float]
+    _sleep: Callable[[float], None]
+
+    def __init__(self,
+                 rate: float,
+                 capacity: float | None = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            rate (float): Tokens added per second (0 or less disables the limit)
+            capacity (float, optional): Maximum number of tokens. Defaults to None (one second worth of tokens,
+                at least one).
+            clock (Callable, optional): Monotonic clock in seconds. Defaults to `time.monotonic`.
+            sleep (Callable, optional): Function to wait with. Defaults to `time.sleep`.
+        """
+        self._rate = rate
+        self._capacity = capacity if capacity is not None else max(rate, 1.)
+        self._tokens = self._capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def acquire(self, tokens: float = 1.) -> float:
+        """ takes tokens from the bucket, waiting until there are enough
+
+        Args:
+            tokens (float, optional): Number of tokens. Defaults to 1.
+        Returns:
+            float: The time waited (seconds)
+        """
+        if self._rate <= 0:
+            return 0.
+
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            # take the tokens right away (going into debt), so waiting callers are served in order
+            self._tokens -= tokens
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.
+
+        if wait > 0:
+            self._sleep(wait)
+
+        return wait
+
+
+_rate_limiters: dict[str, TokenBucket] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """ the rate limiter shared by all requests to the provider within this process
+
+    Args:
+        provider (str): The provider (e.g., `yahoo`, see `PROVIDER_RATE_LIMITS`)
+    Returns:
+        TokenBucket: The limiter (unlimited for unknown providers unless configured)
+    """
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = TokenBucket(rate=PROVIDER_RATE_LIMITS.get(provider, 0.))
+
+        return _rate_limiters[provider]
+
+
+def set_rate_limit(provider: str, rate: float, capacity: float | None = None) -> None:
+    """ replaces the rate limiter of the provider (see `get_rate_limiter`)
+
+    Args:
+        provider (str): The provider
+        rate (float): Requests per second (0 or less disables the limit)
+        capacity (float, optional): Maximum burst of requests. Defaults to None (see `TokenBucket`).
+    """
+    with _rate_limiters_lock:
+        _rate_limiters[provider] = TokenBucket(rate=rate, capacity=capacity)
@@ -16,17 +16,33 @@
 #########################################################################
 from __future__ import annotations
 
+import bisect
 import datetime
+import itertools
+import json
 import logging
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable, Iterator
 
-import requests
+import numpy as np
+import pandas as pd
 
-from datatypes.stock_data import StockDataInfo, StockDataChartEntry
+from datatypes.stock_data import StockDataInfo, StockDataColumns, CHART_FIELDS
 from datatypes.stock_indicator import StockIndicators
 from exceptions.base import StockGptException
-from misc.stock_indicator_util import get_stock_indicator_by_id
+from fetch.http_client import HttpClient, get_http_client
+from repository.i_repository import map_in_threads
 from repository.stock_indicator.i_stock_indicator_repository import IStockIndicatorRepository
 from repository.stock_value.i_stock_value_repository import IStockValueRepository
+from stock_indicators.batch import UniverseMatrix, calculate_batch, get_batch_supported_ids
+from stock_indicators.cache import StockIndicatorCache, StockIndicatorCacheEntry, StockIndicatorCacheStats
+from stock_indicators.registry import get_stock_indicator_registry, calculate_kernel_series
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional dependency (considerably faster decoding of long charts)
+    _json_loads = json.loads
 
 YF_FINANCE_BASE_URL = 'https://query2.finance.yahoo.com/v8/finance/chart/{}'
 YF_FINANCE_UA_HEADER = {
@@ -34,13 +50,19 @@ YF_FINANCE_UA_HEADER = {
                   '(KHTML, like Gecko) '
                   'Chrome/39.0.2171.95 Safari/537.36'
 }
+DEFAULT_FETCH_CONCURRENCY = 4
+DEFAULT_INCREMENTAL_OVERLAP_DAYS = 5
+INCREMENTAL_WINDOW_MARGIN = 64
+""" rows loaded by incremental indicator updates in addition to the longest warm-up period (rows with missing values
+do not count for the warm-up, see `load_incremental_chart`) """
 
 
 def load_stock_symbol_from_yfinance(
         symbol: str,
         logger: logging.Logger,
         from_date: datetime.date | None = None,
-        to_date: datetime.date | None = None) -> StockDataInfo:
+        to_date: datetime.date | None = None,
+        http_client: HttpClient | None = None) -> StockDataInfo:
     """Loads the stock data for the given symbol.
 
     Args:
@@ -48,6 +70,7 @@ def load_stock_symbol_from_yfinance(
         logger (logging.Logger): The logger to use.
         from_date (datetime.date, optional): The start date. Defaults to None.
         to_date (datetime.date, optional): The end date. Defaults to None.
+        http_client (HttpClient, optional): The client to send the request with. Defaults to None (the shared one).
 
     Returns:
         StockDataInfo: The stock data result object.
@@ -62,29 +85,61 @@ def load_stock_symbol_from_yfinance(
     to_date = int(datetime.datetime(to_date.year, to_date.month, to_date.day).timestamp())
     to_date += + 24*60*60-1  # last second of the day
     logger.info(f'Loading stock data for symbol {symbol} (Code: 39483092)')
-    request = requests.get(base_url,
-                           params={'period1': from_date,
-                                   'period2': to_date,
-                                   'interval': '1d'},
-                           headers=YF_FINANCE_UA_HEADER)
+    request = (http_client or get_http_client()).get(base_url,
+                                                     params={'period1': from_date,
+                                                             'period2': to_date,
+                                                             'interval': '1d'},
+                                                     headers=YF_FINANCE_UA_HEADER,
+                                                     provider='yahoo')
+
+    return decode_yahoo_chart(symbol=symbol, content=request.content)
+
+
+def decode_yahoo_chart(symbol: str, content: bytes) -> StockDataInfo:
+    """Decodes a chart response of Yahoo Finance straight into columns (no object per bar).
+
+    The bars are dated in the time zone of the exchange (as given by the response's meta data), so the dates do not
+    depend on the time zone of this machine.
+
+    Args:
+        symbol (str): The symbol.
+        content (bytes): The response body (JSON).
 
-    data = request.json()
+    Returns:
+        StockDataInfo: The stock data result object.
+
+    Raises:
+        StockGptException: If the response reports an error.
+    """
+    data = _json_loads(content)
     if data['chart']['error']:
         raise StockGptException(f"Error loading stock data for symbol {symbol}: {data['chart']['error']} (Code: 4289342)")
 
-    indicators = data['chart']['result'][0]['indicators']['quote'][0]
-    highs, lows, opens, closes, volumes = (
-        indicators[key] for key in ('high', 'low', 'open', 'close', 'volume')
-    )
-    timestamps = data['chart']['result'][0]['timestamp']
+    result = data['chart']['result'][0]
+    # (ranges without any bar come without timestamps and values)
+    timestamps = np.array(result.get('timestamp') or [], dtype=np.int64)
+    quote = (result.get('indicators', {}).get('quote') or [{}])[0]
+    # (missing values are null, which ends up as NaN)
+    values = [np.array(quote.get(field) or [None] * len(timestamps), dtype=np.float64) for field in CHART_FIELDS]
 
-    entries = {
-        datetime.date.fromtimestamp(timestamp): StockDataChartEntry(high=high, low=low, open=open,
-                                                                    close=close, volume=volume)
-        for high, low, open, close, volume, timestamp in zip(highs, lows, opens, closes, volumes, timestamps)
-    }
+    return StockDataInfo.from_columns(symbol=symbol,
+                                      columns=StockDataColumns.from_arrays(
+                                          _get_exchange_dates(timestamps, result.get('meta', {})), *values))
 
-    return StockDataInfo(symbol=symbol, chart=entries)
+
+def _get_exchange_dates(timestamps: np.ndarray, meta: dict) -> np.ndarray:
+    """ the dates (datetime64[D]) of the timestamps (seconds since epoch) in the exchange's time zone """
+    timezone = meta.get('exchangeTimezoneName')
+    if timezone:
+        try:
+            # (respects daylight saving time, unlike the exchange's current offset)
+            return (pd.to_datetime(timestamps, unit='s', utc=True).tz_convert(timezone).tz_localize(None)
+                    .to_numpy().astype('datetime64[D]'))
+        except KeyError:
+            # unknown time zone
+            pass
+
+    return (timestamps + int(meta.get('gmtoffset') or 0)).astype('datetime64[s]').astype('datetime64[D]')
 
 
 def update_stock_symbol(repo: IStockValueRepository,
@@ -110,10 +165,81 @@ def update_stock_symbol(repo: IStockValueRepository,
                value=data)
 
 
+def update_stock_symbols(repo: IStockValueRepository,
+                         symbols: Iterable[str],
+                         logger: logging.Logger,
+                         from_date: datetime.date | None = None,
+                         to_date: datetime.date | None = None,
+                         concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                         incremental: bool = False,
+                         overlap_days: int = DEFAULT_INCREMENTAL_OVERLAP_DAYS) -> None:
+    """Updates the stock values (charts) of many symbols.
+
+    Up to `concurrency` symbols are requested at once (all requests to Yahoo share its rate limiter, see
+    `fetch.rate_limit`), while the symbols already loaded are stored.
+
+    Args:
+        repo (IStockValueRepository): The repository to use.
+        symbols (Iterable[str]): The symbols to update.
+        logger (logging.Logger): The logger to use.
+        from_date (datetime.date, optional): The start date. Defaults to None.
+        to_date (datetime.date, optional): The end date. Defaults to None.
+        concurrency (int, optional): Number of requests in flight. Defaults to 4.
+        incremental (bool, optional): Only request the dates from the latest stored date of each symbol on
+            (minus `overlap_days`). Symbols without stored values are loaded from `from_date`. Defaults to False.
+        overlap_days (int, optional): Days before the latest stored date which are requested again (to catch
+            revised values). Defaults to 5.
+
+    Raises:
+        StockGptException: If symbols could not be loaded (after all others were stored)
+    """
+    symbols = list(symbols)
+    errors: dict[str, str] = {}
+    from_dates = {symbol: from_date for symbol in symbols}
+    if incremental:
+        # (looked up before loading, the repository is written meanwhile)
+        stored = 0
+        for symbol in symbols:
+            latest = repo.get_latest(symbol, 1)
+            if latest is not None and len(latest.columns) > 0:
+                from_dates[symbol] = latest.get_dates()[-1] - datetime.timedelta(days=overlap_days)
+                stored += 1
+
+        logger.info(f'Loading {stored} symbols incrementally and {len(symbols) - stored} completely '
+                    f'(Code: 39483095)')
+        last_date = to_date or datetime.date.today()
+        symbols = [symbol for symbol in symbols if from_dates[symbol] is None or from_dates[symbol] <= last_date]
+
+    def load(symbol: str) -> tuple[str, StockDataInfo | None]:
+        try:
+            return symbol, load_stock_symbol_from_yfinance(symbol=symbol,
+                                                           logger=logger,
+                                                           from_date=from_dates[symbol],
+                                                           to_date=to_date)
+        except Exception as e:
+            errors[symbol] = repr(e)
+            return symbol, None
+
+    loaded = map_in_threads(load, symbols, max_workers=concurrency)
+    repo.store_many((symbol, data) for symbol, data in loaded if data is not None)
+
+    failed = [symbol for symbol in symbols if symbol in errors]
+    for symbol in failed:
+        logger.error(f'Could not load stock data of {symbol} due to {errors[symbol]} (Code: 39483093)')
+
+    if failed:
+        raise StockGptException(f'Loading stock data failed for {len(failed)} of {len(symbols)} '
+                                f'symbols: {failed} (Code: 39483094)')
+
+
 def update_all_stock_indicators_for_active_stocks(logger: logging.Logger,
                                                   stock_value_repo: IStockValueRepository,
                                                   stock_indicator_repo: IStockIndicatorRepository,
-                                                  indicators_to_update: list[str]
+                                                  indicators_to_update: list[str],
+                                                  incremental: bool = False,
+                                                  workers: int = 1,
+                                                  chunk_size: int = 8,
+                                                  cache: StockIndicatorCache | None = None,
                                                   ) -> None:
     """Updates all active stock indicators.
 
@@ -122,16 +248,387 @@ def update_all_stock_indicators_for_active_stocks(logger: logging.Logger,
         stock_value_repo (IStockValueRepository): The stock value repository to use.
         stock_indicator_repo (IStockIndicatorRepository): The stock indicator repository to use.
         indicators_to_update (list[str]): The indicators which should be calculated for each stock
+        incremental (bool, optional): Only calculate dates newer than the stored ones. Defaults to False.
+        workers (int, optional): Number of processes to calculate the symbols with. Defaults to 1 (no pool).
+        chunk_size (int, optional): Number of symbols handed to a worker at once. Defaults to 8.
+        cache (StockIndicatorCache, optional): Cache of the charts the stored indicators were calculated on.
+            Unchanged symbols are skipped, changed ones only recalculated from the first changed date on.
+            The cache is updated and saved afterwards. Not used if `incremental` (which only loads the latest part
+            of each chart, see `load_incremental_chart`). Defaults to None (calculate everything).
+
+    Raises:
+        StockGptException: If symbols failed when using multiple workers (after all others were processed)
+    """
+    if incremental and cache is not None:
+        # (the cache fingerprints complete charts)
+        logger.info('Not using the stock indicator cache for the incremental update (Code: 943289030)')
+        cache = None
+
+    indicator_set_key = None
+    if cache is not None:
+        indicator_set_key = StockIndicatorCache.get_indicator_set_key(indicators_to_update)
+        # indicators might have been deleted since the cache was written
+        cache.keep_only(stock_indicator_repo.list_keys())
+
+    try:
+        if workers <= 1:
+            # (the following charts are read while the indicators of the current one are calculated)
+            for symbol, stock_info in _get_charts(stock_value_repo=stock_value_repo,
+                                                  stock_indicator_repo=stock_indicator_repo,
+                                                  symbols=stock_value_repo.list_keys(),
+                                                  indicators_to_update=indicators_to_update,
+                                                  incremental=incremental):
+                entry = _update_stock_indicators_of_symbol(symbol=symbol,
+                                                           stock_info=stock_info,
+                                                           stock_indicator_repo=stock_indicator_repo,
+                                                           indicators_to_update=indicators_to_update,
+                                                           incremental=incremental,
+                                                           logger=logger,
+                                                           cache=cache,
+                                                           indicator_set_key=indicator_set_key)
+                if entry is not None:
+                    cache.put(symbol, entry)
+            return
+
+        _update_all_stock_indicators_in_pool(logger=logger,
+                                             stock_value_repo=stock_value_repo,
+                                             stock_indicator_repo=stock_indicator_repo,
+                                             indicators_to_update=indicators_to_update,
+                                             incremental=incremental,
+                                             workers=workers,
+                                             chunk_size=chunk_size,
+                                             cache=cache,
+                                             indicator_set_key=indicator_set_key)
+    finally:
+        # keep what was calculated, even if some symbols failed
+        if cache is not None:
+            cache.save()
+            logger.info(f'Stock indicator cache: {cache.stats.hits} hits, {cache.stats.partial_hits} partial hits, '
+                        f'{cache.stats.misses} misses (Code: 943289028)')
+
+
+def _update_all_stock_indicators_in_pool(logger: logging.Logger,
+                                         stock_value_repo: IStockValueRepository,
+                                         stock_indicator_repo: IStockIndicatorRepository,
+                                         indicators_to_update: list[str],
+                                         incremental: bool,
+                                         workers: int,
+                                         chunk_size: int,
+                                         cache: StockIndicatorCache | None,
+                                         indicator_set_key: str | None) -> None:
+    """ see `update_all_stock_indicators_for_active_stocks` """
+    symbols = list(stock_value_repo.list_keys())
+    chunks = iter([symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)])
+    errors: dict[str, str] = {}
+    logger.info(f'Updating {len(symbols)} stock symbols using {workers} workers (Code: 943289024)')
+
+    # every worker gets its own copy of the repositories (and the cache); only the chunks' results travel back
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_stock_indicator_worker,
+                             initargs=(stock_value_repo, stock_indicator_repo, indicators_to_update,
+                                       incremental, logger, cache, indicator_set_key)) as pool:
+        # keep the number of chunks in flight bounded
+        pending = {}
+        for chunk in itertools.islice(chunks, 2 * workers):
+            pending[pool.submit(_update_stock_indicators_chunk, chunk)] = chunk
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    chunk_errors, cache_entries, cache_stats = future.result()
+                    errors.update(chunk_errors)
+                    if cache is not None:
+                        for symbol, entry in cache_entries.items():
+                            cache.put(symbol, entry)
+                        cache.stats.merge(cache_stats)
+                except Exception as e:
+                    # e.g., a crashed worker process
+                    errors.update({symbol: repr(e) for symbol in chunk})
+
+                next_chunk = next(chunks, None)
+                if next_chunk is not None:
+                    pending[pool.submit(_update_stock_indicators_chunk, next_chunk)] = next_chunk
+
+    # report in the order of the symbols, independent of scheduling
+    failed = [symbol for symbol in symbols if symbol in errors]
+    for symbol in failed:
+        logger.error(f'Could not update stock indicators of {symbol} due to {errors[symbol]} (Code: 943289025)')
+
+    if failed:
+        raise StockGptException(f'Updating stock indicators failed for {len(failed)} of {len(symbols)} '
+                                f'symbols: {failed} (Code: 943289026)')
+
+
+def _update_stock_indicators_of_symbol(symbol: str,
+                                       stock_info: StockDataInfo,
+                                       stock_indicator_repo: IStockIndicatorRepository,
+                                       indicators_to_update: list[str],
+                                       incremental: bool,
+                                       logger: logging.Logger,
+                                       cache: StockIndicatorCache | None,
+                                       indicator_set_key: str | None) -> StockIndicatorCacheEntry | None:
+    """ updates the indicators of a single symbol
+
+    Returns:
+        StockIndicatorCacheEntry | None: The new cache entry of the symbol (if a cache is used)
+    """
+    from_date = None
+    if cache is not None:
+        if cache.has_shrunk(symbol=symbol, columns=stock_info.columns):
+            # drop the values of the dates which are not part of the chart anymore
+            dates = stock_info.get_dates()
+            stock_indicator_repo.delete_after(key=symbol, date=dates[-1] if dates else datetime.date.min)
+
+        first_changed = cache.lookup(symbol=symbol, columns=stock_info.columns, indicator_set_key=indicator_set_key)
+        if first_changed == len(stock_info.columns):
+            logger.info(f'Stock symbol {symbol} is unchanged. Skipping (Code: 943289029)')
+            return None
+
+        if first_changed > 0:
+            from_date = stock_info.get_dates()[first_changed]
+
+    logger.info(f'Updating stock symbol {symbol} (Code: 943289023)')
+    update_stock_indicators(stock_info=stock_info,
+                            indicators_to_update=indicators_to_update,
+                            repo=stock_indicator_repo,
+                            logger=logger,
+                            incremental=incremental,
+                            from_date=from_date)
+
+    return cache.make_entry(columns=stock_info.columns, indicator_set_key=indicator_set_key) if cache else None
+
+
+def _get_charts(stock_value_repo: IStockValueRepository,
+                stock_indicator_repo: IStockIndicatorRepository,
+                symbols: Iterable[str],
+                indicators_to_update: list[str],
+                incremental: bool) -> Iterator[tuple[str, StockDataInfo | None]]:
+    """ reads the charts to calculate the indicators on (only their needed part if `incremental`, see
+    `load_incremental_chart`), the following ones while the current one is calculated
     """
-    for symbol in stock_value_repo.list_keys():
-        logger.info(f'Updating stock symbol {symbol} (Code: 943289023)')
-        # update_stock_symbol(symbol=symbol,
-        #                     logger=logger)
-        stock_info = stock_value_repo.get(symbol)
-        update_stock_indicators(stock_info=stock_info,
-                                indicators_to_update=indicators_to_update,
-                                repo=stock_indicator_repo,
-                                logger=logger)
+    if not incremental:
+        return stock_value_repo.get_many(symbols)
+
+    return map_in_threads(lambda symbol: (symbol, load_incremental_chart(stock_value_repo=stock_value_repo,
+                                                                         stock_indicator_repo=stock_indicator_repo,
+                                                                         symbol=symbol,
+                                                                         indicators_to_update=indicators_to_update)),
+                          symbols)
+
+
+_WORKER_STATE: dict = {}
+
+
+def _init_stock_indicator_worker(stock_value_repo: IStockValueRepository,
+                                 stock_indicator_repo: IStockIndicatorRepository,
+                                 indicators_to_update: list[str],
+                                 incremental: bool,
+                                 logger: logging.Logger,
+                                 cache: StockIndicatorCache | None,
+                                 indicator_set_key: str | None) -> None:
+    """ initializer of the indicator worker processes """
+    _WORKER_STATE.update(stock_value_repo=stock_value_repo,
+                         stock_indicator_repo=stock_indicator_repo,
+                         indicators_to_update=indicators_to_update,
+                         incremental=incremental,
+                         logger=logger,
+                         cache=cache,
+                         indicator_set_key=indicator_set_key)
+
+
+def _update_stock_indicators_chunk(symbols: list[str]) -> tuple[dict[str, str],
+                                                                 dict[str, StockIndicatorCacheEntry],
+                                                                 StockIndicatorCacheStats]:
+    """ updates the indicators of the given symbols within a worker process
+
+    Returns:
+        tuple: symbol -> error description for the failed symbols,
+            symbol -> new cache entry for the updated symbols, and the chunk's cache statistics
+    """
+    cache: StockIndicatorCache | None = _WORKER_STATE['cache']
+    if cache is not None:
+        # only count this chunk
+        cache.stats = StockIndicatorCacheStats()
+
+    errors = {}
+    cache_entries = {}
+
+    def get_charts(symbols_to_read: list[str]) -> Iterator[tuple[str, StockDataInfo | None]]:
+        return _get_charts(stock_value_repo=_WORKER_STATE['stock_value_repo'],
+                           stock_indicator_repo=_WORKER_STATE['stock_indicator_repo'],
+                           symbols=symbols_to_read,
+                           indicators_to_update=_WORKER_STATE['indicators_to_update'],
+                           incremental=_WORKER_STATE['incremental'])
+
+    stock_infos = get_charts(symbols)
+    for position, symbol in enumerate(symbols):
+        try:
+            _, stock_info = next(stock_infos)
+        except Exception as e:
+            errors[symbol] = repr(e)
+            # reading stops at the first error (e.g., a broken file), go on with the following symbols
+            stock_infos = get_charts(symbols[position + 1:])
+            continue
+
+        try:
+            entry = _update_stock_indicators_of_symbol(symbol=symbol,
+                                                       stock_info=stock_info,
+                                                       stock_indicator_repo=_WORKER_STATE['stock_indicator_repo'],
+                                                       indicators_to_update=_WORKER_STATE['indicators_to_update'],
+                                                       incremental=_WORKER_STATE['incremental'],
+                                                       logger=_WORKER_STATE['logger'],
+                                                       cache=cache,
+                                                       indicator_set_key=_WORKER_STATE['indicator_set_key'])
+            if entry is not None:
+                cache_entries[symbol] = entry
+        except Exception as e:
+            errors[symbol] = repr(e)
+
+    return errors, cache_entries, cache.stats if cache is not None else StockIndicatorCacheStats()
+
+
+def update_all_stock_indicators_batch(logger: logging.Logger,
+                                      stock_value_repo: IStockValueRepository,
+                                      stock_indicator_repo: IStockIndicatorRepository,
+                                      indicators_to_update: list[str],
+                                      batch_size: int = 256,
+                                      ) -> None:
+    """Updates all active stock indicators using the cross-sectional batch engine.
+
+    The charts of up to `batch_size` symbols are aligned into one symbols x dates matrix and the supported
+    indicators (see `get_batch_supported_ids`) are calculated for all of them in one vectorized pass.
+    Other indicators are calculated per symbol. Always recalculates the full history.
+
+    Args:
+        logger (logging.Logger): The logger to use.
+        stock_value_repo (IStockValueRepository): The stock value repository to use.
+        stock_indicator_repo (IStockIndicatorRepository): The stock indicator repository to use.
+        indicators_to_update (list[str]): The indicators which should be calculated for each stock
+        batch_size (int, optional): Number of symbols calculated at once (bounds the memory used). Defaults to 256.
+    """
+    registry = get_stock_indicator_registry()
+    known_ids = []
+    for indicator_id in indicators_to_update:
+        if not registry.get_metadata(indicator_id):
+            logger.warning(f"Could not find indicator with id {indicator_id}. "
+                           f"Skipping (Code: 23489230)")
+            continue
+        known_ids.append(indicator_id)
+
+    batch_ids = [indicator_id for indicator_id in known_ids if indicator_id in get_batch_supported_ids()]
+    other_kernels: dict[type, list[str]] = {}
+    for indicator_id in known_ids:
+        if indicator_id not in batch_ids:
+            other_kernels.setdefault(registry.get_metadata(indicator_id).kernel_cls, []).append(indicator_id)
+
+    symbols = list(stock_value_repo.list_keys())
+    # (the charts of the next batch are read while the current one is calculated and stored)
+    stock_infos = stock_value_repo.get_many(symbols)
+    for start in range(0, len(symbols), batch_size):
+        batch_symbols = symbols[start:start + batch_size]
+        logger.info(f'Updating stock symbols {start + 1} to {start + len(batch_symbols)} '
+                    f'of {len(symbols)} (Code: 943289027)')
+        batch_stock_infos = [stock_info for _, stock_info in itertools.islice(stock_infos, len(batch_symbols))]
+        matrix = UniverseMatrix.from_stock_infos(batch_stock_infos)
+        results = calculate_batch(matrix=matrix, indicator_ids=batch_ids)
+        stock_indicator_repo.store_many(_get_batch_indicators(logger=logger,
+                                                              stock_infos=batch_stock_infos,
+                                                              matrix=matrix,
+                                                              results=results,
+                                                              other_kernels=other_kernels))
+
+
+def _get_batch_indicators(logger: logging.Logger,
+                          stock_infos: list[StockDataInfo],
+                          matrix: UniverseMatrix,
+                          results: dict[str, np.ndarray],
+                          other_kernels: dict[type, list[str]]) -> Iterator[tuple[str, StockIndicators]]:
+    """ the indicators of each symbol of a batch (see `update_all_stock_indicators_batch`), calculated one
+    symbol at a time while the previous ones are stored
+    """
+    for row, stock_info in enumerate(stock_infos):
+        dates = stock_info.get_dates()
+        if not dates:
+            logger.info(f"No new indicator values for {stock_info.symbol} (Code: 32840923)")
+            continue
+
+        positions = matrix.get_positions(stock_info)
+        outputs = {indicator_id: values[row, positions]
+                   for indicator_id, values in results.items()}
+        for kernel_cls, indicator_ids in other_kernels.items():
+            kernel_outputs = calculate_kernel_series(kernel_cls=kernel_cls, data=stock_info)
+            outputs.update({indicator_id: kernel_outputs[indicator_id] for indicator_id in indicator_ids})
+
+        d = {date: {} for date in dates}
+        for indicator_id, values in outputs.items():
+            for date, value in zip(dates, values):
+                d[date][indicator_id] = value
+
+        yield stock_info.symbol, StockIndicators(d)
+
+
+def _get_valid_rows(stock_info: StockDataInfo, fields: tuple[str, ...], stop: int | None = None) -> np.ndarray:
+    """ indices of the rows (before `stop`) where all given fields are available """
+    return np.flatnonzero(np.logical_and.reduce([~np.isnan(column[:stop])
+                                                 for column in stock_info.get_value_arrays(*fields)]))
+
+
+def load_incremental_chart(stock_value_repo: IStockValueRepository,
+                           stock_indicator_repo: IStockIndicatorRepository,
+                           symbol: str,
+                           indicators_to_update: list[str]) -> StockDataInfo | None:
+    """Loads the part of a chart an incremental update (see `update_stock_indicators`) needs: the dates after the
+    latest stored indicator values and the warm-up period in front of them. Only rows where all inputs of an
+    indicator are available count for its warm-up, so the window is widened until there are enough of them.
+
+    The complete chart is loaded if an indicator has no stored value yet or depends on the complete history.
+
+    Args:
+        stock_value_repo (IStockValueRepository): The stock value repository to read the chart from.
+        stock_indicator_repo (IStockIndicatorRepository): The stock indicator repository holding the stored values.
+        symbol (str): The symbol.
+        indicators_to_update (list[str]): The indicators to update.
+
+    Returns:
+        StockDataInfo | None: The (partial) chart, None if the symbol is unknown.
+    """
+    registry = get_stock_indicator_registry()
+    latest_dates = stock_indicator_repo.get_latest_dates(key=symbol)
+    warmups: dict[type, int] = {}
+    for indicator_id in indicators_to_update:
+        metadata = registry.get_metadata(indicator_id)
+        if not metadata:
+            # (skipped by `update_stock_indicators`)
+            continue
+
+        warmup = metadata.kernel_cls.warmup_period()
+        if warmup is None or indicator_id not in latest_dates:
+            return stock_value_repo.get(symbol)
+
+        warmups[metadata.kernel_cls] = warmup
+
+    if not warmups:
+        return stock_value_repo.get(symbol)
+
+    up_to_date_until = min(latest_dates[indicator_id] for indicator_id in indicators_to_update
+                           if indicator_id in latest_dates)
+    rows = max(warmups.values()) + INCREMENTAL_WINDOW_MARGIN
+    while True:
+        history = stock_value_repo.get_latest(symbol, rows, as_of=up_to_date_until)
+        if history is None:
+            return None
+
+        if len(history.columns) < rows:
+            # the chart starts within the window
+            return stock_value_repo.get(symbol)
+
+        if all(len(_get_valid_rows(history, kernel_cls.input_columns())) >= warmup
+               for kernel_cls, warmup in warmups.items()):
+            return stock_value_repo.get_range(symbol, date_from=history.get_dates()[0])
+
+        rows *= 2
 
 
 def update_stock_indicators(
@@ -139,6 +636,8 @@ def update_stock_indicators(
         indicators_to_update: list[str],
         logger: logging.Logger,
         repo: IStockIndicatorRepository,
+        incremental: bool = False,
+        from_date: datetime.date | None = None,
 ):
     """Updates the stock indicator on the disk repository.
 
@@ -147,24 +646,64 @@ def update_stock_indicators(
         indicators_to_update (list[str]): The indicators to update.
         logger (logging.Logger): The logger to use.
         repo (IStockIndicatorRepository): The repository to use.
+        incremental (bool, optional): Only calculate (and store) the dates after the latest date already
+            stored for each indicator. Only the warm-up period of the indicator is used in front of the
+            new dates. Defaults to False.
+        from_date (datetime.date, optional): The values before this date are known to be up to date (e.g., since
+            the chart did not change before it). Calculation starts at this date (or earlier if `incremental`
+            finds older missing values). Defaults to None.
     """
 
+    registry = get_stock_indicator_registry()
+    dates = stock_info.get_dates()
+    latest_dates = repo.get_latest_dates(key=stock_info.symbol) if incremental else {}
+
+    # group the requested indicators by the kernel calculating them (e.g., all MACD lines at once)
+    # and remember the first date index each indicator needs
+    kernels: dict[type, dict[str, int]] = {}
+    for indicator_id in indicators_to_update:
+        metadata = registry.get_metadata(indicator_id)
+
+        if not metadata:
+            logger.warning(f"Could not find indicator with id {indicator_id}. "
+                           f"Skipping (Code: 23489230)")
+            continue
+
+        up_to_date_until = []
+        if from_date is not None:
+            up_to_date_until.append(bisect.bisect_left(dates, from_date))
+        if incremental:
+            up_to_date_until.append(bisect.bisect_right(dates, latest_dates[indicator_id])
+                                    if indicator_id in latest_dates else 0)
+        first_new = min(up_to_date_until, default=0)
+        if first_new == len(dates):
+            logger.debug(f"Indicator {indicator_id} of {stock_info.symbol} is up to date (Code: 23840923)")
+            continue
+
+        kernels.setdefault(metadata.kernel_cls, {})[indicator_id] = first_new
+
     d = {}
-    for date in stock_info.chart.keys():
-        d[date] = {}
-        for indicator_id in indicators_to_update:
-            indicator_cls = get_stock_indicator_by_id(indicator_id)
-
-            if not indicator_cls:
-                logger.warning(f"Could not find indicator with id {indicator_id}. "
-                               f"Skipping (Code: 23489230)")
-                continue
-
-            # add a new column if the indicator does not exist
-            indicator = indicator_cls()
-            value = indicator.calculate(data=stock_info,
-                                        for_date=date)
-            d[date][indicator_id] = value
+    for kernel_cls, first_new_by_id in kernels.items():
+        first_new = min(first_new_by_id.values())
+        data = stock_info
+        warmup = kernel_cls.warmup_period()
+        if warmup is not None and first_new > 0:
+            # kernels only calculate on the rows where all their inputs are available, so the warm-up
+            # counts those rows (rows with missing values in between would shorten it otherwise)
+            valid_rows = _get_valid_rows(stock_info, kernel_cls.input_columns(), stop=first_new)
+            if len(valid_rows) >= warmup:
+                data = stock_info.slice_from(dates[valid_rows[-warmup]])
+
+        # calculate the whole (warm-up) history at once and spread the new values over the dates
+        outputs = calculate_kernel_series(kernel_cls=kernel_cls, data=data)
+        offset = len(dates) - len(data.columns)
+        for indicator_id, first in first_new_by_id.items():
+            for date, value in zip(dates[first:], outputs[indicator_id][first - offset:]):
+                d.setdefault(date, {})[indicator_id] = value
+
+    if not d:
+        logger.info(f"No new indicator values for {stock_info.symbol} (Code: 32840923)")
+        return
 
     repo.store(key=stock_info.symbol,
                value=StockIndicators(d))
@@ -69,7 +69,8 @@ def generate_gpt_query(symbol: str,
 
     # gather stock values
     logger.info(_("Gathering stock values for {symbol} (Code: 4823094)").format(symbol=symbol))
-    symbol_data = stock_value_repo.get(symbol)
+    # (the sample of the older history needs all values before the queried ones)
+    symbol_data = stock_value_repo.get_range(symbol, date_to=for_date)
     if symbol_data is None:
         raise StockGptException(_("No data for symbol {symbol} (Code: 94823094)").format(symbol=symbol))
 
@@ -85,24 +86,23 @@ def generate_gpt_query(symbol: str,
     relevant_market_indicators = {}
     for market_indicator in market_indicator_repo.list_keys():
         relevant_market_indicators[market_indicator] = {}
-        vals = market_indicator_repo.get(market_indicator)
+        vals = market_indicator_repo.get_latest(market_indicator,
+                                                n=market_indicators_max_value_count,
+                                                as_of=for_date) or {}
         for date, value in sorted(vals.items(), key=lambda x: x[0], reverse=True):
-            if date > for_date:
-                continue
             relevant_market_indicators[market_indicator][date] = value
-            if len(relevant_market_indicators[market_indicator]) >= market_indicators_max_value_count:
-                break
 
     # gather stock indicators
     logger.info(_("Gathering stock indicators for {symbol} (Code: 203482394)").format(symbol=symbol))
-    stock_indicators = stock_indicator_repo.get(symbol)
+    stock_indicators = stock_indicator_repo.get_range(symbol,
+                                                      date_from=for_date - datetime.timedelta(
+                                                          days=stock_indicators_max_age),
+                                                      date_to=for_date)
     if stock_indicators is None:
         raise StockGptException(_("No stock indicators for symbol {symbol} (Code: 234234234)").format(symbol=symbol))
 
     relevant_stock_indicators = {}
     for date, stock_indicators in stock_indicators.items():
-        if date > for_date or date < for_date - datetime.timedelta(days=stock_indicators_max_age):
-            continue
         relevant_stock_indicators[date] = {}
 
         for stock_indicator, value in stock_indicators.items():
@@ -112,11 +112,11 @@ def generate_gpt_query(symbol: str,
     info = fetch_basic_stock_info(symbol)
     logger.info(_("Fetching news for {symbol} (Code: 3423482)").format(symbol=symbol))
     relevant_news = []
-    for article in news_repo.get(symbol) or []:
-        date_news = datetime.date.fromtimestamp(article.published_at.timestamp())
-        if for_date >= date_news >= (for_date - datetime.timedelta(days=max_news_age)):
-            if article.title not in [x.title for x in relevant_news]: # don't add duplicates
-                relevant_news.append(article)
+    for article in news_repo.get_range(symbol,
+                                       date_from=for_date - datetime.timedelta(days=max_news_age),
+                                       date_to=for_date) or []:
+        if article.title not in [x.title for x in relevant_news]: # don't add duplicates
+            relevant_news.append(article)
 
     # shuffle and limit news
     shuffle(relevant_news)
@@ -27,6 +27,9 @@ from pathlib import Path
 from exceptions.config import StockGptConfigException
 from misc.utils import read_market_indicator_defaults, read_stock_indicator_defaults
 
+STOCK_VALUE_BACKENDS = ('csv', 'parquet', 'mmap')
+REPOSITORY_BACKENDS = ('files', 'sqlite')
+
 
 @dataclasses.dataclass
 class AppConfig:
@@ -43,6 +46,27 @@ class AppConfig:
     default_market_indicators: list[str] = dataclasses.field(default_factory=lambda: [])
     default_stock_indicators: list[str] = dataclasses.field(default_factory=lambda: [])
 
+    stock_value_backend: str = dataclasses.field(default='csv')
+    """ storage format of the stock values (charts): `csv`, `parquet` (needs pyarrow) or `mmap` (one memory mapped
+    file for all symbols) """
+
+    repository_backend: str = dataclasses.field(default='files')
+    """ where all data is stored: `files` (one directory per data type, see `stock_value_backend`) or `sqlite`
+    (one database, see `sqlite_database_file`) """
+
+    repository_cache_size: int = dataclasses.field(default=64)
+    """ memory budget (MiB) for caching repository reads within a process (0 disables the cache) """
+
+    provider_rate_limits: str | dict[str, float] = dataclasses.field(default='')
+    """ requests per second per data provider, overriding the defaults of `fetch.rate_limit.PROVIDER_RATE_LIMITS`
+    (given as `provider=rate,...`, e.g., `yahoo=5,fred=2`; a dict after initialization) """
+
+    http_timeout: float = dataclasses.field(default=30.)
+    """ seconds to wait for connecting to and for each read from a data provider """
+
+    http_max_retries: int = dataclasses.field(default=3)
+    """ retries of requests failing transiently (connection errors, timeouts, status 429 and 5xx) """
+
     @property
     def market_indicator_base_dir(self) -> Path:
         return self.data_base_dir / 'stock_data' / 'market_indicators'
@@ -67,6 +91,14 @@ class AppConfig:
     def stock_indicators_base_dir(self) -> Path:
         return self.data_base_dir / 'stock_data' / 'stock_indicators'
 
+    @property
+    def stock_indicators_cache_file(self) -> Path:
+        return self.data_base_dir / 'stock_data' / 'stock_indicators_cache.json'
+
+    @property
+    def sqlite_database_file(self) -> Path:
+        return self.data_base_dir / 'stock_data' / 'stock_gpt.sqlite'
+
     @classmethod
     def from_env(cls, omit_api_key_check: bool = False) -> 'Self':
         collected_env = {}
@@ -107,6 +139,37 @@ class AppConfig:
             defaults = read_stock_indicator_defaults(self.default_stock_indicator_dictionary_file)
             self.default_stock_indicators = list(defaults.keys())
 
+        if self.stock_value_backend not in STOCK_VALUE_BACKENDS:
+            raise StockGptConfigException(f"Unknown stock value backend {self.stock_value_backend} "
+                                          f"(use one of {', '.join(STOCK_VALUE_BACKENDS)}) (Code: 3249823095)")
+
+        if self.repository_backend not in REPOSITORY_BACKENDS:
+            raise StockGptConfigException(f"Unknown repository backend {self.repository_backend} "
+                                          f"(use one of {', '.join(REPOSITORY_BACKENDS)}) (Code: 3249823096)")
+
+        try:
+            self.repository_cache_size = int(self.repository_cache_size)
+        except ValueError:
+            raise StockGptConfigException(f"Repository cache size {self.repository_cache_size} is no number "
+                                          f"(Code: 3249823097)")
+
+        if isinstance(self.provider_rate_limits, str):
+            try:
+                self.provider_rate_limits = {provider.strip(): float(rate)
+                                             for provider, rate in (item.split('=')
+                                                                    for item in self.provider_rate_limits.split(',')
+                                                                    if item.strip())}
+            except ValueError:
+                raise StockGptConfigException(f"Provider rate limits {self.provider_rate_limits} are not given as "
+                                              f"provider=rate,... (Code: 3249823098)")
+
+        try:
+            self.http_timeout = float(self.http_timeout)
+            self.http_max_retries = int(self.http_max_retries)
+        except ValueError:
+            raise StockGptConfigException(f"HTTP timeout {self.http_timeout} or retries {self.http_max_retries} "
+                                          f"are no numbers (Code: 3249823099)")
+
         if not self._omit_api_key_check:
             if self.fred_api_key is None or not self.fred_api_key:
                 raise StockGptConfigException("No FRED API key given (use environment the variable"
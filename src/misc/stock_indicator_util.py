@@ -16,26 +16,18 @@
 #########################################################################
 from __future__ import annotations
 
-import inspect
 from typing import Type
 
 from stock_indicators.i_indicator import IStockIndicator
-import stock_indicators.indicator_impl as indicator_module
+from stock_indicators.registry import get_stock_indicator_registry
 
 
 def get_stock_indicator_by_id(id) -> Type[IStockIndicator] | None:
-    """ will find a stock indicator by its id if available
+    """ will find a stock indicator by its id if available (built-in or plugin)
 
     Args:
         id (str): the id of the indicator to find
     Returns:
         IStockIndicator | None: the indicator if found or None
     """
-    # find all classes in the indicator module
-    classes = inspect.getmembers(indicator_module, inspect.isclass)
-    # filter the classes to only include the stock indicators
-    stock_indicators = [c for c in classes if issubclass(c[1], IStockIndicator)]
-    # find the indicator with the given id
-    indicator = next((i for i in stock_indicators if i[1].id() == id), None)
-
-    return indicator[1] if indicator else None
+    return get_stock_indicator_registry().get(id)
@@ -0,0 +1,259 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Read-through LRU cache around any repository                   #
+#########################################################################
+from __future__ import annotations
+
+import collections
+import dataclasses
+import datetime
+import sys
+import threading
+from typing import Any, Hashable, Iterable, Iterator
+
+import numpy as np
+
+from repository.i_repository import IRepository, TRepositoryType, DEFAULT_IO_WORKERS
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclasses.dataclass
+class CachedRepositoryStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    """ entries dropped since their data changed (by a store or in the underlying files) """
+    evictions: int = 0
+    """ entries dropped to stay within the memory budget """
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.
+
+
+def estimate_size(value: Any, _seen: set[int] | None = None) -> int:
+    """ rough number of bytes a value (including the objects it references) occupies """
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        # views (e.g., of memory mapped files) do not own their data
+        return sys.getsizeof(value) + (value.nbytes if value.base is None else 0)
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), seen)
+    elif dataclasses.is_dataclass(value):
+        size += sum(estimate_size(getattr(value, field.name), seen) for field in dataclasses.fields(value))
+
+    return size
+
+
+@dataclasses.dataclass
+class _CacheEntry:
+    value: Any
+    stamp: Hashable | None
+    size: int
+
+
+class CachedRepository(IRepository[TRepositoryType]):
+    """ Caches the reads (`get`, `get_many`, `get_range`, `get_latest`, `get_latest_dates`) of another repository.
+
+    The least recently used entries are evicted once the estimated size of all entries exceeds the budget.
+    Entries of a key are invalidated by storing the key through this wrapper and whenever the source stamp of
+    the key changes (see `IRepository.get_source_stamp`, e.g., the file's modification time and size), which is
+    checked on every hit. All other methods are passed through to the wrapped repository.
+
+    Cached values are shared between callers and must not be modified.
+    """
+    _repository: IRepository[TRepositoryType]
+    _max_bytes: int
+    _entries: collections.OrderedDict[tuple, _CacheEntry]
+    _size: int
+    _lock: threading.Lock
+    stats: CachedRepositoryStats
+
+    def __init__(self, repository: IRepository[TRepositoryType], max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            repository (IRepository): The repository to cache
+            max_bytes (int, optional): Memory budget of the cached values. Defaults to 64 MiB.
+        """
+        super().__init__(logger=repository._logger)
+        self._repository = repository
+        self._max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = CachedRepositoryStats()
+
+    def __getstate__(self):
+        # the cached values stay in this process (e.g., when handed to worker processes)
+        return {**self.__dict__, '_entries': collections.OrderedDict(), '_size': 0, '_lock': None}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        # everything not cached (e.g., `compact`) is answered by the wrapped repository
+        if name.startswith('__') or name == '_repository':
+            raise AttributeError(name)
+
+        return getattr(self._repository, name)
+
+    @property
+    def repository(self) -> IRepository[TRepositoryType]:
+        """ the wrapped repository """
+        return self._repository
+
+    def _drop(self, cache_key: tuple) -> None:
+        entry = self._entries.pop(cache_key)
+        self._size -= entry.size
+
+    def _lookup(self, cache_key: tuple, stamp: Hashable | None) -> tuple[bool, Any]:
+        """ (True, value) if the key is cached with the given stamp, (False, None) otherwise (counted as a miss) """
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                if entry.stamp == stamp:
+                    self._entries.move_to_end(cache_key)
+                    self.stats.hits += 1
+                    return True, entry.value
+
+                self._drop(cache_key)
+                self.stats.invalidations += 1
+
+            self.stats.misses += 1
+            return False, None
+
+    def _put(self, cache_key: tuple, stamp: Hashable | None, value: Any) -> None:
+        size = estimate_size(value)
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            if cache_key in self._entries:
+                self._drop(cache_key)
+
+            self._entries[cache_key] = _CacheEntry(value=value, stamp=stamp, size=size)
+            self._size += size
+            while self._size > self._max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def _read(self, method: str, key: str, *args) -> Any:
+        cache_key = (method, key, *args)
+        # (the stamp is taken before reading, so changes made meanwhile invalidate the entry later)
+        stamp = self._repository.get_source_stamp(key)
+        found, value = self._lookup(cache_key, stamp)
+        if not found:
+            # (read outside the lock, so other keys can be served meanwhile)
+            value = getattr(self._repository, method)(key, *args)
+            self._put(cache_key, stamp, value)
+
+        return value
+
+    def invalidate(self, key: str | None = None) -> None:
+        """ drops the cached entries of the given key (all entries if None) """
+        with self._lock:
+            for cache_key in [cache_key for cache_key in self._entries if key is None or cache_key[1] == key]:
+                self._drop(cache_key)
+                self.stats.invalidations += 1
+
+    def get(self, key: str) -> TRepositoryType | None:
+        return self._read('get', key)
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> TRepositoryType | None:
+        return self._read('get_range', key, date_from, date_to)
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> TRepositoryType | None:
+        return self._read('get_latest', key, n, as_of)
+
+    def get_latest_dates(self, key: str) -> dict[str, datetime.date]:
+        """ see `IStockIndicatorRepository.get_latest_dates` """
+        return self._read('get_latest_dates', key)
+
+    def get_many(self,
+                 keys: Iterable[str],
+                 max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[tuple[str, TRepositoryType | None]]:
+        # the keys which are not cached are read by the wrapped repository at once (e.g., in one query)
+        keys = list(keys)
+        stamps = {key: self._repository.get_source_stamp(key) for key in keys}
+        hits = {}
+        for key, stamp in stamps.items():
+            found, value = self._lookup(('get', key), stamp)
+            if found:
+                hits[key] = value
+
+        missing = [key for key in stamps if key not in hits]
+        loaded = iter(self._repository.get_many(missing, max_workers=max_workers))
+        missing = set(missing)
+        for key in keys:
+            if key in hits:
+                yield key, hits[key]
+            elif key in missing:
+                missing.remove(key)
+                _, value = next(loaded)
+                self._put(('get', key), stamps[key], value)
+                yield key, value
+            else:
+                # repeated key
+                yield key, self.get(key)
+
+    def store(self, key: str, value: TRepositoryType) -> None:
+        try:
+            self._repository.store(key, value)
+        finally:
+            self.invalidate(key)
+
+    def store_many(self, items: Iterable[tuple[str, TRepositoryType]], max_workers: int = DEFAULT_IO_WORKERS) -> None:
+        stored = set()
+
+        def remember(items: Iterable[tuple[str, TRepositoryType]]) -> Iterator[tuple[str, TRepositoryType]]:
+            for key, value in items:
+                stored.add(key)
+                yield key, value
+
+        # (the items are handed through lazily)
+        try:
+            self._repository.store_many(remember(items), max_workers=max_workers)
+        finally:
+            for key in stored:
+                self.invalidate(key)
+
+    def delete_after(self, key: str, date: datetime.date) -> None:
+        """ see `IStockIndicatorRepository.delete_after` """
+        try:
+            self._repository.delete_after(key, date)
+        finally:
+            self.invalidate(key)
+
+    def list_keys(self) -> Iterable[str]:
+        return self._repository.list_keys()
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return self._repository.get_source_stamp(key)
@@ -0,0 +1,212 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Shared (vectorized) reading and writing of the CSV files of   #
+# the file based repositories                                           #
+#########################################################################
+from __future__ import annotations
+
+import csv
+import io
+import os
+from pathlib import Path
+from typing import BinaryIO, Container
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    CSV_ENGINE = 'pyarrow'
+    _ARROW_TYPES = {'float64': pa.float64, 'str': pa.string}
+except ImportError:  # optional dependency
+    pa = pa_csv = None
+    CSV_ENGINE = 'c'
+    _ARROW_TYPES = {}
+
+SEARCH_LINEAR_BYTES = 4096
+TAIL_CHUNK_SIZE = 64 * 1024
+
+
+def read_typed_csv(path: Path, dtypes: dict[str, str] | None = None, default_dtype: str = 'float64',
+                   start: int | None = None, stop: int | None = None) -> pd.DataFrame:
+    """ reads a CSV file with explicit column types (no type or date inference by pandas)
+
+    Args:
+        path (Path): The file to read
+        dtypes (dict[str, str], optional): column -> dtype for the columns not using the default. Date columns should
+            be read as `str` and converted with `decode_dates` / `decode_timestamps`. Defaults to None.
+        default_dtype (str, optional): The dtype of all other columns. Defaults to `float64`.
+        start (int, optional): Only read the lines from this byte offset on (a line start after the header,
+            e.g., found by `find_date_offset`). Defaults to None (all lines).
+        stop (int, optional): Only read the lines before this byte offset. Defaults to None (until the end).
+    Returns:
+        pd.DataFrame: The content
+    """
+    dtypes = dtypes or {}
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+        source = path
+        if start is not None or stop is not None:
+            f.seek(max(start or 0, len(header_line)))
+            source = io.BytesIO(header_line + f.read(-1 if stop is None else max(stop - f.tell(), 0)))
+
+    header = next(csv.reader([header_line.decode()]), [])
+    column_types = {column: dtypes.get(column, default_dtype) for column in header}
+    # text may hold quoted line breaks (e.g., news summaries), which pyarrow only accepts when told to
+    # (parsing is slower then, so numeric files do without)
+    has_text = 'str' in column_types.values()
+    if pa_csv is not None and all(dtype in _ARROW_TYPES for dtype in column_types.values()):
+        # pandas' pyarrow engine converts explicitly typed text columns considerably slower than pyarrow itself
+        table = pa_csv.read_csv(source,
+                                parse_options=pa_csv.ParseOptions(newlines_in_values=has_text),
+                                convert_options=pa_csv.ConvertOptions(
+                                    column_types={column: _ARROW_TYPES[dtype]() for column, dtype in
+                                                  column_types.items()},
+                                    strings_can_be_null=True))
+        return table.to_pandas()
+
+    # (pandas' pyarrow engine cannot read line breaks within values at all)
+    return pd.read_csv(source,
+                       index_col=None,
+                       dtype=column_types,
+                       engine='c' if has_text else CSV_ENGINE)
+
+
+def find_date_offset(f: BinaryIO, date: str, skip_dates: Container[bytes] = ()) -> int:
+    """ binary search for the first line starting with a date at or after `date` in a CSV file sorted by its
+    leading ISO date column (as written by the file repositories)
+
+    Args:
+        f (BinaryIO): The file (opened binary)
+        date (str): The date to search (`YYYY-MM-DD`)
+        skip_dates (Container[bytes], optional): Dates of lines which are not sorted in (e.g., appended revisions).
+            They are skipped over and have to be handled by the caller. Defaults to ().
+    Returns:
+        int: Byte offset of the line start (the end of the file if all dates are before `date`).
+            If dates are skipped, the offset may be before the searched line (never after it), so callers filter
+            the rows they read
+    """
+    f.seek(0)
+    lo = len(f.readline())
+    hi = f.seek(0, os.SEEK_END)
+    target = date.encode()
+
+    # invariant: the searched line starts within [lo, hi] (returning an earlier line start is fine)
+    while hi - lo > SEARCH_LINEAR_BYTES:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()
+        start = f.tell()
+        if start >= hi:
+            break
+
+        line = f.readline()
+        while line[:10] in skip_dates and f.tell() < hi:
+            line = f.readline()
+
+        if line[:10] < target and line[:10] not in skip_dates:
+            lo = f.tell()
+        else:
+            hi = start
+
+    # search the rest linearly
+    f.seek(lo)
+    position = lo
+    while position < hi:
+        line = f.readline()
+        if line[:10] >= target and line[:10] not in skip_dates:
+            return position
+
+        position += len(line)
+
+    return hi
+
+
+def find_offset_of_lines_before(f: BinaryIO, stop: int, count: int) -> int:
+    """ byte offset of the `count`-th line before the line starting at `stop` (at most the first line after the
+    header), found by reading the file backwards
+
+    Args:
+        f (BinaryIO): The file (opened binary)
+        stop (int): The byte offset to count back from (a line start or the end of the file)
+        count (int): The number of lines
+    Returns:
+        int: The byte offset
+    """
+    f.seek(0)
+    header_end = len(f.readline())
+    position = stop
+    # the line ending right before `stop` does not count
+    skip_newlines = 1
+    while position > header_end:
+        size = min(TAIL_CHUNK_SIZE, position - header_end)
+        position -= size
+        f.seek(position)
+        chunk = f.read(size)
+        index = len(chunk)
+        while True:
+            index = chunk.rfind(b'\n', 0, index)
+            if index < 0:
+                break
+
+            if skip_newlines:
+                skip_newlines -= 1
+                continue
+
+            count -= 1
+            if count <= 0:
+                return position + index + 1
+
+    return header_end
+
+
+def decode_dates(values: pd.Series) -> np.ndarray:
+    """ converts ISO formatted dates (optionally with a time) to datetime64[D] """
+    try:
+        # numpy parses plain ISO dates considerably faster than pandas
+        return np.array(values.tolist(), dtype='datetime64[D]')
+    except ValueError:
+        return pd.to_datetime(values, format='ISO8601').to_numpy(dtype='datetime64[D]')
+
+
+def decode_date_list(values: pd.Series) -> list:
+    """ converts ISO formatted dates to a list of `datetime.date` """
+    return decode_dates(values).tolist()
+
+
+def decode_timestamps(values: pd.Series) -> np.ndarray:
+    """ converts ISO formatted date times to seconds since epoch (float). Times without time zone are taken as UTC """
+    return pd.to_datetime(values, format='ISO8601', utc=True).to_numpy(dtype='datetime64[us]').astype(np.int64) / 1e6
+
+
+def write_typed_csv(path: Path, df: pd.DataFrame) -> None:
+    """ writes a frame of plain (unquoted) text and number columns, replacing the file at once.
+    Uses pyarrow's (considerably faster) writer if available.
+
+    Args:
+        path (Path): The file to write
+        df (pd.DataFrame): The content (the index is not written)
+    """
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    if pa_csv is None:
+        df.to_csv(tmp_path, index=False)
+    else:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with open(tmp_path, 'wb') as f:
+            f.write((','.join(df.columns) + '\n').encode())
+            pa_csv.write_csv(table, f, pa_csv.WriteOptions(include_header=False, quoting_style='none'))
+
+    tmp_path.replace(path)
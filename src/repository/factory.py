@@ -0,0 +1,111 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Creates the repositories configured in the AppConfig           #
+#########################################################################
+from __future__ import annotations
+
+import logging
+from typing import TypeVar
+
+from misc.config import AppConfig
+from repository.cached_repository import CachedRepository
+from repository.market_indicator.i_market_indicator_repository import IMarketIndicatorRepository
+from repository.market_indicator.market_indicator_file_repository import MarketIndicatorFileRepository
+from repository.market_indicator.market_indicator_sqlite_repository import MarketIndicatorSqliteRepository
+from repository.news.i_news_article_repository import INewsArticleRepository
+from repository.news.news_article_file_repository import NewsArticleFileRepository
+from repository.news.news_article_sqlite_repository import NewsArticleSqliteRepository
+from repository.sqlite_database import SqliteDatabase
+from repository.stock_indicator.i_stock_indicator_repository import IStockIndicatorRepository
+from repository.stock_indicator.stock_indicator_file_repository import StockIndicatorFileRepository
+from repository.stock_indicator.stock_indicator_sqlite_repository import StockIndicatorSqliteRepository
+from repository.stock_value.i_stock_value_repository import IStockValueRepository
+from repository.stock_value.stock_value_file_repository import StockValueFileRepository
+from repository.stock_value.stock_value_mmap_repository import StockValueMmapRepository
+from repository.stock_value.stock_value_parquet_repository import StockValueParquetRepository
+from repository.stock_value.stock_value_sqlite_repository import StockValueSqliteRepository
+
+TRepository = TypeVar('TRepository')
+
+
+def _get_sqlite_database(app_config: AppConfig) -> SqliteDatabase:
+    return SqliteDatabase(path=app_config.sqlite_database_file)
+
+
+def _with_cache(repository: TRepository, app_config: AppConfig) -> TRepository:
+    """ wraps the repository into a read cache if enabled (`AppConfig.repository_cache_size`) """
+    if app_config.repository_cache_size <= 0:
+        return repository
+
+    return CachedRepository(repository, max_bytes=app_config.repository_cache_size * 1024 * 1024)
+
+
+def create_stock_value_repository(app_config: AppConfig, logger: logging.Logger) -> IStockValueRepository:
+    """ creates the stock value repository of the configured backend
+    (`AppConfig.repository_backend` and `AppConfig.stock_value_backend`)
+
+    Args:
+        app_config (AppConfig): The app config
+        logger (logging.Logger): The logger handed to the repository
+    Returns:
+        IStockValueRepository: The repository (wrapped into a read cache if enabled)
+    """
+    if app_config.repository_backend == 'sqlite':
+        repository = StockValueSqliteRepository(database=_get_sqlite_database(app_config), logger=logger)
+    else:
+        repository = create_stock_value_file_repository(app_config=app_config, logger=logger)
+
+    return _with_cache(repository, app_config=app_config)
+
+
+def create_stock_value_file_repository(app_config: AppConfig, logger: logging.Logger) -> IStockValueRepository:
+    """ creates the file based stock value repository of the configured format (`AppConfig.stock_value_backend`) """
+    if app_config.stock_value_backend == 'parquet':
+        return StockValueParquetRepository(base_path=app_config.stock_value_base_dir, logger=logger)
+
+    if app_config.stock_value_backend == 'mmap':
+        return StockValueMmapRepository(base_path=app_config.stock_value_base_dir, logger=logger)
+
+    return StockValueFileRepository(base_path=app_config.stock_value_base_dir, logger=logger)
+
+
+def create_stock_indicator_repository(app_config: AppConfig, logger: logging.Logger) -> IStockIndicatorRepository:
+    """ creates the stock indicator repository of the configured backend (`AppConfig.repository_backend`) """
+    if app_config.repository_backend == 'sqlite':
+        repository = StockIndicatorSqliteRepository(database=_get_sqlite_database(app_config), logger=logger)
+    else:
+        repository = StockIndicatorFileRepository(base_path=app_config.stock_indicators_base_dir, logger=logger)
+
+    return _with_cache(repository, app_config=app_config)
+
+
+def create_market_indicator_repository(app_config: AppConfig, logger: logging.Logger) -> IMarketIndicatorRepository:
+    """ creates the market indicator repository of the configured backend (`AppConfig.repository_backend`) """
+    if app_config.repository_backend == 'sqlite':
+        repository = MarketIndicatorSqliteRepository(database=_get_sqlite_database(app_config), logger=logger)
+    else:
+        repository = MarketIndicatorFileRepository(base_path=app_config.market_indicator_base_dir, logger=logger)
+
+    return _with_cache(repository, app_config=app_config)
+
+
+def create_news_article_repository(app_config: AppConfig, logger: logging.Logger) -> INewsArticleRepository:
+    """ creates the news article repository of the configured backend (`AppConfig.repository_backend`) """
+    if app_config.repository_backend == 'sqlite':
+        repository = NewsArticleSqliteRepository(database=_get_sqlite_database(app_config), logger=logger)
+    else:
+        repository = NewsArticleFileRepository(base_path=app_config.default_news_article_base_dir, logger=logger)
+
+    return _with_cache(repository, app_config=app_config)
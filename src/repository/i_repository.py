@@ -17,11 +17,19 @@
 from __future__ import annotations
 
 import abc
+import collections
+import datetime
 import logging
-from typing import Iterable, TypeVar, Generic
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Callable, Hashable, Iterable, Iterator, TypeVar, Generic
 
 
 TRepositoryType = TypeVar('TRepositoryType')
+TItem = TypeVar('TItem')
+TResult = TypeVar('TResult')
+
+DEFAULT_IO_WORKERS = 4
 
 
 class IRepository(abc.ABC, Generic[TRepositoryType]):
@@ -39,6 +47,95 @@ class IRepository(abc.ABC, Generic[TRepositoryType]):
         """ update or create """
         pass
 
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> TRepositoryType | None:
+        """ get the values of the dates within [date_from, date_to] (both inclusive, open if `None`).
+        Backends load only the requested dates if they can (e.g., binary search in sorted files, index seeks)
+
+        Args:
+            key (str): The key
+            date_from (datetime.date, optional): The first date. Defaults to None.
+            date_to (datetime.date, optional): The last date. Defaults to None.
+        Returns:
+            TRepositoryType | None: The values (empty if no date is in range), None if the key is unknown
+        """
+        pass
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> TRepositoryType | None:
+        """ get the values of the latest `n` dates at or before `as_of`
+
+        Args:
+            key (str): The key
+            n (int): The number of dates
+            as_of (datetime.date, optional): The last date to consider. Defaults to None (all dates).
+        Returns:
+            TRepositoryType | None: The values (empty if no date is in range), None if the key is unknown
+        """
+        pass
+
+    def get_many(self,
+                 keys: Iterable[str],
+                 max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[tuple[str, TRepositoryType | None]]:
+        """ get the values of several keys. Yields (key, value) in the order of `keys` while the following keys are
+        still loading, so callers can process the values as they arrive.
+        By default, the keys are read by a pool of threads (reading files and decoding them largely happens without
+        holding the GIL). Backends which can read many keys at once (e.g., databases) do so instead
+
+        Args:
+            keys (Iterable[str]): The keys
+            max_workers (int, optional): Number of threads reading at once. Defaults to 4.
+        Returns:
+            Iterator[tuple[str, TRepositoryType | None]]: key and value (None if the key is unknown)
+        """
+        return map_in_threads(lambda key: (key, self.get(key)), keys, max_workers=max_workers)
+
+    def store_many(self, items: Iterable[tuple[str, TRepositoryType]], max_workers: int = DEFAULT_IO_WORKERS) -> None:
+        """ update or create several keys. Stores of different keys overlap (see `get_many`), a repeated key waits
+        for its previous store, so the result is the same as storing the items one after another.
+        The items are consumed as the stores progress, so they can be produced lazily (e.g., by a generator
+        calculating them)
+
+        Args:
+            items (Iterable[tuple[str, TRepositoryType]]): key and value
+            max_workers (int, optional): Number of threads storing at once. Defaults to 4.
+        """
+        if max_workers <= 1:
+            for key, value in items:
+                self.store(key, value)
+            return
+
+        pending: collections.deque[tuple[str, Future]] = collections.deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            try:
+                for key, value in items:
+                    for pending_key, future in pending:
+                        if pending_key == key:
+                            future.result()
+                    if len(pending) >= 2 * max_workers:
+                        pending.popleft()[1].result()
+
+                    pending.append((key, pool.submit(self.store, key, value)))
+
+                while pending:
+                    pending.popleft()[1].result()
+            finally:
+                # stop early on errors
+                for _, future in pending:
+                    future.cancel()
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        """ a value which changes whenever the stored data of the key changes (e.g., the file's modification time
+        and size), used to invalidate caches. `None` if the backend cannot tell
+
+        Args:
+            key (str): The key
+        Returns:
+            Hashable | None: The stamp
+        """
+        return None
+
     def __init__(self, logger: logging.Logger):
         self._logger = logger
 
@@ -53,3 +150,49 @@ class IRepository(abc.ABC, Generic[TRepositoryType]):
 
     def log_warning(self, msg: str):
         self._logger.warning(msg)
+
+
+def get_file_stamp(path: Path) -> tuple[int, int] | None:
+    """ modification time (ns) and size of a file (see `IRepository.get_source_stamp`), None if it does not exist """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def map_in_threads(function: Callable[[TItem], TResult],
+                   items: Iterable[TItem],
+                   max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[TResult]:
+    """ applies the function to the items using a pool of threads and yields the results in the order of the items.
+    At most `2 * max_workers` items are in flight, so the items are consumed lazily and results which are not
+    fetched yet do not pile up. Errors are raised when the result of their item is reached
+
+    Args:
+        function (Callable): The function
+        items (Iterable): The items
+        max_workers (int, optional): Number of threads. Defaults to 4 (1 or less runs everything in the caller's
+            thread).
+    Returns:
+        Iterator: The results
+    """
+    if max_workers <= 1:
+        yield from map(function, items)
+        return
+
+    pending: collections.deque[Future] = collections.deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        try:
+            for item in items:
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+
+                pending.append(pool.submit(function, item))
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # e.g., the caller stopped iterating or an error occurred
+            for future in pending:
+                future.cancel()
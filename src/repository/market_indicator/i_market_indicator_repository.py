@@ -16,6 +16,7 @@
 #########################################################################
 from __future__ import annotations
 
+import datetime
 from abc import abstractmethod
 
 from datatypes.market_indicator import MarketIndicator
@@ -35,3 +36,23 @@ class IMarketIndicatorRepository(IRepository[MarketIndicator]):
     @abstractmethod
     def list_keys(self) -> list[str]:
         pass
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> MarketIndicator | None:
+        """ filters all values by default (see `IRepository.get_range`) """
+        values = self.get(key)
+        if values is None:
+            return None
+
+        return MarketIndicator({date: value for date, value in values.items()
+                                if (date_from is None or date >= date_from) and (date_to is None or date <= date_to)})
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> MarketIndicator | None:
+        """ filters all values by default (see `IRepository.get_latest`) """
+        values = self.get_range(key, date_to=as_of)
+        if values is None:
+            return None
+
+        return MarketIndicator({date: values[date] for date in sorted(values)[-n:] if n > 0})
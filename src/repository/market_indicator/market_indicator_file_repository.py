@@ -18,13 +18,16 @@
 from __future__ import annotations
 
 import datetime
+import os
 from pathlib import Path
-from typing import Iterable
+from typing import Hashable, Iterable
 
 import pandas as pd
 
 from datatypes.market_indicator import MarketIndicator
 from exceptions.repository import StockGptRepositoryException
+from repository.csv_codec import read_typed_csv, decode_date_list, find_date_offset, find_offset_of_lines_before
+from repository.i_repository import get_file_stamp
 from repository.market_indicator.i_market_indicator_repository import IMarketIndicatorRepository
 
 
@@ -38,30 +41,56 @@ class MarketIndicatorFileRepository(IMarketIndicatorRepository):
 
         self._base_path = base_path
 
+    @staticmethod
+    def _read(file_path: Path, start: int | None = None, stop: int | None = None) -> MarketIndicator:
+        """ reads the rows within the given byte offsets (see `read_typed_csv`) """
+        df = read_typed_csv(file_path, dtypes={'date': 'str', 'value': 'str'}, start=start, stop=stop)
+        values = pd.to_numeric(df['value'], errors='coerce')
+        # values which are no numbers at all are None (missing ones stay NaN)
+        values = values.astype(object).where(values.notna() | df['value'].isna(), None)
+
+        return MarketIndicator(dict(zip(decode_date_list(df['date']), values.tolist())))
+
     def get(self, key: str) -> MarketIndicator | None:
         file_path = self._base_path / f'{key}.csv'
         if file_path.exists():
-            d = {}
-            df = pd.read_csv(file_path, index_col=None, parse_dates=['date'])
-            for _, line in df.iterrows():
-                try:
-                    val = float(line['value'])
-                except (ValueError, TypeError):
-                    val = None
-
-                d[datetime.date(line['date'].year,
-                                line['date'].month,
-                                line['date'].day)] = val
-
-            return MarketIndicator(d)
+            return self._read(file_path)
         else:
             return None
 
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> MarketIndicator | None:
+        file_path = self._base_path / f'{key}.csv'
+        if not file_path.exists():
+            return None
+
+        # the file is sorted by date
+        with open(file_path, 'rb') as f:
+            start = find_date_offset(f, str(date_from)) if date_from is not None else None
+            stop = find_date_offset(f, str(date_to + datetime.timedelta(days=1))) if date_to is not None else None
+
+        return self._read(file_path, start=start, stop=stop)
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> MarketIndicator | None:
+        file_path = self._base_path / f'{key}.csv'
+        if not file_path.exists():
+            return None
+
+        with open(file_path, 'rb') as f:
+            stop = find_date_offset(f, str(as_of + datetime.timedelta(days=1))) if as_of is not None \
+                else f.seek(0, os.SEEK_END)
+            start = find_offset_of_lines_before(f, stop, n) if n > 0 else stop
+
+        return self._read(file_path, start=start, stop=stop)
+
     def store(self, key: str, value: MarketIndicator):
         file_path = self._base_path / f'{key}.csv'
         if file_path.exists():
-            # load old data
-            df_old = pd.read_csv(file_path, index_col=None, parse_dates=['date'])
+            # load old data (values stay as written)
+            df_old = read_typed_csv(file_path, dtypes={'date': 'str', 'value': 'str'})
+            df_old['date'] = decode_date_list(df_old['date'])
             self.log_info(f"Updating indicator {key} (Code: 34823904)")
         else:
             # create empty dataframe
@@ -71,21 +100,22 @@ class MarketIndicatorFileRepository(IMarketIndicatorRepository):
         # append new data
         dates = list(value.keys())
         values = list(value.values())
-        df_new = pd.DataFrame({'date': dates, 'value': values})
+        df_new = pd.DataFrame({'date': dates, 'value': values}, dtype=object)
 
-        df_concat = pd.concat([df_old, df_new], axis=0, ignore_index=True)
+        df_concat = pd.concat([df_old.astype(object), df_new], axis=0, ignore_index=True)
 
-        # remove duplicates
+        # remove duplicates (both sides hold datetime.date, so new values replace old ones of the same date)
         df_concat.drop_duplicates(subset=['date'], inplace=True, keep='last')
 
         # sort by date
-        df_concat['date'] = [datetime.date(year=d.year, month=d.month, day=d.day)
-                             for d in df_concat['date']]
-        df_concat.sort_values(by=['date'], inplace=True)
+        df_concat.sort_values(by=['date'], inplace=True, kind='stable')
 
         # ... and save
         df_concat.to_csv(file_path, index=False)
 
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return get_file_stamp(self._base_path / f'{key}.csv')
+
     def list_keys(self) -> Iterable[str]:
         return [path.name.replace('.csv', '') for path in
                 self._base_path.iterdir() if path.is_file() and path.name.endswith('.csv')]
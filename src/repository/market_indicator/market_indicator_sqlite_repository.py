@@ -0,0 +1,101 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: SQLite implementation of the market indicator repository       #
+#########################################################################
+from __future__ import annotations
+
+import datetime
+import sqlite3
+from typing import Hashable, Iterable, Iterator
+
+from datatypes.market_indicator import MarketIndicator
+from repository.i_repository import DEFAULT_IO_WORKERS
+from repository.market_indicator.i_market_indicator_repository import IMarketIndicatorRepository
+from repository.sqlite_database import SqliteDatabase, get_date_condition, to_day_number, from_day_number, \
+    select_grouped, iterate_chunks
+
+
+class MarketIndicatorSqliteRepository(IMarketIndicatorRepository):
+    """ Stores the market indicators in the table `market_indicators` (one row per indicator and date) """
+    _database: SqliteDatabase
+
+    def __init__(self, database: SqliteDatabase, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._database = database
+
+    def _query(self, key: str, condition: str = '', parameters: tuple = (), order: str = 'ASC',
+               limit: int = -1) -> MarketIndicator | None:
+        """ reads the values of the indicator matching the (date) condition (None if the indicator is unknown) """
+        connection = self._database.get_connection()
+        rows = connection.execute(
+            f'SELECT date, value FROM market_indicators WHERE indicator = ? {condition} ORDER BY date {order} LIMIT ?',
+            (key, *parameters, limit)).fetchall()
+        if not rows and connection.execute('SELECT 1 FROM market_indicators WHERE indicator = ? LIMIT 1',
+                                           (key,)).fetchone() is None:
+            return None
+
+        return self._decode(rows)
+
+    @staticmethod
+    def _decode(rows: list[tuple]) -> MarketIndicator:
+        """ the indicator of the (date, value) rows """
+        # (missing values are NaN like in the file repository)
+        return MarketIndicator({from_day_number(day): float('nan') if value is None else value
+                                for day, value in sorted(rows)})
+
+    def get(self, key: str) -> MarketIndicator | None:
+        return self._query(key)
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> MarketIndicator | None:
+        return self._query(key, *get_date_condition(date_from, date_to))
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> MarketIndicator | None:
+        return self._query(key, *get_date_condition(None, as_of), order='DESC', limit=max(n, 0))
+
+    def get_many(self,
+                 keys: Iterable[str],
+                 max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[tuple[str, MarketIndicator | None]]:
+        # one query per chunk of indicators instead of threads
+        for key, rows in select_grouped(self._database.get_connection(),
+                                        'SELECT indicator, date, value FROM market_indicators '
+                                        'WHERE indicator IN ({keys}) ORDER BY indicator, date', keys):
+            yield key, None if rows is None else self._decode(rows)
+
+    def _insert(self, connection: sqlite3.Connection, key: str, value: MarketIndicator) -> None:
+        rows = [(key, to_day_number(date), indicator_value) for date, indicator_value in value.items()]
+        self.log_info(f"Storing {len(rows)} values of indicator {key} (Code: 23984294)")
+        connection.executemany('INSERT OR REPLACE INTO market_indicators (indicator, date, value) '
+                               'VALUES (?, ?, ?)', rows)
+
+    def store(self, key: str, value: MarketIndicator):
+        with self._database.transaction() as connection:
+            self._insert(connection, key, value)
+
+    def store_many(self, items: Iterable[tuple[str, MarketIndicator]], max_workers: int = DEFAULT_IO_WORKERS) -> None:
+        # one transaction per chunk instead of threads (there is only one writer at a time anyway)
+        for chunk in iterate_chunks(items):
+            with self._database.transaction() as connection:
+                for key, value in chunk:
+                    self._insert(connection, key, value)
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return self._database.get_change_stamp()
+
+    def list_keys(self) -> Iterable[str]:
+        return [indicator for indicator, in self._database.get_connection().execute(
+            'SELECT DISTINCT indicator FROM market_indicators ORDER BY indicator')]
@@ -16,6 +16,7 @@
 #########################################################################
 from __future__ import annotations
 
+import datetime
 from abc import abstractmethod
 
 from datatypes.news_article import NewsArticle, TNewsArticles
@@ -35,3 +36,32 @@ class INewsArticleRepository(IRepository[TNewsArticles]):
     @abstractmethod
     def list_keys(self) -> list[str]:
         pass
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> TNewsArticles | None:
+        """ the articles published within [date_from, date_to] (local dates). Filters all articles by default
+        (see `IRepository.get_range`)
+        """
+        articles = self.get(key)
+        if articles is None:
+            return None
+
+        return TNewsArticles([article for article in articles
+                              if (date_from is None or get_published_date(article) >= date_from)
+                              and (date_to is None or get_published_date(article) <= date_to)])
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> TNewsArticles | None:
+        """ the latest `n` articles published at or before `as_of` (see `IRepository.get_latest`) """
+        articles = self.get_range(key, date_to=as_of)
+        if articles is None:
+            return None
+
+        return TNewsArticles(sorted(articles, key=lambda article: article.published_at.timestamp())[-n:] if n > 0
+                             else [])
+
+
+def get_published_date(article: NewsArticle) -> datetime.date:
+    """ the (local) date an article was published at """
+    return datetime.date.fromtimestamp(article.published_at.timestamp())
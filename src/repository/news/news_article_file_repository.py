@@ -18,18 +18,23 @@ from __future__ import annotations
 
 import datetime
 from pathlib import Path
-from typing import Iterable
+from typing import Hashable, Iterable
 
+import numpy as np
 import pandas as pd
 
 from datatypes.news_article import TNewsArticles, NewsArticle
 from exceptions.repository import StockGptRepositoryException
+from repository.csv_codec import read_typed_csv, decode_timestamps
+from repository.i_repository import get_file_stamp
 from repository.news.i_news_article_repository import INewsArticleRepository
 
 import gettext
 
 _ = gettext.gettext
 
+CSV_COLUMNS = ['title', 'source', 'published_at', 'url', 'summary']
+
 
 class NewsArticleFileRepository(INewsArticleRepository):
     _base_path: Path
@@ -45,14 +50,19 @@ class NewsArticleFileRepository(INewsArticleRepository):
         news_article_base_path = self._base_path
         effective_path = news_article_base_path / f'{key}.csv'
         if effective_path.exists():
-            df = pd.read_csv(effective_path, index_col=None, parse_dates=['published_at'])
-            return TNewsArticles([NewsArticle(title=row['title'],
-                                              source=row['source'],
-                                              published_at=datetime.datetime.fromtimestamp(
-                                                  row['published_at'].timestamp()),
-                                              url=row['url'],
-                                              summary=row['summary'] if not pd.isna(row['summary']) else None)
-                                  for _, row in df.iterrows()])
+            df = read_typed_csv(effective_path, default_dtype='str')
+            summaries = df['summary'].astype(object).where(df['summary'].notna(), None)
+            return TNewsArticles([NewsArticle(title=title,
+                                              source=source,
+                                              published_at=datetime.datetime.fromtimestamp(timestamp),
+                                              url=url,
+                                              summary=summary)
+                                  for title, source, timestamp, url, summary in zip(
+                                      df['title'].tolist(),
+                                      df['source'].tolist(),
+                                      decode_timestamps(df['published_at']).tolist(),
+                                      df['url'].tolist(),
+                                      summaries.tolist())])
         else:
             return None
 
@@ -62,29 +72,33 @@ class NewsArticleFileRepository(INewsArticleRepository):
         effective_path = news_article_base_path / f'{key}.csv'
         if not effective_path.exists():
             self.log_info(_(f"Creating new news article file for {key} (Code: 42342342)"))
-            df_old = pd.DataFrame(columns=['title', 'source', 'published_at', 'url', 'summary'])
+            df_old = pd.DataFrame(columns=CSV_COLUMNS, dtype=object)
         else:
             self.log_info(_(f"Writing to existing news file {key} (Code: 2342834092)"))
-            df_old = pd.read_csv(effective_path, index_col=None, parse_dates=['published_at'])
+            df_old = read_typed_csv(effective_path, default_dtype='str')
 
         df_new = pd.DataFrame({'title': [article.title for article in value],
                                'source': [article.source for article in value],
-                               'published_at': [article.published_at for article in value],
+                               'published_at': [article.published_at.isoformat(sep=' ') for article in value],
                                'url': [article.url for article in value],
-                               'summary': [article.summary for article in value]})
+                               'summary': [article.summary for article in value]},
+                              columns=CSV_COLUMNS, dtype=object)
 
-        # update or append
-        for _, row_new in df_new.iterrows():
-            if row_new['url'] in df_old['url'].values:
-                df_old.loc[df_old['url'] == row_new['url']].iloc[0] = row_new.iloc[0]
-            else:
-                df_old = pd.concat([df_old, row_new.to_frame().T], axis=0, ignore_index=True)
+        # upsert by url in one go: the latest version of an article replaces older ones
+        # (`duplicated` hashes the urls, so this stays linear in the size of the archive)
+        df = pd.concat([df_old[CSV_COLUMNS].astype(object), df_new], axis=0, ignore_index=True)
+        df = df[~(df['url'].duplicated(keep='last') & df['url'].notna())]
 
         # sort by date
-        df_old = df_old.sort_values(by=['published_at'])
+        df = df.iloc[np.argsort(decode_timestamps(df['published_at']), kind='stable')]
 
         # save back to disk
-        df_old.to_csv(effective_path, index=False)
+        tmp_path = effective_path.with_suffix('.csv.tmp')
+        df.to_csv(tmp_path, index=False)
+        tmp_path.replace(effective_path)
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return get_file_stamp(self._base_path / f'{key}.csv')
 
     def list_keys(self) -> Iterable[str]:
         return [f.name.replace('.csv', '')
@@ -0,0 +1,134 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: SQLite implementation of the news article repository           #
+#########################################################################
+from __future__ import annotations
+
+import datetime
+import sqlite3
+from typing import Hashable, Iterable, Iterator
+
+from datatypes.news_article import TNewsArticles, NewsArticle
+from repository.i_repository import DEFAULT_IO_WORKERS
+from repository.news.i_news_article_repository import INewsArticleRepository
+from repository.sqlite_database import SqliteDatabase, select_grouped, iterate_chunks
+
+
+def _to_timestamp(value: datetime.datetime) -> float:
+    """ seconds since epoch (times without time zone are taken as UTC, like in the file repository) """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+
+    return value.timestamp()
+
+
+def _get_local_day_start(date: datetime.date) -> float:
+    """ seconds since epoch of the (local) start of the day (articles are dated in local time, see `get`) """
+    return datetime.datetime.combine(date, datetime.time.min).timestamp()
+
+
+class NewsArticleSqliteRepository(INewsArticleRepository):
+    """ Stores the articles in the table `news_articles` (one row per symbol and url) """
+    _database: SqliteDatabase
+
+    def __init__(self, database: SqliteDatabase, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._database = database
+
+    def _query(self, key: str, condition: str = '', parameters: tuple = (), order: str = 'ASC',
+               limit: int = -1) -> TNewsArticles | None:
+        """ reads the articles of the symbol matching the condition (None if the symbol is unknown) """
+        connection = self._database.get_connection()
+        rows = connection.execute(
+            f'SELECT title, source, published_at, url, summary FROM news_articles WHERE symbol = ? {condition} '
+            f'ORDER BY published_at {order} LIMIT ?', (key, *parameters, limit)).fetchall()
+        if not rows and connection.execute('SELECT 1 FROM news_articles WHERE symbol = ? LIMIT 1',
+                                           (key,)).fetchone() is None:
+            return None
+
+        if order == 'DESC':
+            rows.reverse()
+
+        return self._decode(rows)
+
+    @staticmethod
+    def _decode(rows: list[tuple]) -> TNewsArticles:
+        """ the articles of the (title, source, published_at, url, summary) rows """
+        return TNewsArticles([NewsArticle(title=title,
+                                          source=source,
+                                          published_at=datetime.datetime.fromtimestamp(timestamp),
+                                          url=url,
+                                          summary=summary)
+                              for title, source, timestamp, url, summary in rows])
+
+    def get(self, key: str) -> TNewsArticles | None:
+        return self._query(key)
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> TNewsArticles | None:
+        condition = ''
+        parameters = ()
+        if date_from is not None:
+            condition += ' AND published_at >= ?'
+            parameters += (_get_local_day_start(date_from),)
+        if date_to is not None:
+            condition += ' AND published_at < ?'
+            parameters += (_get_local_day_start(date_to + datetime.timedelta(days=1)),)
+
+        return self._query(key, condition, parameters)
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> TNewsArticles | None:
+        condition, parameters = ('', ()) if as_of is None else \
+            (' AND published_at < ?', (_get_local_day_start(as_of + datetime.timedelta(days=1)),))
+        return self._query(key, condition, parameters, order='DESC', limit=max(n, 0))
+
+    def get_many(self,
+                 keys: Iterable[str],
+                 max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[tuple[str, TNewsArticles | None]]:
+        # one query per chunk of symbols instead of threads
+        for key, rows in select_grouped(self._database.get_connection(),
+                                        'SELECT symbol, title, source, published_at, url, summary FROM news_articles '
+                                        'WHERE symbol IN ({keys}) ORDER BY symbol, published_at', keys):
+            yield key, None if rows is None else self._decode(rows)
+
+    def _insert(self, connection: sqlite3.Connection, key: str, value: TNewsArticles) -> None:
+        rows = [(key, article.url, article.title, article.source, _to_timestamp(article.published_at),
+                 article.summary)
+                for article in value]
+        self.log_info(f"Storing {len(rows)} news articles of {key} (Code: 23984295)")
+        # the latest version of an article replaces older ones
+        connection.executemany('INSERT OR REPLACE INTO news_articles '
+                               '(symbol, url, title, source, published_at, summary) VALUES (?, ?, ?, ?, ?, ?)',
+                               rows)
+
+    def store(self, key: str, value: TNewsArticles):
+        with self._database.transaction() as connection:
+            self._insert(connection, key, value)
+
+    def store_many(self, items: Iterable[tuple[str, TNewsArticles]], max_workers: int = DEFAULT_IO_WORKERS) -> None:
+        # one transaction per chunk instead of threads (there is only one writer at a time anyway)
+        for chunk in iterate_chunks(items):
+            with self._database.transaction() as connection:
+                for key, value in chunk:
+                    self._insert(connection, key, value)
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return self._database.get_change_stamp()
+
+    def list_keys(self) -> Iterable[str]:
+        return [symbol for symbol, in self._database.get_connection().execute(
+            'SELECT DISTINCT symbol FROM news_articles ORDER BY symbol')]
@@ -0,0 +1,212 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Shared SQLite database of the SQLite repositories              #
+# (connections, schema and transactions)                                #
+#########################################################################
+from __future__ import annotations
+
+import contextlib
+import datetime
+import itertools
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, TypeVar
+
+from exceptions.repository import StockGptRepositoryException
+
+TItem = TypeVar('TItem')
+
+SCHEMA_VERSION = 1
+KEYS_PER_QUERY = 256
+""" number of keys read by one query of `select_grouped` (stays well below SQLite's limit of parameters) and
+written by one transaction of the repositories' `store_many` """
+
+# dates are stored as days since 1970-01-01 and times as seconds since epoch (UTC),
+# which keeps them sortable and cheap to convert to numpy
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_values (
+    symbol TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (symbol, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS stock_indicators (
+    symbol TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    indicator TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (symbol, date, indicator)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS market_indicators (
+    indicator TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (indicator, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS news_articles (
+    symbol TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    source TEXT,
+    published_at REAL,
+    summary TEXT,
+    PRIMARY KEY (symbol, url)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS news_articles_published_at ON news_articles (symbol, published_at);
+"""
+
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def to_day_number(date: datetime.date) -> int:
+    """ the stored representation of a date (days since 1970-01-01) """
+    return date.toordinal() - EPOCH_ORDINAL
+
+
+def from_day_number(day: int) -> datetime.date:
+    return datetime.date.fromordinal(day + EPOCH_ORDINAL)
+
+
+def get_date_condition(date_from: datetime.date | None, date_to: datetime.date | None,
+                       column: str = 'date') -> tuple[str, tuple]:
+    """ SQL condition (to append to a WHERE clause) and its parameters restricting the date column to
+    [date_from, date_to] (open if None)
+    """
+    condition = ''
+    parameters = ()
+    if date_from is not None:
+        condition += f' AND {column} >= ?'
+        parameters += (to_day_number(date_from),)
+    if date_to is not None:
+        condition += f' AND {column} <= ?'
+        parameters += (to_day_number(date_to),)
+
+    return condition, parameters
+
+
+def iterate_chunks(items: Iterable[TItem], chunk_size: int = KEYS_PER_QUERY) -> Iterator[list[TItem]]:
+    """ splits the items into lists of `chunk_size`. Writers collect a chunk before starting its transaction,
+    so the database is not locked while (lazily produced) items are calculated
+    """
+    items = iter(items)
+    while chunk := list(itertools.islice(items, chunk_size)):
+        yield chunk
+
+
+def select_grouped(connection: sqlite3.Connection,
+                   query: str,
+                   keys: Iterable[str],
+                   keys_per_query: int = KEYS_PER_QUERY) -> Iterator[tuple[str, list[tuple] | None]]:
+    """ reads the rows of many keys with one query per `keys_per_query` keys
+
+    Args:
+        connection (sqlite3.Connection): The connection
+        query (str): Query selecting the key as first column and ordering by it, with `{keys}` in place of the
+            list of keys (e.g., `... WHERE symbol IN ({keys}) ORDER BY symbol, date`)
+        keys (Iterable[str]): The keys
+        keys_per_query (int, optional): Number of keys per query. Defaults to `KEYS_PER_QUERY`.
+    Returns:
+        Iterator[tuple[str, list[tuple] | None]]: key and its rows (without the key, None if there are none)
+            in the order of `keys`
+    """
+    for chunk in iterate_chunks(keys, keys_per_query):
+        unique_keys = list(dict.fromkeys(chunk))
+        rows = connection.execute(query.format(keys=', '.join('?' * len(unique_keys))), unique_keys)
+        rows_by_key = {key: [row[1:] for row in key_rows]
+                       for key, key_rows in itertools.groupby(rows, key=lambda row: row[0])}
+        for key in chunk:
+            yield key, rows_by_key.get(key)
+
+
+class SqliteDatabase:
+    """ The SQLite file all SQLite repositories share.
+    Every thread (and process) uses its own connection. The database runs in WAL mode, so readers do not block
+    the writer (and vice versa).
+    """
+    _path: Path
+    _timeout: float
+    _local: threading.local | None
+    _pid: int | None
+
+    def __init__(self, path: Path, timeout: float = 30.):
+        """
+        Args:
+            path (Path): The database file (created if missing, its directory has to exist)
+            timeout (float, optional): Seconds to wait for locks of other writers. Defaults to 30.
+        """
+        if not path.parent.exists():
+            raise StockGptRepositoryException(f'Directory of database {path} does not exist (Code: 23984290)')
+
+        self._path = path
+        self._timeout = timeout
+        self._local = None
+        self._pid = None
+
+    def __getstate__(self):
+        # connections cannot be shared with other processes (they reconnect lazily)
+        return {**self.__dict__, '_local': None, '_pid': None}
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def get_connection(self) -> sqlite3.Connection:
+        """ returns the connection of the calling thread (opened and set up on first use) """
+        if self._local is None or self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            try:
+                connection = sqlite3.connect(self._path, timeout=self._timeout)
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+                if connection.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                    with connection:
+                        connection.executescript(SCHEMA)
+                        connection.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+            except sqlite3.Error as e:
+                raise StockGptRepositoryException(f'Could not open database {self._path} due to {e} '
+                                                  f'(Code: 23984291)') from e
+
+            self._local.connection = connection
+
+        return connection
+
+    def get_change_stamp(self) -> tuple[int, int]:
+        """ changes whenever any connection (of any process) modified the database. Used for invalidating caches """
+        connection = self.get_connection()
+        # data_version counts the commits of other connections, total_changes the ones of this connection
+        return connection.execute('PRAGMA data_version').fetchone()[0], connection.total_changes
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """ runs the statements of the block in one transaction (committed at the end, rolled back on errors) """
+        connection = self.get_connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            yield connection
@@ -0,0 +1,108 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Bulk import of the file based repositories into the SQLite database#
+#########################################################################
+from __future__ import annotations
+
+import dataclasses
+import logging
+
+from misc.config import AppConfig
+from repository.factory import create_stock_value_file_repository
+from repository.i_repository import IRepository
+from repository.market_indicator.market_indicator_file_repository import MarketIndicatorFileRepository
+from repository.market_indicator.market_indicator_sqlite_repository import MarketIndicatorSqliteRepository
+from repository.news.news_article_file_repository import NewsArticleFileRepository
+from repository.news.news_article_sqlite_repository import NewsArticleSqliteRepository
+from repository.sqlite_database import SqliteDatabase, iterate_chunks
+from repository.stock_indicator.stock_indicator_file_repository import StockIndicatorFileRepository
+from repository.stock_indicator.stock_indicator_sqlite_repository import StockIndicatorSqliteRepository
+from repository.stock_value.stock_value_sqlite_repository import StockValueSqliteRepository
+
+KEYS_PER_TRANSACTION = 64
+""" keys written by one transaction of the import (the values of a chunk are held in memory at once) """
+
+
+@dataclasses.dataclass
+class SqliteImportResult:
+    """ number of imported keys per data type """
+    stock_values: int = 0
+    stock_indicators: int = 0
+    market_indicators: int = 0
+    news_articles: int = 0
+
+
+def _copy_repository(source: IRepository, target: IRepository, logger: logging.Logger) -> int:
+    """ copies all keys of the source into the target (one transaction per `KEYS_PER_TRANSACTION` keys), returns the
+    number of keys
+    """
+    count = 0
+    # (the following keys are read while the current ones are written)
+    items = ((key, value) for key, value in source.get_many(source.list_keys()) if value is not None)
+    for chunk in iterate_chunks(items, KEYS_PER_TRANSACTION):
+        try:
+            target.store_many(chunk)
+            count += len(chunk)
+        except Exception:
+            # the transaction of the chunk was rolled back, so store its keys one by one to skip the failing ones
+            for key, value in chunk:
+                try:
+                    target.store(key, value)
+                    count += 1
+                except Exception as e:
+                    logger.warning(f"Could not import {key} due to {e}. Skipping (Code: 23984296)")
+
+    return count
+
+
+def import_into_sqlite(app_config: AppConfig, logger: logging.Logger) -> SqliteImportResult:
+    """ imports the file based data (`data/stock_data`) into the SQLite database (`AppConfig.sqlite_database_file`).
+    Existing rows of the same keys and dates are replaced, so the import can be repeated.
+    Stock values are read in the configured format (`AppConfig.stock_value_backend`).
+
+    Args:
+        app_config (AppConfig): The app config
+        logger (logging.Logger): The logger
+    Returns:
+        SqliteImportResult: number of imported keys per data type
+    """
+    database = SqliteDatabase(path=app_config.sqlite_database_file)
+    result = SqliteImportResult()
+
+    logger.info(f"Importing stock values into {database.path} (Code: 23984297)")
+    result.stock_values = _copy_repository(
+        create_stock_value_file_repository(app_config=app_config, logger=logger),
+        StockValueSqliteRepository(database=database, logger=logger),
+        logger)
+
+    logger.info(f"Importing stock indicators into {database.path} (Code: 23984297)")
+    result.stock_indicators = _copy_repository(
+        StockIndicatorFileRepository(base_path=app_config.stock_indicators_base_dir, logger=logger),
+        StockIndicatorSqliteRepository(database=database, logger=logger),
+        logger)
+
+    logger.info(f"Importing market indicators into {database.path} (Code: 23984297)")
+    result.market_indicators = _copy_repository(
+        MarketIndicatorFileRepository(base_path=app_config.market_indicator_base_dir, logger=logger),
+        MarketIndicatorSqliteRepository(database=database, logger=logger),
+        logger)
+
+    logger.info(f"Importing news articles into {database.path} (Code: 23984297)")
+    result.news_articles = _copy_repository(
+        NewsArticleFileRepository(base_path=app_config.default_news_article_base_dir, logger=logger),
+        NewsArticleSqliteRepository(database=database, logger=logger),
+        logger)
+
+    return result
@@ -16,6 +16,7 @@
 #########################################################################
 from __future__ import annotations
 
+import datetime
 from abc import abstractmethod
 
 from datatypes.stock_indicator import StockIndicators
@@ -35,3 +36,50 @@ class IStockIndicatorRepository(IRepository[StockIndicators]):
     @abstractmethod
     def list_keys(self) -> list[str]:
         pass
+
+    @abstractmethod
+    def delete_after(self, key: str, date: datetime.date) -> None:
+        """ removes the values of all dates after the given one (e.g., if the chart they were calculated on
+        got shorter)
+
+        Args:
+            key (str): The stock symbol
+            date (datetime.date): The last date to keep
+        """
+        pass
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> StockIndicators | None:
+        """ filters all values by default (see `IRepository.get_range`) """
+        values = self.get(key)
+        if values is None:
+            return None
+
+        return StockIndicators({date: value for date, value in values.items()
+                                if (date_from is None or date >= date_from) and (date_to is None or date <= date_to)})
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> StockIndicators | None:
+        """ filters all values by default (see `IRepository.get_latest`) """
+        values = self.get_range(key, date_to=as_of)
+        if values is None:
+            return None
+
+        return StockIndicators({date: values[date] for date in sorted(values)[-n:] if n > 0})
+
+    def get_latest_dates(self, key: str) -> dict[str, datetime.date]:
+        """ returns the latest date with a stored value for each indicator of the given key
+
+        Args:
+            key (str): The stock symbol
+        Returns:
+            dict[str, datetime.date]: indicator id -> latest date (indicators without any value are omitted)
+        """
+        latest_dates = {}
+        for date, indicators in sorted((self.get(key) or {}).items()):
+            for indicator_id, value in indicators.items():
+                if value is not None and value == value:  # skip NaN
+                    latest_dates[indicator_id] = date
+
+        return latest_dates
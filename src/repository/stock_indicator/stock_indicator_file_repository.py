@@ -19,17 +19,30 @@
 from __future__ import annotations
 
 import datetime
+import os
 from pathlib import Path
-from typing import Iterable
+from typing import Hashable, Iterable
 
+import numpy as np
 import pandas as pd
 
 from datatypes.market_indicator import MarketIndicator
 from datatypes.stock_indicator import StockIndicators
 from exceptions.repository import StockGptRepositoryException
+from repository.csv_codec import read_typed_csv, write_typed_csv, decode_dates, decode_date_list, \
+    find_date_offset, find_offset_of_lines_before
+from repository.i_repository import get_file_stamp
 from repository.stock_indicator.i_stock_indicator_repository import IStockIndicatorRepository
 
 
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def _to_datetime64(dates: Iterable[datetime.date]) -> np.ndarray:
+    """ converts dates to datetime64[D] (considerably faster than letting numpy convert the date objects) """
+    return (np.array([date.toordinal() for date in dates], dtype=np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]')
+
+
 class StockIndicatorFileRepository(IStockIndicatorRepository):
     _base_path: Path
 
@@ -40,59 +53,125 @@ class StockIndicatorFileRepository(IStockIndicatorRepository):
 
         self._base_path = base_path
 
+    @staticmethod
+    def _read(path: Path, start: int | None = None, stop: int | None = None) -> StockIndicators:
+        """ reads the rows within the given byte offsets (see `read_typed_csv`) """
+        df = read_typed_csv(path, dtypes={'date': 'str'}, start=start, stop=stop)
+        indicator_ids = [col for col in df.columns if col != 'date']
+        rows = zip(*(df[indicator_id].tolist() for indicator_id in indicator_ids))
+
+        return StockIndicators({date: dict(zip(indicator_ids, values))
+                                for date, values in zip(decode_date_list(df['date']), rows)})
+
     def get(self, key: str) -> StockIndicators | None:
         stock_indicator_base_path = self._base_path
         effective_path = stock_indicator_base_path / f'{key}.csv'
         if effective_path.exists():
-            df = pd.read_csv(effective_path, index_col=None, parse_dates=['date'])
-            d = {}
-            for _, line in df.iterrows():
-                date = datetime.date(line['date'].year,
-                                     line['date'].month,
-                                     line['date'].day)
-                d[date] = {}
-                for col in df.columns:
-                    if col != 'date':
-                        d[date][col] = line[col]
-
-            return StockIndicators(d)
+            return self._read(effective_path)
         else:
             return None
 
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> StockIndicators | None:
+        effective_path = self._base_path / f'{key}.csv'
+        if not effective_path.exists():
+            return None
+
+        # the file is sorted by date
+        with open(effective_path, 'rb') as f:
+            start = find_date_offset(f, str(date_from)) if date_from is not None else None
+            stop = find_date_offset(f, str(date_to + datetime.timedelta(days=1))) if date_to is not None else None
+
+        return self._read(effective_path, start=start, stop=stop)
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> StockIndicators | None:
+        effective_path = self._base_path / f'{key}.csv'
+        if not effective_path.exists():
+            return None
+
+        with open(effective_path, 'rb') as f:
+            stop = find_date_offset(f, str(as_of + datetime.timedelta(days=1))) if as_of is not None \
+                else f.seek(0, os.SEEK_END)
+            start = find_offset_of_lines_before(f, stop, n) if n > 0 else stop
+
+        return self._read(effective_path, start=start, stop=stop)
+
     def store(self, key: str, value: StockIndicators):
         stock_indicator_base_path = self._base_path
         effective_path = stock_indicator_base_path / f'{key}.csv'
         if not effective_path.exists():
             self.log_info(f"Creating new stock indicator file for symbol {key} (Code: 423840923)")
-            df_old = pd.DataFrame(columns=['date'])
+            df_old = pd.DataFrame(index=pd.DatetimeIndex([], name='date'))
         else:
             self.log_info(f"Loading existing stock indicator file for symbol {key} (Code: 423840923)")
-            df_old = pd.read_csv(effective_path,
-                                 index_col=None,
-                                 parse_dates=['date'])
+            df_old = read_typed_csv(effective_path, dtypes={'date': 'str'})
+            df_old.index = pd.DatetimeIndex(decode_dates(df_old.pop('date')), name='date')
+            df_old = df_old[~df_old.index.duplicated(keep='last')]
+
+        # the new values column-wise (only the cells given in the update overwrite stored ones)
+        rows = list(value.values())
+        new_dates = _to_datetime64(value.keys())
+        indicator_ids = list(rows[0].keys()) if rows else []
+        new_columns: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        if all(indicators.keys() == rows[0].keys() for indicators in rows):
+            # all dates have the same indicators (the usual case)
+            all_rows = np.arange(len(rows))
+            values = np.array([[indicators[indicator_id] for indicator_id in indicator_ids] for indicators in rows],
+                              dtype=np.float64).reshape(len(rows), len(indicator_ids))
+            new_columns = {indicator_id: (all_rows, values[:, i]) for i, indicator_id in enumerate(indicator_ids)}
+        else:
+            cells: dict[str, tuple[list, list]] = {}
+            for row, indicators in enumerate(rows):
+                for indicator_id, indicator_value in indicators.items():
+                    positions, values = cells.setdefault(indicator_id, ([], []))
+                    positions.append(row)
+                    values.append(indicator_value)
+            new_columns = {indicator_id: (np.array(positions, dtype=np.int64), np.array(values, dtype=np.float64))
+                           for indicator_id, (positions, values) in cells.items()}
+
+        df = df_old.reindex(df_old.index.union(pd.DatetimeIndex(new_dates)))
+        targets = df.index.get_indexer(new_dates)
+        for indicator_id, (positions, values) in new_columns.items():
+            column = df[indicator_id].to_numpy(dtype=np.float64, copy=True) if indicator_id in df.columns \
+                else np.full(len(df), np.nan)
+            column[targets[positions]] = values
+            df[indicator_id] = column
 
-        for date, indicators in value.items():
-            for indicator_id, indicator_value in indicators.items():
-                if indicator_id not in df_old.columns:
-                    df_old[indicator_id] = None
+        # save back to disk
+        df.insert(0, 'date', df.index.strftime('%Y-%m-%d'))
+        write_typed_csv(effective_path, df)
 
-                # add an empty row if the date does not exist
-                if date not in df_old['date'].values:
-                    empty_row = [None] * (df_old.shape[1] - 1)
-                    empty_row.insert(0, date)
-                    df_old.loc[len(df_old)] = empty_row
-                df_old.loc[df_old['date'] == date, indicator_id] = indicator_value
+    def delete_after(self, key: str, date: datetime.date) -> None:
+        effective_path = self._base_path / f'{key}.csv'
+        if not effective_path.exists():
+            return
 
-        df_old['date'] = [datetime.date(year=d.year, month=d.month, day=d.day) for d in df_old['date']]
+        # the file is sorted by date, so the kept lines are the ones before the first later date
+        with open(effective_path, 'r+b') as f:
+            stop = find_date_offset(f, str(date + datetime.timedelta(days=1)))
+            if stop < f.seek(0, os.SEEK_END):
+                self.log_info(f"Deleting stock indicators of symbol {key} after {date} (Code: 423840924)")
+                f.truncate(stop)
 
-        # drop duplicates
-        df_old = df_old.drop_duplicates(subset=['date'], keep='last')
+    def get_latest_dates(self, key: str) -> dict[str, datetime.date]:
+        effective_path = self._base_path / f'{key}.csv'
+        if not effective_path.exists():
+            return {}
 
-        # sort by date
-        df_old = df_old.sort_values(by=['date'])
+        df = read_typed_csv(effective_path, dtypes={'date': 'str'})
+        dates = decode_dates(df.pop('date'))
+        latest = {}
+        for indicator_id in df.columns:
+            valid = np.flatnonzero(df[indicator_id].notna().to_numpy())
+            if len(valid):
+                latest[indicator_id] = dates[valid[-1]].item()
 
-        # save back to disk
-        df_old.to_csv(effective_path, index=False)
+        return latest
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return get_file_stamp(self._base_path / f'{key}.csv')
 
     def list_keys(self) -> Iterable[str]:
         return [f.name.replace('.csv', '')
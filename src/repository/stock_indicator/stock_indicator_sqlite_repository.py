@@ -0,0 +1,133 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: SQLite implementation of the stock indicator repository        #
+#########################################################################
+
+from __future__ import annotations
+
+import datetime
+import sqlite3
+from typing import Hashable, Iterable, Iterator
+
+import numpy as np
+
+from datatypes.stock_indicator import StockIndicators
+from repository.i_repository import DEFAULT_IO_WORKERS
+from repository.sqlite_database import SqliteDatabase, get_date_condition, to_day_number, from_day_number, \
+    select_grouped, iterate_chunks
+from repository.stock_indicator.i_stock_indicator_repository import IStockIndicatorRepository
+
+
+class StockIndicatorSqliteRepository(IStockIndicatorRepository):
+    """ Stores the indicators in the table `stock_indicators` (one row per symbol, date and indicator) """
+    _database: SqliteDatabase
+
+    def __init__(self, database: SqliteDatabase, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._database = database
+
+    def _has_key(self, key: str) -> bool:
+        return self._database.get_connection().execute(
+            'SELECT 1 FROM stock_indicators WHERE symbol = ? LIMIT 1', (key,)).fetchone() is not None
+
+    def _query(self, key: str, condition: str = '', parameters: tuple = ()) -> StockIndicators | None:
+        """ reads the values of the symbol matching the (date) condition (None if the symbol is unknown) """
+        rows = self._database.get_connection().execute(
+            f'SELECT date, indicator, value FROM stock_indicators WHERE symbol = ? {condition} ORDER BY date',
+            (key, *parameters)).fetchall()
+        if not rows:
+            return None if not self._has_key(key) else StockIndicators({})
+
+        return self._decode(rows)
+
+    @staticmethod
+    def _decode(rows: list[tuple]) -> StockIndicators:
+        """ the indicators of the (date, indicator, value) rows (sorted by date) """
+        # like the file repository, every date holds all (read) indicators of the symbol (NaN if missing)
+        days, indicators, values = zip(*rows)
+        unique_days, day_positions = np.unique(np.array(days, dtype=np.int64), return_inverse=True)
+        indicator_ids, indicator_positions = np.unique(np.array(indicators, dtype=object), return_inverse=True)
+        table = np.full((len(unique_days), len(indicator_ids)), np.nan)
+        table[day_positions, indicator_positions] = np.array(values, dtype=np.float64)
+
+        indicator_ids = indicator_ids.tolist()
+        return StockIndicators({date: dict(zip(indicator_ids, row))
+                                for date, row in zip(unique_days.astype('datetime64[D]').tolist(), table.tolist())})
+
+    def get(self, key: str) -> StockIndicators | None:
+        return self._query(key)
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> StockIndicators | None:
+        return self._query(key, *get_date_condition(date_from, date_to))
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> StockIndicators | None:
+        if n <= 0:
+            return None if not self._has_key(key) else StockIndicators({})
+
+        # the n-th latest date (if there are that many)
+        condition, parameters = get_date_condition(None, as_of)
+        first = self._database.get_connection().execute(
+            f'SELECT DISTINCT date FROM stock_indicators WHERE symbol = ? {condition} '
+            f'ORDER BY date DESC LIMIT 1 OFFSET ?', (key, *parameters, n - 1)).fetchone()
+        return self.get_range(key, date_from=from_day_number(first[0]) if first else None, date_to=as_of)
+
+    def get_many(self,
+                 keys: Iterable[str],
+                 max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[tuple[str, StockIndicators | None]]:
+        # one query per chunk of symbols instead of threads
+        for key, rows in select_grouped(self._database.get_connection(),
+                                        'SELECT symbol, date, indicator, value FROM stock_indicators '
+                                        'WHERE symbol IN ({keys}) ORDER BY symbol, date', keys):
+            yield key, None if rows is None else self._decode(rows)
+
+    def _insert(self, connection: sqlite3.Connection, key: str, value: StockIndicators) -> None:
+        rows = [(key, to_day_number(date), indicator_id, indicator_value)
+                for date, indicators in value.items()
+                for indicator_id, indicator_value in indicators.items()]
+        self.log_info(f'Storing {len(rows)} stock indicator values of symbol {key} (Code: 23984293)')
+        connection.executemany('INSERT OR REPLACE INTO stock_indicators (symbol, date, indicator, value) '
+                               'VALUES (?, ?, ?, ?)', rows)
+
+    def store(self, key: str, value: StockIndicators):
+        with self._database.transaction() as connection:
+            self._insert(connection, key, value)
+
+    def store_many(self, items: Iterable[tuple[str, StockIndicators]], max_workers: int = DEFAULT_IO_WORKERS) -> None:
+        # one transaction per chunk instead of threads (there is only one writer at a time anyway)
+        for chunk in iterate_chunks(items):
+            with self._database.transaction() as connection:
+                for key, value in chunk:
+                    self._insert(connection, key, value)
+
+    def delete_after(self, key: str, date: datetime.date) -> None:
+        with self._database.transaction() as connection:
+            connection.execute('DELETE FROM stock_indicators WHERE symbol = ? AND date > ?',
+                               (key, to_day_number(date)))
+
+    def get_latest_dates(self, key: str) -> dict[str, datetime.date]:
+        rows = self._database.get_connection().execute(
+            'SELECT indicator, MAX(date) FROM stock_indicators WHERE symbol = ? AND value IS NOT NULL '
+            'GROUP BY indicator', (key,)).fetchall()
+        return {indicator_id: from_day_number(day) for indicator_id, day in rows}
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return self._database.get_change_stamp()
+
+    def list_keys(self) -> Iterable[str]:
+        return [symbol for symbol, in self._database.get_connection().execute(
+            'SELECT DISTINCT symbol FROM stock_indicators ORDER BY symbol')]
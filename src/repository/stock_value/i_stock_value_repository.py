@@ -14,6 +14,7 @@
 # #######################################################################
 # Brief: Interface for StockValue (Chart) Repository                    #
 #########################################################################
+import datetime
 from abc import abstractmethod
 
 from datatypes.stock_data import StockDataInfo
@@ -33,3 +34,30 @@ class IStockValueRepository(IRepository[StockDataInfo]):
     @abstractmethod
     def list_keys(self) -> list[str]:
         pass
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> StockDataInfo | None:
+        """ slices the complete chart by default (see `IRepository.get_range`) """
+        stock_info = self.get(key)
+        if stock_info is None:
+            return None
+
+        columns = stock_info.columns
+        start = columns.get_index_from(date_from) if date_from is not None else 0
+        stop = columns.get_index_until(date_to) if date_to is not None else len(columns)
+        return StockDataInfo.from_columns(symbol=key, columns=columns.slice(start, max(start, stop)))
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> StockDataInfo | None:
+        """ slices the complete chart by default (see `IRepository.get_latest`) """
+        stock_info = self.get_range(key, date_to=as_of)
+        if stock_info is None:
+            return None
+
+        columns = stock_info.columns
+        return StockDataInfo.from_columns(symbol=key, columns=columns.slice(max(len(columns) - max(n, 0), 0)))
+
+    def compact(self) -> None:
+        """ reorganizes the stored data (e.g., removes superseded rows). Does nothing by default """
+        pass
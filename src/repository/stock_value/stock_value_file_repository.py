@@ -18,78 +18,273 @@
 from __future__ import annotations
 
 import datetime
+import io
+import json
+import os
 from pathlib import Path
-from typing import Iterable
+from typing import Hashable, Iterable
 
+import numpy as np
 import pandas as pd
 
-from datatypes.stock_data import StockDataInfo, StockDataChartEntry
+from datatypes.stock_data import StockDataInfo, StockDataColumns, CHART_FIELDS
 from exceptions.repository import StockGptRepositoryException
+from repository.csv_codec import read_typed_csv, decode_dates, find_date_offset, find_offset_of_lines_before, \
+    CSV_ENGINE
+from repository.i_repository import get_file_stamp
 from repository.stock_value.i_stock_value_repository import IStockValueRepository
 
+META_FORMAT_VERSION = 1
+TAIL_CHUNK_SIZE = 64 * 1024
+CSV_COLUMNS = ('date', *CHART_FIELDS)
+
 
 class StockValueFileRepository(IStockValueRepository):
+    """ Stores every symbol as CSV file (`<symbol>.csv`) plus a small sidecar (`<symbol>.meta.json`).
+
+    Stores only append rows to the CSV file: rows newer than the last stored date and rows whose values were
+    revised (found by comparing against the end of the file). Thus, the CSV file may contain unsorted or duplicate
+    dates (the last occurrence wins) until it gets compacted, which happens once more than `compaction_threshold`
+    revised rows were appended (or by calling `compact`).
+    The sidecar records the last date, the number of rows, the file size (to detect files changed elsewhere;
+    those get compacted on the next store) and the dates of revised rows appended since the last compaction.
+    """
     _base_path: Path
+    _compaction_threshold: int
 
-    def __init__(self, base_path: Path, *args, **kwargs):
+    def __init__(self, base_path: Path, *args, compaction_threshold: int = 100, **kwargs):
         super().__init__(*args, **kwargs)
         if not base_path.exists():
             raise StockGptRepositoryException(f'Base path {base_path} does not exist (Code: 23482039)')
 
         self._base_path = base_path
+        self._compaction_threshold = compaction_threshold
+
+    def _get_path(self, key: str) -> Path:
+        return self._base_path / f'{key}.csv'
+
+    def _get_meta_path(self, key: str) -> Path:
+        return self._base_path / f'{key}.meta.json'
+
+    def _read_meta(self, key: str) -> dict | None:
+        """ the sidecar of the given symbol if it is still valid for the CSV file """
+        meta_path = self._get_meta_path(key)
+        path = self._get_path(key)
+        if not meta_path.exists() or not path.exists():
+            return None
+
+        try:
+            meta = json.loads(meta_path.read_text())
+        except ValueError:
+            return None
+
+        if meta.get('version') != META_FORMAT_VERSION or meta.get('size') != path.stat().st_size:
+            return None
+
+        return meta
+
+    def _write_meta(self, key: str, meta: dict) -> None:
+        meta_path = self._get_meta_path(key)
+        tmp_path = meta_path.with_suffix('.json.tmp')
+        tmp_path.write_text(json.dumps({'version': META_FORMAT_VERSION, **meta,
+                                        'size': self._get_path(key).stat().st_size}))
+        tmp_path.replace(meta_path)
+
+    @staticmethod
+    def _to_frame(columns: StockDataColumns) -> pd.DataFrame:
+        return pd.DataFrame({'date': pd.to_datetime(columns.dates),
+                             **{field: getattr(columns, field) for field in CHART_FIELDS}})
 
     def get(self, key: str) -> StockDataInfo | None:
-        base_dir = self._base_path
-        effective_path = base_dir / f'{key}.csv'
+        effective_path = self._get_path(key)
         if not effective_path.exists():
             return None
 
-        df = pd.read_csv(effective_path, index_col=None, parse_dates=['date'])
-        entries = {}
-        for _, line in df.iterrows():
-            entries[datetime.date(line['date'].year,
-                                  line['date'].month,
-                                  line['date'].day)] = \
-                StockDataChartEntry(high=line['high'],
-                                    low=line['low'],
-                                    open=line['open'],
-                                    close=line['close'],
-                                    volume=line['volume']
-                                    )
-
-        return StockDataInfo(symbol=key, chart=entries)
+        # appended rows may be unsorted or revise earlier ones (the last occurrence wins)
+        return StockDataInfo.from_columns(symbol=key, columns=self._read_columns(key))
 
-    def store(self, key: str, value: StockDataInfo):
-        stock_data_base_path = self._base_path
-        effective_path = stock_data_base_path / f'{key}.csv'
-        if not effective_path.exists():
-            self.log_info(f'Creating new stock data file for symbol {key} (Code: 423840923)')
-            df_old = pd.DataFrame(columns=['date', 'open', 'high', 'low', 'close', 'volume'])
+    def _read_columns(self, key: str, start: int | None = None, stop: int | None = None) -> StockDataColumns:
+        """ reads the rows within the given byte offsets (see `read_typed_csv`) """
+        df = read_typed_csv(self._get_path(key), dtypes={'date': 'str'}, start=start, stop=stop)
+        return StockDataColumns.from_arrays(decode_dates(df['date']),
+                                            *(df[field].to_numpy(dtype=np.float64) for field in CHART_FIELDS))
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> StockDataInfo | None:
+        meta = self._read_meta(key)
+        if meta is None or (date_from is None and date_to is None):
+            return super().get_range(key, date_from=date_from, date_to=date_to)
+
+        revised_dates = meta['revised_dates']
+        if date_from is not None and any(date >= str(date_from) for date in revised_dates):
+            # revisions of requested dates may have been appended after newer rows
+            columns = self._read_rows_since(key, since=np.datetime64(date_from, 'D'), revised_dates=set(revised_dates))
         else:
-            self.log_info(f'Loading existing stock data file for symbol {key} (Code: 423840923)')
-            df_old = pd.read_csv(effective_path, index_col=None, parse_dates=['date'])
-
-        data_dict = {
-            'date': [datetime.datetime(date.year, date.month, date.day)
-                     for date in value.chart.keys()],
-            'open': [entry.open for entry in value.chart.values()],
-            'high': [entry.high for entry in value.chart.values()],
-            'low': [entry.low for entry in value.chart.values()],
-            'close': [entry.close for entry in value.chart.values()],
-            'volume': [entry.volume for entry in value.chart.values()],
-        }
-        df_new = pd.DataFrame(columns=df_old.columns, data=data_dict, index=None)
-
-        df_concat = pd.concat([df_new, df_old], axis=0, ignore_index=True)
-
-        # Remove duplicates
-        df_concat.drop_duplicates(subset=['date'], keep='last', inplace=True, ignore_index=True)
-
-        # Sort by date
-        df_concat.sort_values(by=['date'], inplace=True)
-
-        # and save
-        df_concat.to_csv(effective_path, index=False)
+            with open(self._get_path(key), 'rb') as f:
+                start = find_date_offset(f, str(date_from), skip_dates={date.encode() for date in revised_dates}) \
+                    if date_from is not None else None
+                # (appended revisions of earlier dates are behind the requested rows)
+                stop = find_date_offset(f, str(date_to + datetime.timedelta(days=1))) \
+                    if date_to is not None and not revised_dates else None
+
+            columns = self._read_columns(key, start=start, stop=stop)
+
+        start = columns.get_index_from(date_from) if date_from is not None else 0
+        stop = columns.get_index_until(date_to) if date_to is not None else len(columns)
+        return StockDataInfo.from_columns(symbol=key, columns=columns.slice(start, max(start, stop)))
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> StockDataInfo | None:
+        meta = self._read_meta(key)
+        if meta is None or not meta['last_date'] or n <= 0:
+            return super().get_latest(key, n=n, as_of=as_of)
+
+        last_date = datetime.date.fromisoformat(meta['last_date'])
+        if not meta['revised_dates']:
+            # sorted file: count the rows back from the last requested one
+            with open(self._get_path(key), 'rb') as f:
+                stop = find_date_offset(f, str(as_of + datetime.timedelta(days=1))) \
+                    if as_of is not None and as_of < last_date else f.seek(0, os.SEEK_END)
+                start = find_offset_of_lines_before(f, stop, n)
+
+            return StockDataInfo.from_columns(symbol=key, columns=self._read_columns(key, start=start, stop=stop))
+
+        # revised rows may be appended anywhere: widen the date range until it holds enough rows
+        last_date = min(last_date, as_of) if as_of is not None else last_date
+        with open(self._get_path(key), 'rb') as f:
+            f.readline()
+            first_date = min(f.readline()[:10].decode(), *meta['revised_dates'])
+
+        days = 2 * n
+        while True:
+            date_from = last_date - datetime.timedelta(days=days)
+            stock_info = self.get_range(key, date_from=date_from, date_to=as_of)
+            if len(stock_info.columns) >= n or str(date_from) <= first_date:
+                columns = stock_info.columns
+                return StockDataInfo.from_columns(symbol=key, columns=columns.slice(max(len(columns) - n, 0)))
+
+            days *= 2
+
+    def _read_rows_since(self, key: str, since: np.datetime64, revised_dates: set[str]) -> StockDataColumns:
+        """ reads the rows from the end of the file backwards, until a row before `since` is found
+        (rows of revised dates are skipped over, as they might be appended after newer rows)
+        """
+        since = str(since)
+        lines = []
+        with open(self._get_path(key), 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            rest = b''
+            done = False
+            while not done and position > 0:
+                size = min(TAIL_CHUNK_SIZE, position)
+                position -= size
+                f.seek(position)
+                parts = (f.read(size) + rest).split(b'\n')
+                # the first part might be incomplete (unless it is the start of the file)
+                rest = parts.pop(0) if position > 0 else b''
+                for line in reversed(parts):
+                    if not line.strip() or line.startswith(b'date,'):
+                        continue
+
+                    date = line[:10].decode()
+                    lines.append(line)
+                    if date < since and date not in revised_dates:
+                        done = True
+                        break
+
+        df = pd.read_csv(io.BytesIO(b'\n'.join(reversed(lines))), header=None, names=list(CSV_COLUMNS),
+                         dtype={'date': 'str', **{field: 'float64' for field in CHART_FIELDS}}, engine=CSV_ENGINE)
+        return StockDataColumns.from_arrays(decode_dates(df['date']),
+                                            *(df[field].to_numpy(dtype=np.float64) for field in CHART_FIELDS))
+
+    def store(self, key: str, value: StockDataInfo):
+        effective_path = self._get_path(key)
+        meta = self._read_meta(key)
+        new = value.columns
+        if meta is None:
+            if effective_path.exists():
+                self.log_info(f'Rewriting stock data file for symbol {key} (Code: 423840926)')
+                self._compact(key, new=new)
+            else:
+                self.log_info(f'Creating new stock data file for symbol {key} (Code: 423840923)')
+                self._write(key, new)
+            return
+
+        if len(new) == 0:
+            return
+
+        last_date = np.datetime64(meta['last_date'], 'D') if meta['last_date'] else None
+        newer = new.dates > last_date if last_date is not None else np.ones(len(new), dtype=bool)
+        append = newer.copy()
+        revised_dates = set(meta['revised_dates'])
+
+        overlapping = np.flatnonzero(~newer)
+        if len(overlapping):
+            # compare with the stored rows of the same dates
+            stored = self._read_rows_since(key, since=new.dates[overlapping[0]], revised_dates=revised_dates)
+            positions = np.searchsorted(stored.dates, new.dates[overlapping])
+            found = positions < len(stored)
+            found[found] = stored.dates[positions[found]] == new.dates[overlapping][found]
+            changed = ~found
+            for field in CHART_FIELDS:
+                stored_values = np.full(len(overlapping), np.nan)
+                stored_values[found] = getattr(stored, field)[positions[found]]
+                changed |= ~np.isclose(getattr(new, field)[overlapping], stored_values, rtol=1e-12, atol=0.0,
+                                       equal_nan=True)
+
+            append[overlapping[changed]] = True
+            revised_dates.update(str(date) for date in new.dates[overlapping[changed]])
+
+        if not append.any():
+            self.log_debug(f'Stock data of symbol {key} is up to date (Code: 423840927)')
+            return
+
+        self.log_info(f'Appending {int(append.sum())} rows to stock data file for symbol {key} (Code: 423840923)')
+        rows = StockDataColumns(*(getattr(new, field)[append] for field in ('dates', *CHART_FIELDS)))
+        self._to_frame(rows).to_csv(effective_path, mode='a', header=False, index=False)
+
+        if len(revised_dates) > self._compaction_threshold:
+            self._compact(key)
+            return
+
+        self._write_meta(key, {'last_date': str(new.dates[-1] if last_date is None else max(new.dates[-1], last_date)),
+                               'rows': meta['rows'] + int(append.sum()),
+                               'revised_dates': sorted(revised_dates)})
+
+    def _write(self, key: str, columns: StockDataColumns) -> None:
+        """ (re-)writes the whole file (sorted, without duplicates) """
+        effective_path = self._get_path(key)
+        tmp_path = effective_path.with_suffix('.csv.tmp')
+        self._to_frame(columns).to_csv(tmp_path, index=False)
+        tmp_path.replace(effective_path)
+        self._write_meta(key, {'last_date': str(columns.dates[-1]) if len(columns) else None,
+                               'rows': len(columns),
+                               'revised_dates': []})
+
+    def _compact(self, key: str, new: StockDataColumns | None = None) -> None:
+        """ rewrites the file sorted and without duplicates (new values win over stored ones of the same date) """
+        columns = self.get(key).columns
+        if new is not None:
+            columns = StockDataColumns.from_arrays(np.concatenate([columns.dates, new.dates]),
+                                                   *(np.concatenate([getattr(columns, field), getattr(new, field)])
+                                                     for field in CHART_FIELDS))
+        self._write(key, columns)
+
+    def compact(self, key: str | None = None) -> None:
+        """ compacts the file of the given symbol (or all files containing appended revisions)
+
+        Args:
+            key (str, optional): The symbol to compact. Defaults to None (all symbols needing it).
+        """
+        for symbol in [key] if key is not None else self.list_keys():
+            meta = self._read_meta(symbol)
+            if key is not None or meta is None or meta['revised_dates']:
+                self.log_info(f'Compacting stock data file for symbol {symbol} (Code: 423840928)')
+                self._compact(symbol)
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return get_file_stamp(self._get_path(key))
 
     def list_keys(self) -> Iterable[str]:
         return [path.name.replace('.csv', '') for path in
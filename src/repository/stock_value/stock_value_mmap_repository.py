@@ -0,0 +1,244 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Memory mapped StockValue (Chart) Repository: all symbols in a  #
+# single data file plus a small JSON index                              #
+#########################################################################
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Hashable, Iterable, Iterator
+
+import numpy as np
+
+from datatypes.stock_data import StockDataInfo, StockDataColumns, CHART_FIELDS
+from exceptions.repository import StockGptRepositoryException
+from repository.i_repository import get_file_stamp, DEFAULT_IO_WORKERS
+from repository.stock_value.i_stock_value_repository import IStockValueRepository
+
+INDEX_FILE_NAME = 'universe_index.json'
+INDEX_FORMAT_VERSION = 1
+SLOT_SIZE = 8
+""" every value (dates as int64 days since epoch, all others as float64) takes 8 bytes """
+
+
+class StockValueMmapRepository(IStockValueRepository):
+    """ Keeps the charts of all symbols in one memory mapped data file.
+
+    Every symbol occupies a block of 6 consecutive columns (date, open, high, low, close, volume) with one slot per
+    row, so each column is contiguous and `get` returns zero-copy (read-only) views of the mapping. Processes
+    reading the same file share the page cache.
+    The index (`universe_index.json`) maps each symbol to the block's offset (in slots), its length (in rows) and
+    its first / last date.
+
+    Stores append a new block and replace the index atomically, so concurrent readers always see a consistent
+    state. Superseded blocks are garbage until the file gets compacted (automatically once they make up more
+    than `compaction_ratio` of the file). Only a single process may write at a time.
+    """
+    _base_path: Path
+    _compaction_ratio: float
+    _index: dict | None
+    _index_stamp: tuple[int, int] | None
+    _data: np.ndarray | None
+
+    def __init__(self, base_path: Path, *args, compaction_ratio: float = 0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not base_path.exists():
+            raise StockGptRepositoryException(f'Base path {base_path} does not exist (Code: 23482039)')
+
+        self._base_path = base_path
+        self._compaction_ratio = compaction_ratio
+        self._index = None
+        self._index_stamp = None
+        self._data = None
+
+    def __getstate__(self):
+        # the mapping is re-opened lazily (instead of pickling its content, e.g., when handed to worker processes)
+        return {**self.__dict__, '_index': None, '_index_stamp': None, '_data': None}
+
+    @property
+    def _index_path(self) -> Path:
+        return self._base_path / INDEX_FILE_NAME
+
+    def _get_index(self) -> dict:
+        """ the current index (re-read if another instance or process changed it) """
+        try:
+            stat = self._index_path.stat()
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            stamp = None
+
+        if self._index is None or stamp != self._index_stamp:
+            if stamp is None:
+                self._index = {'version': INDEX_FORMAT_VERSION, 'generation': 0, 'size': 0, 'garbage': 0,
+                               'symbols': {}}
+            else:
+                self._index = json.loads(self._index_path.read_text())
+                if self._index.get('version') != INDEX_FORMAT_VERSION:
+                    raise StockGptRepositoryException(f'Unsupported stock value index format in {self._index_path} '
+                                                      f'(Code: 23482041)')
+            self._index_stamp = stamp
+            self._data = None
+
+        return self._index
+
+    def _get_data_path(self, generation: int) -> Path:
+        return self._base_path / f'universe-{generation}.bin'
+
+    def _get_data(self) -> np.ndarray:
+        """ the mapping of the current data file (as float64 slots) """
+        index = self._get_index()
+        if self._data is None:
+            if index['size'] == 0:
+                self._data = np.empty(0, dtype=np.float64)
+            else:
+                self._data = np.memmap(self._get_data_path(index['generation']), dtype=np.float64, mode='r',
+                                       shape=(index['size'],))
+
+        return self._data
+
+    def _get_columns(self, key: str) -> StockDataColumns | None:
+        entry = self._get_index()['symbols'].get(key)
+        if entry is None:
+            return None
+
+        data = self._get_data()
+        offset, length = entry['offset'], entry['length']
+        columns = [data[offset + i * length:offset + (i + 1) * length] for i in range(1 + len(CHART_FIELDS))]
+
+        # blocks are written sorted and without duplicates
+        return StockDataColumns(columns[0].view(np.int64).view('datetime64[D]'), *columns[1:])
+
+    def _write_index(self, index: dict) -> None:
+        tmp_path = self._index_path.with_suffix('.json.tmp')
+        tmp_path.write_text(json.dumps(index))
+        tmp_path.replace(self._index_path)
+        self._index = None
+
+    @staticmethod
+    def _get_block(columns: StockDataColumns) -> bytes:
+        return b''.join([columns.dates.astype('datetime64[D]').view(np.int64).tobytes(),
+                         *(np.ascontiguousarray(getattr(columns, field), dtype=np.float64).tobytes()
+                           for field in CHART_FIELDS)])
+
+    @staticmethod
+    def _get_index_entry(offset: int, columns: StockDataColumns) -> dict:
+        return {'offset': offset,
+                'length': len(columns),
+                'first_date': str(columns.dates[0]) if len(columns) else None,
+                'last_date': str(columns.dates[-1]) if len(columns) else None}
+
+    def get(self, key: str) -> StockDataInfo | None:
+        columns = self._get_columns(key)
+        if columns is None:
+            return None
+
+        return StockDataInfo.from_columns(symbol=key, columns=columns)
+
+    def get_many(self,
+                 keys: Iterable[str],
+                 max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[tuple[str, StockDataInfo | None]]:
+        # the charts are views of the mapping, there is nothing to read ahead
+        for key in keys:
+            yield key, self.get(key)
+
+    def store(self, key: str, value: StockDataInfo):
+        self.store_many([(key, value)])
+
+    def store_many(self, items: Iterable[tuple[str, StockDataInfo]], max_workers: int = DEFAULT_IO_WORKERS) -> None:
+        # all blocks are appended with one write of the index (instead of one per symbol)
+        items = iter(items)
+        item = next(items, None)
+        while item is not None:
+            item = self._append_blocks(item, items)
+
+        index = self._get_index()
+        if index['garbage'] > self._compaction_ratio * index['size']:
+            self.compact()
+
+    def _append_blocks(self,
+                       item: tuple[str, StockDataInfo],
+                       items: Iterator[tuple[str, StockDataInfo]]) -> tuple[str, StockDataInfo] | None:
+        """ appends the blocks of the given item and the following ones and writes the index. Stops at the first
+        repeated symbol (which has to be merged with the block just appended) and returns its item (None at the end)
+        """
+        index = self._get_index()
+        symbols = dict(index['symbols'])
+        garbage = index['garbage']
+        stored = set()
+
+        # append behind the used part of the file (anything after it is left over from interrupted writes)
+        data_path = self._get_data_path(index['generation'])
+        offset = index['size']
+        with open(data_path, 'r+b' if data_path.exists() else 'wb') as f:
+            f.seek(offset * SLOT_SIZE)
+            while item is not None and item[0] not in stored:
+                key, value = item
+                old = self._get_columns(key)
+                new = value.columns
+                if old is None:
+                    self.log_info(f'Creating new stock data block for symbol {key} (Code: 423840924)')
+                    columns = new
+                else:
+                    # new values win over stored ones of the same date
+                    columns = StockDataColumns.from_arrays(np.concatenate([old.dates, new.dates]),
+                                                           *(np.concatenate([getattr(old, field),
+                                                                             getattr(new, field)])
+                                                             for field in CHART_FIELDS))
+
+                f.write(self._get_block(columns))
+                old_entry = symbols.get(key)
+                garbage += old_entry['length'] * (1 + len(CHART_FIELDS)) if old_entry else 0
+                symbols[key] = self._get_index_entry(offset, columns)
+                offset += len(columns) * (1 + len(CHART_FIELDS))
+                stored.add(key)
+                item = next(items, None)
+
+        self._write_index({**index, 'size': offset, 'garbage': garbage, 'symbols': symbols})
+        return item
+
+    def rebuild(self, stock_infos: Iterable[StockDataInfo]) -> None:
+        """ replaces the whole content by the given charts (e.g., to import another repository) """
+        self._write_generation({stock_info.symbol: stock_info.columns for stock_info in stock_infos})
+
+    def compact(self) -> None:
+        """ rewrites the data file without superseded blocks """
+        self.log_info(f'Compacting stock values in {self._base_path} (Code: 423840925)')
+        self._write_generation({key: self._get_columns(key) for key in self.list_keys()})
+
+    def _write_generation(self, charts: dict[str, StockDataColumns]) -> None:
+        """ writes the given charts into a new data file and switches the index over to it """
+        old_generation = self._get_index()['generation']
+        generation = old_generation + 1
+        symbols = {}
+        offset = 0
+        with open(self._get_data_path(generation), 'wb') as f:
+            for key, columns in charts.items():
+                f.write(self._get_block(columns))
+                symbols[key] = self._get_index_entry(offset, columns)
+                offset += len(columns) * (1 + len(CHART_FIELDS))
+
+        self._write_index({'version': INDEX_FORMAT_VERSION, 'generation': generation, 'size': offset, 'garbage': 0,
+                           'symbols': symbols})
+
+        # processes still mapping the old file keep their mapping until they re-read the index
+        self._get_data_path(old_generation).unlink(missing_ok=True)
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return get_file_stamp(self._index_path)
+
+    def list_keys(self) -> Iterable[str]:
+        return list(self._get_index()['symbols'].keys())
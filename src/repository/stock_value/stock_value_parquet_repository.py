@@ -0,0 +1,111 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Parquet based implementation for StockValue (Chart) Repository #
+# (typed columns, needs the optional dependency `pyarrow`)              #
+#########################################################################
+
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+from typing import Hashable, Iterable
+
+import numpy as np
+
+from datatypes.stock_data import StockDataInfo, StockDataColumns, CHART_FIELDS
+from exceptions.repository import StockGptRepositoryException
+from repository.i_repository import get_file_stamp
+from repository.stock_value.i_stock_value_repository import IStockValueRepository
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+
+class StockValueParquetRepository(IStockValueRepository):
+    """ Stores every symbol as Parquet file with a `date` (date32) column and float64 value columns """
+    _base_path: Path
+
+    def __init__(self, base_path: Path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if pq is None:
+            raise StockGptRepositoryException('The parquet stock value backend needs the package pyarrow '
+                                              '(pip install pyarrow) (Code: 23482040)')
+
+        if not base_path.exists():
+            raise StockGptRepositoryException(f'Base path {base_path} does not exist (Code: 23482039)')
+
+        self._base_path = base_path
+
+    def _get_columns(self, path: Path, filters: list[tuple] | None = None) -> StockDataColumns | None:
+        if not path.exists():
+            return None
+
+        table = pq.read_table(path, columns=['date', *CHART_FIELDS], filters=filters)
+        return StockDataColumns.from_arrays(table.column('date').to_numpy().astype('datetime64[D]'),
+                                            *(table.column(field).to_numpy() for field in CHART_FIELDS))
+
+    def get(self, key: str) -> StockDataInfo | None:
+        columns = self._get_columns(self._base_path / f'{key}.parquet')
+        if columns is None:
+            return None
+
+        return StockDataInfo.from_columns(symbol=key, columns=columns)
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> StockDataInfo | None:
+        # the filters skip row groups by their statistics before decoding
+        filters = [('date', '>=', date_from)] if date_from is not None else []
+        filters += [('date', '<=', date_to)] if date_to is not None else []
+        columns = self._get_columns(self._base_path / f'{key}.parquet', filters=filters or None)
+        if columns is None:
+            return None
+
+        return StockDataInfo.from_columns(symbol=key, columns=columns)
+
+    def store(self, key: str, value: StockDataInfo):
+        effective_path = self._base_path / f'{key}.parquet'
+        old = self._get_columns(effective_path)
+        new = value.columns
+        if old is None:
+            self.log_info(f'Creating new stock data file for symbol {key} (Code: 423840923)')
+            columns = new
+        else:
+            self.log_info(f'Loading existing stock data file for symbol {key} (Code: 423840923)')
+            # new values win over stored ones of the same date
+            columns = StockDataColumns.from_arrays(np.concatenate([old.dates, new.dates]),
+                                                   *(np.concatenate([getattr(old, field), getattr(new, field)])
+                                                     for field in CHART_FIELDS))
+
+        table = pa.table({
+            'date': pa.array(columns.dates, type=pa.date32()),
+            **{field: pa.array(getattr(columns, field), type=pa.float64()) for field in CHART_FIELDS},
+        })
+
+        # write to a temporary file first so readers never see a partially written file
+        tmp_path = effective_path.with_suffix('.parquet.tmp')
+        pq.write_table(table, tmp_path)
+        tmp_path.replace(effective_path)
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return get_file_stamp(self._base_path / f'{key}.parquet')
+
+    def list_keys(self) -> Iterable[str]:
+        return [path.name.replace('.parquet', '') for path in
+                self._base_path.iterdir() if path.is_file() and path.name.endswith('.parquet')]
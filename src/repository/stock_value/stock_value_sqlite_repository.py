@@ -0,0 +1,115 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: SQLite implementation of the stock value repository            #
+#########################################################################
+
+from __future__ import annotations
+
+import datetime
+import sqlite3
+from typing import Hashable, Iterable, Iterator
+
+import numpy as np
+
+from datatypes.stock_data import StockDataInfo, StockDataColumns, CHART_FIELDS
+from repository.i_repository import DEFAULT_IO_WORKERS
+from repository.sqlite_database import SqliteDatabase, get_date_condition, select_grouped, iterate_chunks
+from repository.stock_value.i_stock_value_repository import IStockValueRepository
+
+
+class StockValueSqliteRepository(IStockValueRepository):
+    """ Stores the charts in the table `stock_values` (one row per symbol and date) """
+    _database: SqliteDatabase
+
+    def __init__(self, database: SqliteDatabase, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._database = database
+
+    def _has_key(self, key: str) -> bool:
+        return self._database.get_connection().execute(
+            'SELECT 1 FROM stock_values WHERE symbol = ? LIMIT 1', (key,)).fetchone() is not None
+
+    def _query(self, key: str, condition: str = '', parameters: tuple = (), order: str = 'ASC',
+               limit: int = -1) -> StockDataInfo | None:
+        """ reads the rows of the symbol matching the (date) condition (None if the symbol is unknown) """
+        rows = self._database.get_connection().execute(
+            f'SELECT date, {", ".join(CHART_FIELDS)} FROM stock_values WHERE symbol = ? {condition} '
+            f'ORDER BY date {order} LIMIT ?', (key, *parameters, limit)).fetchall()
+        if not rows and not self._has_key(key):
+            return None
+
+        if order == 'DESC':
+            rows.reverse()
+
+        return self._decode(key, rows)
+
+    @staticmethod
+    def _decode(key: str, rows: list[tuple]) -> StockDataInfo:
+        """ the chart of the (date, open, high, low, close, volume) rows (sorted by date) """
+        # (missing values come as None and end up as NaN)
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), 1 + len(CHART_FIELDS))
+        dates = np.array([row[0] for row in rows], dtype=np.int64).astype('datetime64[D]')
+        return StockDataInfo.from_columns(symbol=key,
+                                          columns=StockDataColumns(dates, *(np.ascontiguousarray(values[:, i + 1])
+                                                                            for i in range(len(CHART_FIELDS)))))
+
+    def get(self, key: str) -> StockDataInfo | None:
+        return self._query(key)
+
+    def get_range(self,
+                  key: str,
+                  date_from: datetime.date | None = None,
+                  date_to: datetime.date | None = None) -> StockDataInfo | None:
+        return self._query(key, *get_date_condition(date_from, date_to))
+
+    def get_latest(self, key: str, n: int, as_of: datetime.date | None = None) -> StockDataInfo | None:
+        return self._query(key, *get_date_condition(None, as_of), order='DESC', limit=max(n, 0))
+
+    def get_many(self,
+                 keys: Iterable[str],
+                 max_workers: int = DEFAULT_IO_WORKERS) -> Iterator[tuple[str, StockDataInfo | None]]:
+        # one query per chunk of symbols instead of threads
+        for key, rows in select_grouped(self._database.get_connection(),
+                                        f'SELECT symbol, date, {", ".join(CHART_FIELDS)} FROM stock_values '
+                                        f'WHERE symbol IN ({{keys}}) ORDER BY symbol, date', keys):
+            yield key, None if rows is None else self._decode(key, rows)
+
+    def _insert(self, connection: sqlite3.Connection, key: str, value: StockDataInfo) -> None:
+        columns = value.columns
+        rows = zip([key] * len(columns),
+                   columns.dates.astype(np.int64).tolist(),
+                   *(getattr(columns, field).tolist() for field in CHART_FIELDS))
+        self.log_info(f'Storing {len(columns)} stock values of symbol {key} (Code: 23984292)')
+        # new values win over stored ones of the same date
+        connection.executemany(f'INSERT OR REPLACE INTO stock_values (symbol, date, {", ".join(CHART_FIELDS)}) '
+                               f'VALUES (?, ?{", ?" * len(CHART_FIELDS)})', rows)
+
+    def store(self, key: str, value: StockDataInfo):
+        with self._database.transaction() as connection:
+            self._insert(connection, key, value)
+
+    def store_many(self, items: Iterable[tuple[str, StockDataInfo]], max_workers: int = DEFAULT_IO_WORKERS) -> None:
+        # one transaction per chunk instead of threads (there is only one writer at a time anyway)
+        for chunk in iterate_chunks(items):
+            with self._database.transaction() as connection:
+                for key, value in chunk:
+                    self._insert(connection, key, value)
+
+    def get_source_stamp(self, key: str) -> Hashable | None:
+        return self._database.get_change_stamp()
+
+    def list_keys(self) -> Iterable[str]:
+        return [symbol for symbol, in self._database.get_connection().execute(
+            'SELECT DISTINCT symbol FROM stock_values ORDER BY symbol')]
@@ -18,15 +18,17 @@ import argparse
 import datetime
 import gettext
 
-from cli.commands import update_market_indicator_data, update_stock_symbol_data, update_stock_indicator_data, \
-    update_news_data, generate_query
+from cli.commands import update_market_indicator_data, update_stock_symbols_data, update_stock_indicator_data, \
+    update_news_data, generate_query, compact_stock_value_data, import_data_into_sqlite
+from fetch.fredapi import DEFAULT_FETCH_WORKERS, DEFAULT_INDICATOR_OVERLAP_DAYS
+from fetch.http_client import HttpClient, set_http_client
+from fetch.rate_limit import set_rate_limit
+from fetch.stocks import DEFAULT_FETCH_CONCURRENCY, DEFAULT_INCREMENTAL_OVERLAP_DAYS
 from fetch.yfinance import fetch_basic_stock_info
 from log.logger import get_default_cli_logger
 from misc.app_state import get_app_config
-from repository.market_indicator.market_indicator_file_repository import MarketIndicatorFileRepository
-from repository.news.news_article_file_repository import NewsArticleFileRepository
-from repository.stock_indicator.stock_indicator_file_repository import StockIndicatorFileRepository
-from repository.stock_value.stock_value_file_repository import StockValueFileRepository
+from repository.factory import create_stock_value_repository, create_stock_indicator_repository, \
+    create_market_indicator_repository, create_news_article_repository
 
 _ = gettext.gettext
 
@@ -63,6 +65,29 @@ def parse_arguments():
                                 default=datetime.date.today(),
                                 help=_("End date in YYYY-MM-DD format (default: today)"))
 
+    collect_parser.add_argument('--concurrency',
+                                type=int,
+                                default=DEFAULT_FETCH_CONCURRENCY,
+                                help=_("Number of symbols requested at once (default: {concurrency}). "
+                                       "Requests are rate limited per provider "
+                                       "(see STOCKGPT_PROVIDER_RATE_LIMITS)").format(
+                                    concurrency=DEFAULT_FETCH_CONCURRENCY))
+
+    collect_parser.add_argument('--incremental',
+                                action='store_true',
+                                help=_("Only request the dates after the latest stored one of each symbol "
+                                       "(and a few days before it to catch revisions). "
+                                       "Symbols without stored values are loaded from --start"))
+
+    collect_parser.add_argument('--overlap-days',
+                                type=int,
+                                default=DEFAULT_INCREMENTAL_OVERLAP_DAYS,
+                                help=_("Days before the latest stored date requested again by --incremental "
+                                       "(default: {days})").format(days=DEFAULT_INCREMENTAL_OVERLAP_DAYS))
+
+    symbol_subcommands.add_parser('compact',
+                                  help=_("Rewrite the stored charts without superseded (revised) rows"))
+
     market_indicator_command = toplevel_parser.add_parser('market-indicators', help=_("Collect market indicators"))
 
     market_indicator_command.add_argument('--start',
@@ -83,6 +108,21 @@ def parse_arguments():
                                    help=_("List of indicators to collect data for (defaults to: {indicators}). "
                                           "See readme.md for descriptions").format(
                                        indicators=app_config.default_market_indicators))
+    indicator_collect.add_argument('--workers',
+                                   type=int,
+                                   default=DEFAULT_FETCH_WORKERS,
+                                   help=_("Number of indicators requested at once (default: {workers}). "
+                                          "Requests are rate limited per provider "
+                                          "(see STOCKGPT_PROVIDER_RATE_LIMITS)").format(workers=DEFAULT_FETCH_WORKERS))
+    indicator_collect.add_argument('--incremental',
+                                   action='store_true',
+                                   help=_("Only request the observations from the latest stored date of each "
+                                          "indicator on"))
+    indicator_collect.add_argument('--overlap-days',
+                                   type=int,
+                                   default=DEFAULT_INDICATOR_OVERLAP_DAYS,
+                                   help=_("Days before the latest stored date requested again by --incremental "
+                                          "(default: {days})").format(days=DEFAULT_INDICATOR_OVERLAP_DAYS))
     news_command = toplevel_parser.add_parser('news', help=_("Collect news data"))
     news_subcommands = news_command.add_subparsers(dest='news_command')
     news_update_parser = news_subcommands.add_parser('update', help=_("Update news data"))
@@ -99,7 +139,31 @@ def parse_arguments():
                                     help=_("Number of news articles to collect per symbol."))
     stock_indicators_parser = toplevel_parser.add_parser('stock-indicators', help=_("Calculate stock indicators"))
     stock_indicators_update_parser = stock_indicators_parser.add_subparsers(dest='stock_indicator_command')
-    stock_indicators_update_parser.add_parser('update', help=_("Update stock indicators"))
+    stock_indicators_update = stock_indicators_update_parser.add_parser('update', help=_("Update stock indicators"))
+    stock_indicators_update.add_argument('--incremental',
+                                         action='store_true',
+                                         help=_("Only calculate indicator values for dates newer than "
+                                                "the already stored ones, reading only the needed warm-up history "
+                                                "(does not use the cache)"))
+    stock_indicators_update.add_argument('--workers',
+                                         type=int,
+                                         default=1,
+                                         help=_("Number of processes calculating symbols in parallel (default: 1)"))
+    stock_indicators_update.add_argument('--engine',
+                                         choices=['symbol', 'batch'],
+                                         default='symbol',
+                                         help=_("'symbol' calculates one symbol after another, 'batch' calculates "
+                                                "all symbols at once over a symbols x dates matrix "
+                                                "(default: symbol)"))
+    stock_indicators_update.add_argument('--no-cache',
+                                         action='store_true',
+                                         help=_("Recalculate all symbols, even if their stock values did not change "
+                                                "since the last update"))
+
+    database_command = toplevel_parser.add_parser('database', help=_("Manage the SQLite database"))
+    database_subcommands = database_command.add_subparsers(dest='database_command')
+    database_subcommands.add_parser('import',
+                                    help=_("Import the file based data (data/stock_data) into the SQLite database"))
 
     # Add the new 'query' command
     query_command = toplevel_parser.add_parser('query',
@@ -158,21 +222,28 @@ def parse_arguments():
 def main():
     args = parse_arguments()
     logger = get_default_cli_logger()
+    for provider, rate in get_app_config().provider_rate_limits.items():
+        set_rate_limit(provider=provider, rate=rate)
+    set_http_client(HttpClient(timeout=get_app_config().http_timeout,
+                               max_retries=get_app_config().http_max_retries,
+                               logger=logger))
+
     if args.command == 'market-indicators':
         if args.indicator_command == 'update':
             update_market_indicator_data(
                 app_config=get_app_config(),
-                repo=MarketIndicatorFileRepository(base_path=get_app_config().market_indicator_base_dir,
-                                                   logger=get_default_cli_logger()),
+                repo=create_market_indicator_repository(app_config=get_app_config(), logger=get_default_cli_logger()),
                 logger=get_default_cli_logger(),
                 indicators=args.indicator,
                 from_date=args.start,
-                to_date=args.end
+                to_date=args.end,
+                workers=args.workers,
+                incremental=args.incremental,
+                overlap_days=args.overlap_days
             )
     elif args.command == 'symbols':
         if args.symbol_command == 'collect':
-            repo = StockValueFileRepository(base_path=get_app_config().stock_value_base_dir,
-                                            logger=logger)
+            repo = create_stock_value_repository(app_config=get_app_config(), logger=logger)
             if args.symbol is None:
                 symbols = repo.list_keys()
                 logger.info(_("Updating all symbols: {symbols} (Code: 2482903)")
@@ -180,39 +251,47 @@ def main():
             else:
                 symbols = args.symbol
 
-            for symbol in symbols:
-                update_stock_symbol_data(
-                    repo=repo,
-                    logger=logger,
-                    symbol=symbol,
-                    from_date=args.start,
-                    to_date=args.end
-                )
+            update_stock_symbols_data(
+                repo=repo,
+                logger=logger,
+                symbols=list(symbols),
+                from_date=args.start,
+                to_date=args.end,
+                concurrency=args.concurrency,
+                incremental=args.incremental,
+                overlap_days=args.overlap_days,
+            )
+
+        elif args.symbol_command == 'compact':
+            compact_stock_value_data(repo=create_stock_value_repository(app_config=get_app_config(), logger=logger),
+                                     logger=logger)
 
     elif args.command == 'stock-indicators':
         if args.stock_indicator_command == 'update':
             update_stock_indicator_data(
-                stock_value_repo=StockValueFileRepository(base_path=get_app_config().stock_value_base_dir,
-                                                          logger=logger),
-                stock_indicator_repo=StockIndicatorFileRepository(base_path=get_app_config().stock_indicators_base_dir,
-                                                                  logger=logger),
+                stock_value_repo=create_stock_value_repository(app_config=get_app_config(), logger=logger),
+                stock_indicator_repo=create_stock_indicator_repository(app_config=get_app_config(), logger=logger),
                 indicators_to_update=get_app_config().default_stock_indicators,
                 logger=get_default_cli_logger(),
+                incremental=args.incremental,
+                workers=args.workers,
+                engine=args.engine,
+                cache_file=(get_app_config().stock_indicators_cache_file
+                            if not args.no_cache and args.engine == 'symbol' else None),
             )
 
     elif args.command == 'news':
         if args.news_command == 'update':
             symbols = args.symbol
             if not symbols:
-                repo_stock_value = StockValueFileRepository(base_path=get_app_config().stock_value_base_dir,
-                                                            logger=logger)
+                repo_stock_value = create_stock_value_repository(app_config=get_app_config(), logger=logger)
                 symbols = repo_stock_value.list_keys()
 
             for symbol in symbols:
                 stock_data = fetch_basic_stock_info(symbol=symbol)
                 update_news_data(
-                    repo=NewsArticleFileRepository(base_path=get_app_config().default_news_article_base_dir,
-                                                   logger=get_default_cli_logger()),
+                    repo=create_news_article_repository(app_config=get_app_config(),
+                                                        logger=get_default_cli_logger()),
                     symbol=symbol,
                     stock_name=stock_data.name,
                     news_api_key=get_app_config().news_api_key,
@@ -220,6 +299,10 @@ def main():
                     page_size=args.page_size,
                 )
 
+    elif args.command == 'database':
+        if args.database_command == 'import':
+            import_data_into_sqlite(app_config=get_app_config(), logger=logger)
+
     if args.command == 'query' and args.query_command == 'generate':
         today = datetime.date.today()
         if args.day > today:
@@ -227,17 +310,13 @@ def main():
                            "Please provide a date that is not in the future."))
             exit(1)
         else:
-            market_indicator_repo = MarketIndicatorFileRepository(base_path=get_app_config().market_indicator_base_dir,
-                                                                  logger=logger)
+            market_indicator_repo = create_market_indicator_repository(app_config=get_app_config(), logger=logger)
 
-            stock_indicator_repo = StockIndicatorFileRepository(base_path=get_app_config().stock_indicators_base_dir,
-                                                                logger=logger)
+            stock_indicator_repo = create_stock_indicator_repository(app_config=get_app_config(), logger=logger)
 
-            symbol_value_repo = StockValueFileRepository(base_path=get_app_config().stock_value_base_dir,
-                                                         logger=logger)
+            symbol_value_repo = create_stock_value_repository(app_config=get_app_config(), logger=logger)
 
-            news_repo = NewsArticleFileRepository(base_path=get_app_config().default_news_article_base_dir,
-                                                  logger=logger)
+            news_repo = create_news_article_repository(app_config=get_app_config(), logger=logger)
 
             generate_query(
                 market_indicator_repo=market_indicator_repo,
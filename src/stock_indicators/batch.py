@@ -0,0 +1,195 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Cross-sectional indicator calculation over a                   #
+# symbols x dates matrix (all symbols in one vectorized pass)           #
+#########################################################################
+from __future__ import annotations
+
+import dataclasses
+from typing import Callable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from datatypes.stock_data import StockDataInfo, CHART_FIELDS
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class UniverseMatrix:
+    """ Charts of several symbols aligned to the union of their dates (symbols x dates, NaN padded) """
+    symbols: list[str]
+    dates: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def from_stock_infos(cls, stock_infos: list[StockDataInfo]) -> UniverseMatrix:
+        """ aligns the given charts to the union of their dates """
+        dates = np.unique(np.concatenate([info.columns.dates for info in stock_infos])) \
+            if stock_infos else np.array([], dtype='datetime64[D]')
+        matrices = {field: np.full((len(stock_infos), len(dates)), np.nan) for field in CHART_FIELDS}
+        for row, info in enumerate(stock_infos):
+            positions = np.searchsorted(dates, info.columns.dates)
+            for field in CHART_FIELDS:
+                matrices[field][row, positions] = getattr(info.columns, field)
+
+        return cls(symbols=[info.symbol for info in stock_infos], dates=dates, **matrices)
+
+    def get_positions(self, stock_info: StockDataInfo) -> np.ndarray:
+        """ column positions of the dates of the given chart """
+        return np.searchsorted(self.dates, stock_info.columns.dates)
+
+
+def _calculate_on_valid_cells(matrix: UniverseMatrix,
+                              fields: tuple[str, ...],
+                              func: Callable[..., tuple[np.ndarray, ...]]) -> tuple[np.ndarray, ...]:
+    """ 2-D counterpart of `calculate_outputs_on_valid_rows`: the valid cells of every symbol are packed to
+    the left (so all symbols start at column 0), `func` runs once over the packed matrices and the results
+    are spread back, carrying the last valid value over cells with missing inputs
+    """
+    values = [getattr(matrix, field) for field in fields]
+    valid = np.logical_and.reduce([~np.isnan(value) for value in values])
+
+    # stable sort moves the valid cells to the front keeping their order
+    order = np.argsort(~valid, axis=1, kind='stable')
+    packed_valid = np.take_along_axis(valid, order, axis=1)
+    packed = [np.where(packed_valid, np.take_along_axis(value, order, axis=1), np.nan) for value in values]
+
+    results = func(*packed)
+
+    positions = np.cumsum(valid, axis=1) - 1
+    has_previous = positions >= 0
+    clipped = np.maximum(positions, 0)
+    return tuple(np.where(has_previous, np.take_along_axis(result, clipped, axis=1), np.nan) for result in results)
+
+
+def _sma(values: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= period:
+        sums = np.cumsum(values, axis=1)
+        out[:, period - 1] = sums[:, period - 1]
+        out[:, period:] = sums[:, period:] - sums[:, :-period]
+        out[:, period - 1:] /= period
+
+    return out
+
+
+def _ema(values: np.ndarray, period: int, seed_column: int | None = None) -> np.ndarray:
+    """ EMA seeded with the mean of the `period` values ending at `seed_column` (TA-Lib style) """
+    seed_column = period - 1 if seed_column is None else seed_column
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] <= seed_column:
+        return out
+
+    k = 2.0 / (period + 1)
+    ema = values[:, seed_column - period + 1:seed_column + 1].mean(axis=1)
+    out[:, seed_column] = ema
+    for column in range(seed_column + 1, values.shape[1]):
+        ema = (values[:, column] - ema) * k + ema
+        out[:, column] = ema
+
+    return out
+
+
+def _rsi(closes: np.ndarray, period: int = 14) -> tuple[np.ndarray]:
+    out = np.full(closes.shape, np.nan)
+    if closes.shape[1] <= period:
+        return out,
+
+    changes = np.diff(closes, axis=1)
+    gains, losses = np.maximum(changes, 0.0), np.maximum(-changes, 0.0)
+    average_gain = gains[:, :period].mean(axis=1)
+    average_loss = losses[:, :period].mean(axis=1)
+    for column in range(period, closes.shape[1]):
+        if column > period:
+            average_gain = (average_gain * (period - 1) + gains[:, column - 1]) / period
+            average_loss = (average_loss * (period - 1) + losses[:, column - 1]) / period
+        total = average_gain + average_loss
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, column] = np.where(np.abs(total) < 1e-14, 0.0, 100.0 * average_gain / total)
+
+    return out,
+
+
+def _macd(closes: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple[np.ndarray, ...]:
+    # both EMAs start at the same column (as in TA-Lib)
+    macd = _ema(closes, fast, seed_column=slow - 1) - _ema(closes, slow)
+    macd_signal = np.full(closes.shape, np.nan)
+    macd_signal[:, slow - 1:] = _ema(macd[:, slow - 1:], signal)
+    macd[np.isnan(macd_signal)] = np.nan
+
+    return macd, macd_signal, macd - macd_signal
+
+
+def _bbands(closes: np.ndarray, period: int = 20, deviations: float = 2.0) -> tuple[np.ndarray, ...]:
+    middle = np.full(closes.shape, np.nan)
+    deviation = np.full(closes.shape, np.nan)
+    if closes.shape[1] >= period:
+        windows = sliding_window_view(closes, period, axis=1)
+        middle[:, period - 1:] = windows.mean(axis=-1)
+        deviation[:, period - 1:] = deviations * windows.std(axis=-1)
+
+    return middle + deviation, middle, middle - deviation
+
+
+def _obv(closes: np.ndarray, volumes: np.ndarray) -> tuple[np.ndarray]:
+    directions = np.zeros(closes.shape)
+    directions[:, 0] = 1.0
+    directions[:, 1:] = np.sign(np.diff(closes, axis=1))
+
+    return np.cumsum(directions * volumes, axis=1),
+
+
+# indicator ids -> (input fields, function calculating them in the order of the ids)
+BATCH_KERNELS: dict[tuple[str, ...], tuple[tuple[str, ...], Callable[..., tuple[np.ndarray, ...]]]] = {
+    ('SMA50',): (('close',), lambda closes: (_sma(closes, 50),)),
+    ('SMA200',): (('close',), lambda closes: (_sma(closes, 200),)),
+    ('EMA50',): (('close',), lambda closes: (_ema(closes, 50),)),
+    ('EMA200',): (('close',), lambda closes: (_ema(closes, 200),)),
+    ('RSI',): (('close',), _rsi),
+    ('MACD', 'MACD_Signal', 'MACD_Hist'): (('close',), _macd),
+    ('BB_Upper', 'BB_Middle', 'BB_Lower'): (('close',), _bbands),
+    ('OBV',): (('close', 'volume'), _obv),
+}
+
+
+def get_batch_supported_ids() -> set[str]:
+    """ indicator ids the batch engine calculates itself """
+    return {indicator_id for output_ids in BATCH_KERNELS for indicator_id in output_ids}
+
+
+def calculate_batch(matrix: UniverseMatrix, indicator_ids: list[str]) -> dict[str, np.ndarray]:
+    """ calculates the supported indicators for all symbols of the matrix at once
+
+    Args:
+        matrix (UniverseMatrix): The aligned charts
+        indicator_ids (list[str]): The indicators to calculate (unsupported ones are ignored,
+            see `get_batch_supported_ids`)
+    Returns:
+        dict[str, np.ndarray]: indicator id -> values (symbols x dates)
+    """
+    results = {}
+    for output_ids, (fields, func) in BATCH_KERNELS.items():
+        if not any(output_id in indicator_ids for output_id in output_ids):
+            continue
+
+        outputs = _calculate_on_valid_cells(matrix, fields, func)
+        results.update({output_id: output for output_id, output in zip(output_ids, outputs)
+                        if output_id in indicator_ids})
+
+    return results
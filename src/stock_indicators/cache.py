@@ -0,0 +1,176 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Persisted cache of the price data the stored indicators were  #
+# calculated on (allows skipping unchanged symbols)                     #
+#########################################################################
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable
+
+from datatypes.stock_data import StockDataColumns, CHART_FIELDS
+from log.logger import get_default_logger
+from stock_indicators.registry import get_stock_indicator_registry
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 64
+
+
+@dataclasses.dataclass
+class StockIndicatorCacheEntry:
+    """ Fingerprint of the chart the indicators of a symbol were last calculated on """
+    indicator_set_key: str
+    block_size: int
+    rows: int
+    block_hashes: list[str]
+    """ hashes of consecutive blocks of `block_size` rows (allows finding the first changed date) """
+
+
+@dataclasses.dataclass
+class StockIndicatorCacheStats:
+    hits: int = 0
+    """ unchanged symbols (skipped) """
+    partial_hits: int = 0
+    """ symbols recalculated from the first changed date on """
+    misses: int = 0
+    """ symbols recalculated completely """
+
+    def merge(self, other: StockIndicatorCacheStats) -> None:
+        self.hits += other.hits
+        self.partial_hits += other.partial_hits
+        self.misses += other.misses
+
+
+class StockIndicatorCache:
+    """ Remembers per symbol which price data the stored indicators were calculated on.
+    Keyed by a fingerprint of the chart plus the indicator set (ids and their versions).
+    """
+    _path: Path | None
+    _entries: dict[str, StockIndicatorCacheEntry]
+    block_size: int
+    stats: StockIndicatorCacheStats
+
+    def __init__(self, path: Path | None = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            path (Path, optional): JSON file the cache is persisted in. If not given the cache is not persisted.
+            block_size (int, optional): Number of rows hashed together. Defaults to 64.
+        """
+        self._path = path
+        self._entries = {}
+        self.block_size = block_size
+        self.stats = StockIndicatorCacheStats()
+
+        if path is not None and path.exists():
+            try:
+                content = json.loads(path.read_text())
+                if content.get('version') == CACHE_FORMAT_VERSION:
+                    self._entries = {symbol: StockIndicatorCacheEntry(**entry)
+                                     for symbol, entry in content['entries'].items()}
+            except Exception as e:
+                get_default_logger().warning(f"Could not read stock indicator cache {path} due to {e}. "
+                                             f"Starting with an empty cache (Code: 39482093)")
+
+    @staticmethod
+    def get_indicator_set_key(indicator_ids: Iterable[str]) -> str:
+        """ key of the given indicators including their implementations' versions """
+        registry = get_stock_indicator_registry()
+        parts = []
+        for indicator_id in sorted(set(indicator_ids)):
+            metadata = registry.get_metadata(indicator_id)
+            parts.append(f'{indicator_id}:{metadata.indicator_cls.__module__}.{metadata.indicator_cls.__qualname__}'
+                         f':{metadata.version}' if metadata else indicator_id)
+
+        return hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+
+    def get_block_hashes(self, columns: StockDataColumns) -> list[str]:
+        """ hashes of consecutive blocks of the chart's rows """
+        hashes = []
+        for start in range(0, len(columns), self.block_size):
+            block = columns.slice(start, start + self.block_size)
+            digest = hashlib.blake2b(block.dates.view('int64').tobytes(), digest_size=8)
+            for field in CHART_FIELDS:
+                digest.update(getattr(block, field).tobytes())
+            hashes.append(digest.hexdigest())
+
+        return hashes
+
+    def make_entry(self, columns: StockDataColumns, indicator_set_key: str) -> StockIndicatorCacheEntry:
+        return StockIndicatorCacheEntry(indicator_set_key=indicator_set_key,
+                                        block_size=self.block_size,
+                                        rows=len(columns),
+                                        block_hashes=self.get_block_hashes(columns))
+
+    def lookup(self, symbol: str, columns: StockDataColumns, indicator_set_key: str) -> int:
+        """ finds the first row of the chart which differs from the one the indicators were calculated on
+        (and counts the result in `stats`)
+
+        Args:
+            symbol (str): The symbol
+            columns (StockDataColumns): The current chart of the symbol
+            indicator_set_key (str): Key of the indicators to calculate (see `get_indicator_set_key`)
+        Returns:
+            int: Index of the first changed row (`len(columns)` if nothing changed, 0 if nothing is known or the
+                chart got shorter)
+        """
+        entry = self._entries.get(symbol)
+        first_changed = 0
+        if entry is not None and entry.indicator_set_key == indicator_set_key and entry.block_size == self.block_size:
+            unchanged_blocks = 0
+            for old, new in zip(entry.block_hashes, self.get_block_hashes(columns)):
+                if old != new:
+                    break
+                unchanged_blocks += 1
+
+            # a chart which got shorter is recalculated completely (see `has_shrunk`)
+            first_changed = min(unchanged_blocks * self.block_size, entry.rows) if len(columns) >= entry.rows else 0
+
+        if first_changed == len(columns):
+            self.stats.hits += 1
+        elif first_changed == 0:
+            self.stats.misses += 1
+        else:
+            self.stats.partial_hits += 1
+
+        return first_changed
+
+    def has_shrunk(self, symbol: str, columns: StockDataColumns) -> bool:
+        """ whether the chart has fewer rows than the one the indicators were calculated on (e.g., since rows were
+        deleted), so indicator values of dates past its end may be stored
+        """
+        entry = self._entries.get(symbol)
+        return entry is not None and len(columns) < entry.rows
+
+    def put(self, symbol: str, entry: StockIndicatorCacheEntry) -> None:
+        self._entries[symbol] = entry
+
+    def keep_only(self, symbols: Iterable[str]) -> None:
+        """ forgets all symbols except the given ones (e.g., the ones which still have stored indicators) """
+        symbols = set(symbols)
+        self._entries = {symbol: entry for symbol, entry in self._entries.items() if symbol in symbols}
+
+    def save(self) -> None:
+        """ persists the cache (if a path was given) """
+        if self._path is None:
+            return
+
+        tmp_path = self._path.with_suffix(self._path.suffix + '.tmp')
+        tmp_path.write_text(json.dumps({'version': CACHE_FORMAT_VERSION,
+                                        'entries': {symbol: dataclasses.asdict(entry)
+                                                    for symbol, entry in self._entries.items()}}))
+        tmp_path.replace(self._path)
@@ -15,8 +15,13 @@
 # Brief: Interface for Indicator-Extractors                             #
 #########################################################################
 
+from __future__ import annotations
+
 import abc
 from datetime import datetime
+from typing import Callable, Type
+
+import numpy as np
 
 from datatypes.stock_data import StockDataInfo
 
@@ -28,6 +33,170 @@ class IStockIndicator(abc.ABC):
     def id():
         pass
 
+    @staticmethod
+    def input_columns() -> tuple[str, ...]:
+        """ the chart fields the indicator is calculated on """
+        return ('close',)
+
+    @staticmethod
+    def warmup_period() -> int | None:
+        """ number of bars needed before a date to reproduce the value calculated on the full history
+        (`None` if the indicator depends on the complete history, e.g., cumulative indicators).
+        Only bars where all `input_columns` are available count (see `calculate_on_valid_rows`)
+        """
+        return None
+
+    @staticmethod
+    def version() -> str:
+        """ version of the calculation; change it whenever the calculated values change so that
+        cached results get invalidated
+        """
+        return '1'
+
     @abc.abstractmethod
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         pass
+
+    @abc.abstractmethod
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        """ calculates the indicator for all dates of the chart at once
+
+        Args:
+            data (StockDataInfo): The stock data to calculate the indicator on
+        Returns:
+            np.ndarray: The indicator values aligned to `data.get_dates()` (NaN where not available)
+        """
+        pass
+
+    @staticmethod
+    def group() -> Type[IStockIndicatorGroup] | None:
+        """ the group calculating this indicator together with related ones (if any) """
+        return None
+
+    @staticmethod
+    def calculate_on_valid_rows(data: StockDataInfo,
+                                fields: tuple[str, ...],
+                                func: Callable[..., np.ndarray]) -> np.ndarray:
+        """ runs `func` once over all rows where every field in `fields` is available and
+        aligns the result back to all dates of the chart. Dates with missing values carry the value
+        of the previous valid date (same as calling `calculate` for that date).
+
+        Args:
+            data (StockDataInfo): The stock data to calculate on
+            fields (tuple[str, ...]): The chart fields passed to `func` (e.g., `('high', 'low', 'close')`)
+            func (Callable[..., np.ndarray]): The function calculating the indicator on the valid rows
+        Returns:
+            np.ndarray: The indicator values aligned to `data.get_dates()`
+        """
+        aligned, = calculate_outputs_on_valid_rows(data, fields, lambda *columns: (func(*columns),))
+        return aligned
+
+
+class IStockIndicatorGroup(abc.ABC):
+    """ Several indicators sharing one underlying calculation (e.g., MACD, its signal line and histogram).
+    The members return the group from `IStockIndicator.group()` so it is calculated only once for all of them.
+    """
+    _last_outputs: tuple[StockDataInfo, dict[str, np.ndarray]]
+    """ chart and outputs of the last `calculate_series_once` call (set per group class) """
+
+    @staticmethod
+    @abc.abstractmethod
+    def output_ids() -> tuple[str, ...]:
+        """ the ids of the member indicators """
+        pass
+
+    @staticmethod
+    def input_columns() -> tuple[str, ...]:
+        """ the chart fields the group is calculated on """
+        return ('close',)
+
+    @staticmethod
+    def warmup_period() -> int | None:
+        """ see `IStockIndicator.warmup_period` """
+        return None
+
+    @abc.abstractmethod
+    def calculate_series(self, data: StockDataInfo) -> dict[str, np.ndarray]:
+        """ calculates all member indicators for all dates of the chart at once
+
+        Args:
+            data (StockDataInfo): The stock data to calculate the indicators on
+        Returns:
+            dict[str, np.ndarray]: indicator id -> values aligned to `data.get_dates()`
+        """
+        pass
+
+    @classmethod
+    def calculate_series_once(cls, data: StockDataInfo) -> dict[str, np.ndarray]:
+        """ like `calculate_series`, but returns the outputs of the previous call again if it was given the same
+        chart (object), so members calculated one after another calculate the group only once.
+        The outputs are shared between the callers and must not be modified.
+
+        Args:
+            data (StockDataInfo): The stock data to calculate the indicators on
+        Returns:
+            dict[str, np.ndarray]: indicator id -> values aligned to `data.get_dates()`
+        """
+        # (one entry per group class, replaced at once, so concurrent callers at most calculate twice)
+        last = cls.__dict__.get('_last_outputs')
+        if last is not None and last[0] is data:
+            return last[1]
+
+        outputs = cls().calculate_series(data)
+        cls._last_outputs = (data, outputs)
+        return outputs
+
+
+class IStockIndicatorGroupMember(IStockIndicator):
+    """ An indicator calculated by its group (e.g., the MACD signal line). It takes the inputs and the warm-up period
+    of the group and picks its values from the group's outputs, so the members only implement `id`, `group` and
+    `calculate`.
+    """
+
+    @staticmethod
+    @abc.abstractmethod
+    def group() -> Type[IStockIndicatorGroup]:
+        pass
+
+    @classmethod
+    def input_columns(cls) -> tuple[str, ...]:
+        return cls.group().input_columns()
+
+    @classmethod
+    def warmup_period(cls) -> int | None:
+        return cls.group().warmup_period()
+
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.group().calculate_series_once(data)[self.id()]
+
+
+def calculate_outputs_on_valid_rows(data: StockDataInfo,
+                                    fields: tuple[str, ...],
+                                    func: Callable[..., tuple[np.ndarray, ...]]) -> tuple[np.ndarray, ...]:
+    """ like `IStockIndicator.calculate_on_valid_rows` for functions returning several outputs at once
+
+    Args:
+        data (StockDataInfo): The stock data to calculate on
+        fields (tuple[str, ...]): The chart fields passed to `func`
+        func (Callable[..., tuple[np.ndarray, ...]]): The function calculating the outputs on the valid rows
+    Returns:
+        tuple[np.ndarray, ...]: The outputs aligned to `data.get_dates()`
+    """
+    columns = data.get_value_arrays(*fields)
+    valid = np.logical_and.reduce([~np.isnan(column) for column in columns])
+    if not valid.any():
+        # call on empty input to know the number of outputs
+        return tuple(np.full(len(valid), np.nan) for _ in func(*(column[:0] for column in columns)))
+
+    results = func(*(column[valid] for column in columns))
+
+    # index of the last valid row for each date (-1 if there is none yet)
+    positions = np.cumsum(valid) - 1
+    has_previous = positions >= 0
+    aligned_results = []
+    for result in results:
+        aligned = np.full(len(valid), np.nan)
+        aligned[has_previous] = np.asarray(result, dtype=np.float64)[positions[has_previous]]
+        aligned_results.append(aligned)
+
+    return tuple(aligned_results)
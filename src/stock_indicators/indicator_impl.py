@@ -23,130 +23,262 @@ import numpy as np
 import talib
 
 from datatypes.stock_data import StockDataInfo
-from stock_indicators.i_indicator import IStockIndicator
+from stock_indicators.i_indicator import IStockIndicator, IStockIndicatorGroup, IStockIndicatorGroupMember, \
+    calculate_outputs_on_valid_rows
+from stock_indicators.registry import register_stock_indicator
 
+# Recursive indicators (EMA, Wilder smoothing) depend on every previous value. After this many multiples
+# of their period the influence of the starting point is below 1e-8 relative
+EMA_CONVERGENCE_FACTOR = 10
+WILDER_CONVERGENCE_FACTOR = 20
 
+
+class MACDGroup(IStockIndicatorGroup):
+    @staticmethod
+    def output_ids() -> tuple[str, ...]:
+        return "MACD", "MACD_Signal", "MACD_Hist"
+
+    @staticmethod
+    def warmup_period() -> int | None:
+        return (26 + 9) * EMA_CONVERGENCE_FACTOR
+
+    def calculate_series(self, data: StockDataInfo) -> dict[str, np.ndarray]:
+        outputs = calculate_outputs_on_valid_rows(data, self.input_columns(), talib.MACD)
+        return dict(zip(self.output_ids(), outputs))
+
+
+class BollingerBandsGroup(IStockIndicatorGroup):
+    @staticmethod
+    def output_ids() -> tuple[str, ...]:
+        return "BB_Upper", "BB_Middle", "BB_Lower"
+
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 20
+
+    def calculate_series(self, data: StockDataInfo) -> dict[str, np.ndarray]:
+        outputs = calculate_outputs_on_valid_rows(data, self.input_columns(), talib.BBANDS)
+        return dict(zip(self.output_ids(), outputs))
+
+
+class StochasticGroup(IStockIndicatorGroup):
+    @staticmethod
+    def output_ids() -> tuple[str, ...]:
+        return "SO_SlowK", "SO_SlowD"
+
+    @staticmethod
+    def input_columns() -> tuple[str, ...]:
+        return ('high', 'low', 'close')
+
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 5 + 3 + 3
+
+    def calculate_series(self, data: StockDataInfo) -> dict[str, np.ndarray]:
+        outputs = calculate_outputs_on_valid_rows(data, self.input_columns(), talib.STOCH)
+        return dict(zip(self.output_ids(), outputs))
+
+
+@register_stock_indicator
 class SMA50(IStockIndicator):
     @staticmethod
     def id():
         return "SMA50"
 
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 50
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(until_date=for_date)
         return talib.SMA(np.array(closes), timeperiod=50)[-1]
 
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.calculate_on_valid_rows(data, self.input_columns(),
+                                            lambda closes: talib.SMA(closes, timeperiod=50))
 
+
+@register_stock_indicator
 class SMA200(IStockIndicator):
     @staticmethod
     def id():
         return "SMA200"
 
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 200
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         return talib.SMA(np.array(closes), timeperiod=200)[-1]
 
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.calculate_on_valid_rows(data, self.input_columns(),
+                                            lambda closes: talib.SMA(closes, timeperiod=200))
+
 
+@register_stock_indicator
 class EMA50(IStockIndicator):
     @staticmethod
     def id():
         return "EMA50"
 
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 50 * EMA_CONVERGENCE_FACTOR
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         return talib.EMA(np.array(closes), timeperiod=50)[-1]
 
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.calculate_on_valid_rows(data, self.input_columns(),
+                                            lambda closes: talib.EMA(closes, timeperiod=50))
 
+
+@register_stock_indicator
 class EMA200(IStockIndicator):
     @staticmethod
     def id():
         return "EMA200"
 
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 200 * EMA_CONVERGENCE_FACTOR
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         return talib.EMA(np.array(closes), timeperiod=200)[-1]
 
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.calculate_on_valid_rows(data, self.input_columns(),
+                                            lambda closes: talib.EMA(closes, timeperiod=200))
+
 
+@register_stock_indicator
 class RSI(IStockIndicator):
     @staticmethod
     def id():
         return "RSI"
 
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 14 * WILDER_CONVERGENCE_FACTOR
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         return talib.RSI(np.array(closes))[-1]
 
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.calculate_on_valid_rows(data, self.input_columns(), talib.RSI)
+
 
-class MACD(IStockIndicator):
+@register_stock_indicator
+class MACD(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "MACD"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return MACDGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         macd, _, _ = talib.MACD(np.array(closes))
         return macd[-1]
 
 
-class MACDSignal(IStockIndicator):
+@register_stock_indicator
+class MACDSignal(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "MACD_Signal"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return MACDGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         _, macd_signal, _ = talib.MACD(np.array(closes))
         return macd_signal[-1]
 
 
-class MACDHist(IStockIndicator):
+@register_stock_indicator
+class MACDHist(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "MACD_Hist"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return MACDGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         _, _, macd_hist = talib.MACD(np.array(closes))
         return macd_hist[-1]
 
 
-class BbUpper(IStockIndicator):
+@register_stock_indicator
+class BbUpper(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "BB_Upper"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return BollingerBandsGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         upper, _, _ = talib.BBANDS(np.array(closes))
         return upper[-1]
 
 
-class BbMiddle(IStockIndicator):
+@register_stock_indicator
+class BbMiddle(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "BB_Middle"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return BollingerBandsGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         _, middle, _ = talib.BBANDS(np.array(closes))
         return middle[-1]
 
 
-class BbLower(IStockIndicator):
+@register_stock_indicator
+class BbLower(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "BB_Lower"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return BollingerBandsGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         _, _, lower = talib.BBANDS(np.array(closes))
         return lower[-1]
 
 
-class SoSlowK(IStockIndicator):
+@register_stock_indicator
+class SoSlowK(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "SO_SlowK"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return StochasticGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         high_prices = data.filter_high_dates_until(for_date)
         low_prices = data.filter_low_dates_until(for_date)
@@ -157,11 +289,16 @@ class SoSlowK(IStockIndicator):
         return slowk[-1]
 
 
-class SoSlowD(IStockIndicator):
+@register_stock_indicator
+class SoSlowD(IStockIndicatorGroupMember):
     @staticmethod
     def id():
         return "SO_SlowD"
 
+    @staticmethod
+    def group() -> type[IStockIndicatorGroup]:
+        return StochasticGroup
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         high_prices = data.filter_high_dates_until(for_date)
         low_prices = data.filter_low_dates_until(for_date)
@@ -171,11 +308,20 @@ class SoSlowD(IStockIndicator):
         return slowd[-1]
 
 
+@register_stock_indicator
 class ADX(IStockIndicator):
     @staticmethod
     def id():
         return "ADX"
 
+    @staticmethod
+    def input_columns() -> tuple[str, ...]:
+        return ('high', 'low', 'close')
+
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 2 * 14 * WILDER_CONVERGENCE_FACTOR
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         high_prices = data.filter_high_dates_until(for_date)
         low_prices = data.filter_low_dates_until(for_date)
@@ -183,12 +329,24 @@ class ADX(IStockIndicator):
 
         return talib.ADX(np.array(high_prices), np.array(low_prices), np.array(closes))[-1]
 
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.calculate_on_valid_rows(data, self.input_columns(), talib.ADX)
 
+
+@register_stock_indicator
 class AroonOscillator(IStockIndicator):
     @staticmethod
     def id():
         return "Aroon_Oscillator"
 
+    @staticmethod
+    def input_columns() -> tuple[str, ...]:
+        return ('high', 'low')
+
+    @staticmethod
+    def warmup_period() -> int | None:
+        return 14 + 1
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         high_prices = data.filter_high_dates_until(for_date)
         low_prices = data.filter_low_dates_until(for_date)
@@ -197,14 +355,29 @@ class AroonOscillator(IStockIndicator):
 
         return aroon_oscillator[-1]
 
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        def aroon_oscillator(high_prices: np.ndarray, low_prices: np.ndarray) -> np.ndarray:
+            aroon_up, aroon_down = talib.AROON(high_prices, low_prices)
+            return aroon_up - aroon_down
+
+        return self.calculate_on_valid_rows(data, self.input_columns(), aroon_oscillator)
 
+
+@register_stock_indicator
 class OBV(IStockIndicator):
     @staticmethod
     def id():
         return "OBV"
 
+    @staticmethod
+    def input_columns() -> tuple[str, ...]:
+        return ('close', 'volume')
+
     def calculate(self, data: StockDataInfo, for_date: datetime.date) -> float:
         closes = data.filter_close_dates_until(for_date)
         volumes = data.filter_volumes_dates_until(for_date)
         return talib.OBV(np.array(closes, dtype=np.float64),
                          np.array(volumes, dtype=np.float64))[-1]
+
+    def calculate_series(self, data: StockDataInfo) -> np.ndarray:
+        return self.calculate_on_valid_rows(data, self.input_columns(), talib.OBV)
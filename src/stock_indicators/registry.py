@@ -0,0 +1,153 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Registry of all available stock indicators                     #
+# (built-in ones register on import, plugins via entry points)          #
+#########################################################################
+from __future__ import annotations
+
+import dataclasses
+from importlib.metadata import entry_points
+from typing import Iterable, Type
+
+import numpy as np
+
+from datatypes.stock_data import StockDataInfo
+from exceptions.indicator import StockGptIndicatorException
+from log.logger import get_default_logger
+from stock_indicators.i_indicator import IStockIndicator, IStockIndicatorGroup
+
+PLUGIN_ENTRY_POINT_GROUP = 'stockgpt.stock_indicators'
+
+
+@dataclasses.dataclass(frozen=True)
+class StockIndicatorMetadata:
+    """ Static information about an indicator other parts can plan with (e.g., how much history to load) """
+    id: str
+    indicator_cls: Type[IStockIndicator]
+    input_columns: tuple[str, ...]
+    warmup_period: int | None
+    group_cls: Type[IStockIndicatorGroup] | None = None
+    """ the group calculating the indicator together with related ones (if any) """
+    version: str = '1'
+
+    @property
+    def kernel_cls(self) -> Type[IStockIndicator] | Type[IStockIndicatorGroup]:
+        """ the class doing the actual calculation (the group if there is one) """
+        return self.group_cls or self.indicator_cls
+
+
+class StockIndicatorRegistry:
+    """ Maps indicator ids to their implementations """
+    _indicators: dict[str, StockIndicatorMetadata]
+
+    def __init__(self):
+        self._indicators = {}
+
+    def register(self, indicator_cls: Type[IStockIndicator]) -> Type[IStockIndicator]:
+        """ registers the given indicator class (can be used as class decorator)
+
+        Args:
+            indicator_cls (Type[IStockIndicator]): The indicator to register
+        Raises:
+            StockGptIndicatorException: If the class is no indicator or another indicator uses the same id
+        Returns:
+            Type[IStockIndicator]: The unchanged indicator class
+        """
+        if not (isinstance(indicator_cls, type) and issubclass(indicator_cls, IStockIndicator)):
+            raise StockGptIndicatorException(f"{indicator_cls} is not a stock indicator (Code: 38420934)")
+
+        indicator_id = indicator_cls.id()
+        known = self._indicators.get(indicator_id)
+        if known is not None and known.indicator_cls is not indicator_cls:
+            raise StockGptIndicatorException(f"Indicator id {indicator_id} is used by {known.indicator_cls} "
+                                             f"and {indicator_cls} (Code: 38420935)")
+
+        self._indicators[indicator_id] = StockIndicatorMetadata(id=indicator_id,
+                                                                indicator_cls=indicator_cls,
+                                                                input_columns=tuple(indicator_cls.input_columns()),
+                                                                warmup_period=indicator_cls.warmup_period(),
+                                                                group_cls=indicator_cls.group(),
+                                                                version=indicator_cls.version())
+        return indicator_cls
+
+    def get(self, indicator_id: str) -> Type[IStockIndicator] | None:
+        """ returns the indicator class for the given id if available """
+        metadata = self._indicators.get(indicator_id)
+        return metadata.indicator_cls if metadata else None
+
+    def get_metadata(self, indicator_id: str) -> StockIndicatorMetadata | None:
+        """ returns the metadata for the given id if available """
+        return self._indicators.get(indicator_id)
+
+    def list_ids(self) -> list[str]:
+        """ ids of all registered indicators """
+        return list(self._indicators.keys())
+
+    def load_plugins(self, group: str = PLUGIN_ENTRY_POINT_GROUP) -> None:
+        """ registers indicators of installed third-party packages.
+        Each entry point of the group must resolve to an indicator class or an iterable of indicator classes.
+        Broken plugins are logged and skipped.
+
+        Args:
+            group (str, optional): The entry point group to scan. Defaults to `stockgpt.stock_indicators`.
+        """
+        logger = get_default_logger()
+        for entry_point in entry_points(group=group):
+            try:
+                loaded = entry_point.load()
+                indicator_classes: Iterable = loaded if not isinstance(loaded, type) else [loaded]
+                for indicator_cls in indicator_classes:
+                    self.register(indicator_cls)
+            except Exception as e:
+                logger.warning(f"Could not load stock indicator plugin {entry_point.name} due to {e}. "
+                               f"Skipping (Code: 38420936)")
+
+
+def calculate_kernel_series(kernel_cls: Type[IStockIndicator] | Type[IStockIndicatorGroup],
+                            data: StockDataInfo) -> dict[str, np.ndarray]:
+    """ calculates all outputs of a kernel (a group or a single indicator, see `StockIndicatorMetadata.kernel_cls`)
+
+    Args:
+        kernel_cls (Type[IStockIndicator] | Type[IStockIndicatorGroup]): The kernel to calculate
+        data (StockDataInfo): The stock data to calculate on
+    Returns:
+        dict[str, np.ndarray]: indicator id -> values aligned to `data.get_dates()`
+    """
+    if issubclass(kernel_cls, IStockIndicatorGroup):
+        return kernel_cls().calculate_series(data)
+
+    return {kernel_cls.id(): kernel_cls().calculate_series(data)}
+
+
+_REGISTRY = StockIndicatorRegistry()
+_REGISTRY_COMPLETE = False
+
+
+def register_stock_indicator(indicator_cls: Type[IStockIndicator]) -> Type[IStockIndicator]:
+    """ class decorator registering an indicator in the global registry """
+    return _REGISTRY.register(indicator_cls)
+
+
+def get_stock_indicator_registry() -> StockIndicatorRegistry:
+    """ returns the global registry holding the built-in indicators and all plugins (loaded once) """
+    global _REGISTRY_COMPLETE
+    if not _REGISTRY_COMPLETE:
+        # importing the module registers the built-in indicators
+        import stock_indicators.indicator_impl  # noqa: F401
+
+        _REGISTRY.load_plugins()
+        _REGISTRY_COMPLETE = True
+
+    return _REGISTRY
@@ -0,0 +1,549 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Streaming (stateful) indicator kernels updating in O(1) per bar #
+# (mirroring the TA-Lib calculations used in indicator_impl.py)         #
+#########################################################################
+from __future__ import annotations
+
+import abc
+import copy
+import datetime
+import json
+import math
+from collections import deque
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable
+
+from datatypes.stock_data import StockDataChartEntry, StockDataInfo, CHART_FIELDS
+from exceptions.indicator import StockGptIndicatorException
+
+NAN = float('nan')
+
+
+def _is_zero(value: float) -> bool:
+    """ TA-Lib's notion of zero """
+    return -1e-14 < value < 1e-14
+
+
+class IStreamingKernel(abc.ABC):
+    """ Calculates one or more indicators bar by bar from a small state.
+    Bars missing one of the `input_columns` are skipped (the previous values are kept).
+    """
+
+    def __init__(self, output_ids: tuple[str, ...], input_columns: tuple[str, ...] = ('close',)):
+        self.output_ids = output_ids
+        self.input_columns = input_columns
+        self.last_values = {output_id: NAN for output_id in output_ids}
+
+    def update(self, bar: StockDataChartEntry) -> dict[str, float]:
+        """ feeds the next bar and returns the current values of all outputs """
+        inputs = [getattr(bar, column) for column in self.input_columns]
+        if all(value is not None and not math.isnan(value) for value in inputs):
+            self.last_values = dict(zip(self.output_ids, self._step(*map(float, inputs))))
+
+        return self.last_values
+
+    @abc.abstractmethod
+    def _step(self, *inputs: float) -> tuple[float, ...]:
+        """ updates the state with the next (valid) inputs, returns the outputs in order of `output_ids` """
+        pass
+
+    @abc.abstractmethod
+    def _get_state(self) -> dict:
+        pass
+
+    @abc.abstractmethod
+    def _set_state(self, state: dict) -> None:
+        pass
+
+    def get_state(self) -> dict:
+        """ JSON serializable state of the kernel """
+        return {'state': self._get_state(), 'last_values': self.last_values}
+
+    def set_state(self, state: dict) -> None:
+        """ restores a state created by `get_state` """
+        self._set_state(state['state'])
+        self.last_values = {output_id: float(value) for output_id, value in state['last_values'].items()}
+
+
+class _Window:
+    """ fixed size window with running sums (for SMA, standard deviations) """
+
+    def __init__(self, size: int, values: Iterable[float] = ()):
+        self.values = deque(values, maxlen=size)
+        self.sum = math.fsum(self.values)
+        self.sum_squares = math.fsum(value * value for value in self.values)
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.values.maxlen:
+            dropped = self.values[0]
+            self.sum -= dropped
+            self.sum_squares -= dropped * dropped
+        self.values.append(value)
+        self.sum += value
+        self.sum_squares += value * value
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.values.maxlen
+
+    @property
+    def mean(self) -> float:
+        return self.sum / len(self.values)
+
+
+class SmaKernel(IStreamingKernel):
+    def __init__(self, output_id: str, period: int):
+        super().__init__((output_id,))
+        self.window = _Window(period)
+
+    def _step(self, close: float) -> tuple[float, ...]:
+        self.window.push(close)
+        return (self.window.mean if self.window.full else NAN),
+
+    def _get_state(self) -> dict:
+        return {'window': list(self.window.values)}
+
+    def _set_state(self, state: dict) -> None:
+        self.window = _Window(self.window.values.maxlen, state['window'])
+
+
+class _Ema:
+    """ EMA seeded with the SMA of the first `period` values (as TA-Lib does) """
+
+    def __init__(self, period: int, seed: Iterable[float] = (), value: float | None = None):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.seed = list(seed)
+        self.value = value
+
+    def push(self, x: float) -> float:
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) < self.period:
+                return NAN
+            self.value = sum(self.seed) / self.period
+            self.seed = []
+        else:
+            self.value = (x - self.value) * self.k + self.value
+
+        return self.value
+
+    def get_state(self) -> dict:
+        return {'seed': self.seed, 'value': self.value}
+
+    @classmethod
+    def from_state(cls, period: int, state: dict) -> _Ema:
+        return cls(period, state['seed'], state['value'])
+
+
+class EmaKernel(IStreamingKernel):
+    def __init__(self, output_id: str, period: int):
+        super().__init__((output_id,))
+        self.ema = _Ema(period)
+
+    def _step(self, close: float) -> tuple[float, ...]:
+        return self.ema.push(close),
+
+    def _get_state(self) -> dict:
+        return self.ema.get_state()
+
+    def _set_state(self, state: dict) -> None:
+        self.ema = _Ema.from_state(self.ema.period, state)
+
+
+class RsiKernel(IStreamingKernel):
+    """ RSI with Wilder smoothing of average gains and losses """
+
+    def __init__(self, output_id: str = 'RSI', period: int = 14):
+        super().__init__((output_id,))
+        self.period = period
+        self.count = 0
+        self.previous_close: float | None = None
+        self.average_gain = 0.0
+        self.average_loss = 0.0
+
+    def _step(self, close: float) -> tuple[float, ...]:
+        previous_close, self.previous_close = self.previous_close, close
+        if previous_close is None:
+            return NAN,
+
+        self.count += 1
+        change = close - previous_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.count <= self.period:
+            # the first averages are plain means
+            self.average_gain += gain / self.period
+            self.average_loss += loss / self.period
+            if self.count < self.period:
+                return NAN,
+        else:
+            self.average_gain = (self.average_gain * (self.period - 1) + gain) / self.period
+            self.average_loss = (self.average_loss * (self.period - 1) + loss) / self.period
+
+        total = self.average_gain + self.average_loss
+        return (0.0 if _is_zero(total) else 100.0 * self.average_gain / total),
+
+    def _get_state(self) -> dict:
+        return {'count': self.count, 'previous_close': self.previous_close,
+                'average_gain': self.average_gain, 'average_loss': self.average_loss}
+
+    def _set_state(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+
+class MacdKernel(IStreamingKernel):
+    """ MACD line, signal and histogram (12, 26, 9). Like TA-Lib, both EMAs are seeded at the
+    same bar (the fast one with the mean of the last 12 of the first 26 closes)
+    """
+
+    def __init__(self, output_ids: tuple[str, ...] = ('MACD', 'MACD_Signal', 'MACD_Hist'),
+                 fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        super().__init__(output_ids)
+        self.fast_period, self.slow_period = fast_period, slow_period
+        self.first_closes: list[float] = []
+        self.fast = _Ema(fast_period)
+        self.slow = _Ema(slow_period)
+        self.signal = _Ema(signal_period)
+
+    def _step(self, close: float) -> tuple[float, ...]:
+        if self.slow.value is None:
+            self.first_closes.append(close)
+            if len(self.first_closes) < self.slow_period:
+                return NAN, NAN, NAN
+
+            for value in self.first_closes[-self.fast_period:]:
+                self.fast.push(value)
+            for value in self.first_closes:
+                self.slow.push(value)
+            self.first_closes = []
+        else:
+            self.fast.push(close)
+            self.slow.push(close)
+
+        macd = self.fast.value - self.slow.value
+        signal = self.signal.push(macd)
+        if math.isnan(signal):
+            return NAN, NAN, NAN
+
+        return macd, signal, macd - signal
+
+    def _get_state(self) -> dict:
+        return {'first_closes': self.first_closes, 'fast': self.fast.get_state(),
+                'slow': self.slow.get_state(), 'signal': self.signal.get_state()}
+
+    def _set_state(self, state: dict) -> None:
+        self.first_closes = state['first_closes']
+        self.fast = _Ema.from_state(self.fast.period, state['fast'])
+        self.slow = _Ema.from_state(self.slow.period, state['slow'])
+        self.signal = _Ema.from_state(self.signal.period, state['signal'])
+
+
+class BollingerBandsKernel(IStreamingKernel):
+    def __init__(self, output_ids: tuple[str, ...] = ('BB_Upper', 'BB_Middle', 'BB_Lower'),
+                 period: int = 20, deviations: float = 2.0):
+        super().__init__(output_ids)
+        self.deviations = deviations
+        self.window = _Window(period)
+
+    def _step(self, close: float) -> tuple[float, ...]:
+        self.window.push(close)
+        if not self.window.full:
+            return NAN, NAN, NAN
+
+        mean = self.window.mean
+        variance = self.window.sum_squares / len(self.window.values) - mean * mean
+        deviation = self.deviations * math.sqrt(variance) if variance > 0 else 0.0
+        return mean + deviation, mean, mean - deviation
+
+    def _get_state(self) -> dict:
+        return {'window': list(self.window.values)}
+
+    def _set_state(self, state: dict) -> None:
+        self.window = _Window(self.window.values.maxlen, state['window'])
+
+
+class StochasticKernel(IStreamingKernel):
+    """ slow stochastic (5, 3, 3) using simple moving averages """
+
+    def __init__(self, output_ids: tuple[str, ...] = ('SO_SlowK', 'SO_SlowD'),
+                 fast_k_period: int = 5, slow_k_period: int = 3, slow_d_period: int = 3):
+        super().__init__(output_ids, ('high', 'low', 'close'))
+        self.highs = deque(maxlen=fast_k_period)
+        self.lows = deque(maxlen=fast_k_period)
+        self.fast_k = _Window(slow_k_period)
+        self.slow_k = _Window(slow_d_period)
+
+    def _step(self, high: float, low: float, close: float) -> tuple[float, ...]:
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) < self.highs.maxlen:
+            return NAN, NAN
+
+        highest, lowest = max(self.highs), min(self.lows)
+        difference = highest - lowest
+        self.fast_k.push(0.0 if _is_zero(difference) else 100.0 * (close - lowest) / difference)
+        if not self.fast_k.full:
+            return NAN, NAN
+
+        self.slow_k.push(self.fast_k.mean)
+        if not self.slow_k.full:
+            return NAN, NAN
+
+        return self.fast_k.mean, self.slow_k.mean
+
+    def _get_state(self) -> dict:
+        return {'highs': list(self.highs), 'lows': list(self.lows),
+                'fast_k': list(self.fast_k.values), 'slow_k': list(self.slow_k.values)}
+
+    def _set_state(self, state: dict) -> None:
+        self.highs = deque(state['highs'], maxlen=self.highs.maxlen)
+        self.lows = deque(state['lows'], maxlen=self.lows.maxlen)
+        self.fast_k = _Window(self.fast_k.values.maxlen, state['fast_k'])
+        self.slow_k = _Window(self.slow_k.values.maxlen, state['slow_k'])
+
+
+class AdxKernel(IStreamingKernel):
+    """ ADX with Wilder smoothing of the directional movements, the true range and the DX """
+
+    def __init__(self, output_id: str = 'ADX', period: int = 14):
+        super().__init__((output_id,), ('high', 'low', 'close'))
+        self.period = period
+        self.count = 0
+        self.previous: list[float] | None = None
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.true_range = 0.0
+        self.sum_dx = 0.0
+        self.adx: float | None = None
+
+    def _step(self, high: float, low: float, close: float) -> tuple[float, ...]:
+        previous, self.previous = self.previous, [high, low, close]
+        if previous is None:
+            return NAN,
+
+        previous_high, previous_low, previous_close = previous
+        self.count += 1
+        period = self.period
+        if self.count >= period:
+            # Wilder smoothing (the first period - 1 movements are summed up only)
+            self.plus_dm -= self.plus_dm / period
+            self.minus_dm -= self.minus_dm / period
+            self.true_range -= self.true_range / period
+
+        up, down = high - previous_high, previous_low - low
+        if down > 0 and up < down:
+            self.minus_dm += down
+        elif up > 0 and up > down:
+            self.plus_dm += up
+        self.true_range += max(high - low, abs(high - previous_close), abs(low - previous_close))
+
+        if self.count < period:
+            return NAN,
+
+        dx = None
+        if not _is_zero(self.true_range):
+            minus_di = 100.0 * self.minus_dm / self.true_range
+            plus_di = 100.0 * self.plus_dm / self.true_range
+            if not _is_zero(minus_di + plus_di):
+                dx = 100.0 * abs(minus_di - plus_di) / (minus_di + plus_di)
+
+        if self.count < 2 * period - 1:
+            self.sum_dx += dx or 0.0
+            return NAN,
+
+        if self.adx is None:
+            self.adx = (self.sum_dx + (dx or 0.0)) / period
+        elif dx is not None:
+            self.adx = (self.adx * (period - 1) + dx) / period
+
+        return self.adx,
+
+    def _get_state(self) -> dict:
+        return {'count': self.count, 'previous': self.previous, 'plus_dm': self.plus_dm,
+                'minus_dm': self.minus_dm, 'true_range': self.true_range, 'sum_dx': self.sum_dx, 'adx': self.adx}
+
+    def _set_state(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+
+class AroonOscillatorKernel(IStreamingKernel):
+    def __init__(self, output_id: str = 'Aroon_Oscillator', period: int = 14):
+        super().__init__((output_id,), ('high', 'low'))
+        self.period = period
+        self.highs = deque(maxlen=period + 1)
+        self.lows = deque(maxlen=period + 1)
+
+    def _step(self, high: float, low: float) -> tuple[float, ...]:
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) < self.highs.maxlen:
+            return NAN,
+
+        # bars since the (most recent) highest high / lowest low of the window
+        highs, lows = list(self.highs), list(self.lows)
+        since_high = highs[::-1].index(max(highs))
+        since_low = lows[::-1].index(min(lows))
+        aroon_up = 100.0 * (self.period - since_high) / self.period
+        aroon_down = 100.0 * (self.period - since_low) / self.period
+        # `talib.AROON` returns (down, up), so the oscillator of `indicator_impl.AroonOscillator` is down - up
+        return aroon_down - aroon_up,
+
+    def _get_state(self) -> dict:
+        return {'highs': list(self.highs), 'lows': list(self.lows)}
+
+    def _set_state(self, state: dict) -> None:
+        self.highs = deque(state['highs'], maxlen=self.period + 1)
+        self.lows = deque(state['lows'], maxlen=self.period + 1)
+
+
+class ObvKernel(IStreamingKernel):
+    def __init__(self, output_id: str = 'OBV'):
+        super().__init__((output_id,), ('close', 'volume'))
+        self.previous_close: float | None = None
+        self.obv = 0.0
+
+    def _step(self, close: float, volume: float) -> tuple[float, ...]:
+        if self.previous_close is None or close > self.previous_close:
+            self.obv += volume
+        elif close < self.previous_close:
+            self.obv -= volume
+        self.previous_close = close
+        return self.obv,
+
+    def _get_state(self) -> dict:
+        return {'previous_close': self.previous_close, 'obv': self.obv}
+
+    def _set_state(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+
+# indicator id -> factory of the kernel calculating it (members of a group share the factory)
+_STREAMING_KERNELS: dict[str, Callable[[], IStreamingKernel]] = {}
+
+
+def register_streaming_kernel(output_ids: Iterable[str], factory: Callable[[], IStreamingKernel]) -> None:
+    """ registers a streaming kernel factory for the given indicator ids (e.g., for indicator plugins) """
+    for output_id in output_ids:
+        _STREAMING_KERNELS[output_id] = factory
+
+
+register_streaming_kernel(['SMA50'], partial(SmaKernel, 'SMA50', 50))
+register_streaming_kernel(['SMA200'], partial(SmaKernel, 'SMA200', 200))
+register_streaming_kernel(['EMA50'], partial(EmaKernel, 'EMA50', 50))
+register_streaming_kernel(['EMA200'], partial(EmaKernel, 'EMA200', 200))
+register_streaming_kernel(['RSI'], RsiKernel)
+register_streaming_kernel(['MACD', 'MACD_Signal', 'MACD_Hist'], MacdKernel)
+register_streaming_kernel(['BB_Upper', 'BB_Middle', 'BB_Lower'], BollingerBandsKernel)
+register_streaming_kernel(['SO_SlowK', 'SO_SlowD'], StochasticKernel)
+register_streaming_kernel(['ADX'], AdxKernel)
+register_streaming_kernel(['Aroon_Oscillator'], AroonOscillatorKernel)
+register_streaming_kernel(['OBV'], ObvKernel)
+
+
+class StreamingIndicatorSession:
+    """ Keeps a set of indicators up to date bar by bar (e.g., while polling intraday data).
+    Completed bars are committed with `update`, the still changing bar of the current session can be
+    evaluated with `peek` without touching the state. The state can be persisted with `save` / `load`.
+    """
+    indicator_ids: list[str]
+    last_date: datetime.date | None
+    _kernels: list[IStreamingKernel]
+
+    def __init__(self, indicator_ids: list[str]):
+        self.indicator_ids = list(indicator_ids)
+        self.last_date = None
+
+        factories = []
+        for indicator_id in self.indicator_ids:
+            factory = _STREAMING_KERNELS.get(indicator_id)
+            if factory is None:
+                raise StockGptIndicatorException(f"No streaming kernel for indicator {indicator_id} "
+                                                 f"(Code: 48203941)")
+            if factory not in factories:
+                factories.append(factory)
+
+        self._kernels = [factory() for factory in factories]
+
+    def warm_up(self, data: StockDataInfo) -> dict[str, float]:
+        """ feeds all bars of the given history (after the last committed date) """
+        columns = data.columns
+        start = 0 if self.last_date is None else columns.get_index_until(self.last_date)
+        values = self.get_values()
+        rows = zip(columns.dates[start:].tolist(), *(getattr(columns, field)[start:].tolist() for field in CHART_FIELDS))
+        for date, *bar in rows:
+            values = self.update(date, StockDataChartEntry(*bar))
+
+        return values
+
+    def update(self, date: datetime.date, bar: StockDataChartEntry) -> dict[str, float]:
+        """ commits the completed bar of the given date and returns the new indicator values
+
+        Raises:
+            StockGptIndicatorException: If the date is not after the last committed date
+        """
+        if self.last_date is not None and date <= self.last_date:
+            raise StockGptIndicatorException(f"Bar of {date} is not after the last bar of {self.last_date} "
+                                             f"(Code: 48203942)")
+
+        for kernel in self._kernels:
+            kernel.update(bar)
+        self.last_date = date
+
+        return self.get_values()
+
+    def peek(self, bar: StockDataChartEntry) -> dict[str, float]:
+        """ indicator values if the given (incomplete) bar was the next one, without changing the state """
+        values = {}
+        for kernel in self._kernels:
+            values.update(copy.deepcopy(kernel).update(bar))
+
+        return {indicator_id: values[indicator_id] for indicator_id in self.indicator_ids}
+
+    def get_values(self) -> dict[str, float]:
+        """ indicator values after the last committed bar """
+        values = {}
+        for kernel in self._kernels:
+            values.update(kernel.last_values)
+
+        return {indicator_id: values[indicator_id] for indicator_id in self.indicator_ids}
+
+    def get_state(self) -> dict:
+        """ JSON serializable state of the session """
+        return {'indicator_ids': self.indicator_ids,
+                'last_date': self.last_date.isoformat() if self.last_date else None,
+                'kernels': [kernel.get_state() for kernel in self._kernels]}
+
+    @classmethod
+    def from_state(cls, state: dict) -> StreamingIndicatorSession:
+        """ restores a session from `get_state` """
+        session = cls(state['indicator_ids'])
+        session.last_date = datetime.date.fromisoformat(state['last_date']) if state['last_date'] else None
+        for kernel, kernel_state in zip(session._kernels, state['kernels']):
+            kernel.set_state(kernel_state)
+
+        return session
+
+    def save(self, path: Path) -> None:
+        """ persists the state as JSON file """
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        tmp_path.write_text(json.dumps(self.get_state()))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> StreamingIndicatorSession:
+        """ loads a session persisted with `save` """
+        return cls.from_state(json.loads(path.read_text()))
@@ -0,0 +1,92 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Reading typed CSV files                                        #
+#########################################################################
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import repository.csv_codec as csv_codec
+from repository.csv_codec import read_typed_csv, find_date_offset
+
+TEXTS = ['plain', 'with, comma', 'with "quotes"', 'first line\nsecond line', 'ends with line break\n', None]
+
+
+@pytest.fixture(params=['pyarrow', 'pandas'])
+def parser(request, monkeypatch):
+    """ runs a test with pyarrow's parser (if installed) and with the pandas fallback """
+    if request.param == 'pandas':
+        monkeypatch.setattr(csv_codec, 'pa_csv', None)
+    elif csv_codec.pa_csv is None:
+        pytest.skip('pyarrow is not installed')
+
+    return request.param
+
+
+def write_text_csv(path: Path, repeat: int = 1) -> pd.DataFrame:
+    df = pd.DataFrame({'date': [f'2023-01-{i % 28 + 1:02d}' for i in range(len(TEXTS) * repeat)],
+                       'text': TEXTS * repeat,
+                       'value': [1.5, None, -2., 1e-300, 3., None] * repeat})
+    df.to_csv(path, index=False)
+    return df
+
+
+def assert_frame_content(actual: pd.DataFrame, expected: pd.DataFrame):
+    assert list(actual.columns) == list(expected.columns)
+    assert actual['date'].tolist() == expected['date'].tolist()
+    assert actual['text'].isna().tolist() == expected['text'].isna().tolist()
+    assert actual['text'].dropna().tolist() == expected['text'].dropna().tolist()
+    assert actual['value'].dtype == np.float64
+    assert np.array_equal(actual['value'].to_numpy(), expected['value'].to_numpy(dtype=np.float64), equal_nan=True)
+
+
+def test_quoted_commas_line_breaks_and_empty_values(tmp_path: Path, parser: str):
+    expected = write_text_csv(tmp_path / 'text.csv')
+    assert_frame_content(read_typed_csv(tmp_path / 'text.csv', dtypes={'date': 'str', 'text': 'str'}), expected)
+
+
+def test_line_breaks_across_parse_blocks(tmp_path: Path, parser: str):
+    # several MiB, so the file is parsed in blocks which end within quoted values
+    expected = write_text_csv(tmp_path / 'text.csv', repeat=50_000)
+    assert_frame_content(read_typed_csv(tmp_path / 'text.csv', dtypes={'date': 'str', 'text': 'str'}), expected)
+
+
+def test_empty_numbers_are_nan(tmp_path: Path, parser: str):
+    (tmp_path / 'values.csv').write_text('date,a,b\n2023-01-01,1.5,\n2023-01-02,,2\n2023-01-03,,\n')
+    df = read_typed_csv(tmp_path / 'values.csv', dtypes={'date': 'str'})
+    assert df['date'].tolist() == ['2023-01-01', '2023-01-02', '2023-01-03']
+    assert np.array_equal(df['a'].to_numpy(), [1.5, np.nan, np.nan], equal_nan=True)
+    assert np.array_equal(df['b'].to_numpy(), [np.nan, 2., np.nan], equal_nan=True)
+
+
+def test_header_only(tmp_path: Path, parser: str):
+    (tmp_path / 'empty.csv').write_text('date,value\n')
+    df = read_typed_csv(tmp_path / 'empty.csv', dtypes={'date': 'str'})
+    assert list(df.columns) == ['date', 'value'] and len(df) == 0
+
+
+def test_byte_range(tmp_path: Path, parser: str):
+    path = tmp_path / 'values.csv'
+    path.write_text('date,value\n' + ''.join(f'2023-01-{day:02d},{day}\n' for day in range(1, 29)))
+    with open(path, 'rb') as f:
+        start, stop = find_date_offset(f, '2023-01-10'), find_date_offset(f, '2023-01-13')
+
+    df = read_typed_csv(path, dtypes={'date': 'str'}, start=start, stop=stop)
+    assert df['date'].tolist() == ['2023-01-10', '2023-01-11', '2023-01-12']
+    assert df['value'].tolist() == [10., 11., 12.]
@@ -0,0 +1,172 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: Incremental indicator updates match full recalculations        #
+#########################################################################
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import SyntheticChartConfig, generate_stock_data
+from datatypes.stock_data import StockDataInfo
+from fetch.stocks import update_stock_indicators, update_all_stock_indicators_for_active_stocks, load_incremental_chart
+from repository.sqlite_database import SqliteDatabase
+from repository.stock_indicator.i_stock_indicator_repository import IStockIndicatorRepository
+from repository.stock_indicator.stock_indicator_file_repository import StockIndicatorFileRepository
+from repository.stock_indicator.stock_indicator_sqlite_repository import StockIndicatorSqliteRepository
+from repository.stock_value.stock_value_file_repository import StockValueFileRepository
+from stock_indicators.cache import StockIndicatorCache
+from stock_indicators.registry import get_stock_indicator_registry
+
+logger = logging.getLogger(__name__)
+
+
+def get_chart(rows: int, nan_density: float) -> StockDataInfo:
+    return generate_stock_data('SYN', SyntheticChartConfig(history_length=rows, nan_density=nan_density, seed=7))
+
+
+def get_chart_until(stock_info: StockDataInfo, stop: int) -> StockDataInfo:
+    return StockDataInfo.from_columns(symbol=stock_info.symbol, columns=stock_info.columns.slice(0, stop))
+
+
+def create_repo(path: Path) -> StockIndicatorFileRepository:
+    path.mkdir()
+    return StockIndicatorFileRepository(base_path=path, logger=logger)
+
+
+def assert_same_indicators(actual: StockIndicatorFileRepository, expected: StockIndicatorFileRepository,
+                           symbol: str, indicator_ids: list[str]):
+    actual_values, expected_values = actual.get(symbol), expected.get(symbol)
+    assert actual_values.keys() == expected_values.keys()
+    for indicator_id in indicator_ids:
+        a = np.array([actual_values[date][indicator_id] for date in expected_values], dtype=np.float64)
+        e = np.array([expected_values[date][indicator_id] for date in expected_values], dtype=np.float64)
+        assert np.array_equal(np.isnan(a), np.isnan(e)), f'{indicator_id} differs in missing values'
+        assert np.allclose(a, e, rtol=1e-6, equal_nan=True), f'{indicator_id} differs'
+
+
+@pytest.mark.parametrize('nan_density', [0., 0.04, 0.2])
+def test_incremental_update_matches_full_update(tmp_path: Path, nan_density: float):
+    chart = get_chart(1200, nan_density)
+    indicator_ids = get_stock_indicator_registry().list_ids()
+
+    full = create_repo(tmp_path / 'full')
+    update_stock_indicators(stock_info=chart, indicators_to_update=indicator_ids, logger=logger, repo=full)
+
+    incremental = create_repo(tmp_path / 'incremental')
+    for stop in (1000, 1020, 1200):
+        update_stock_indicators(stock_info=get_chart_until(chart, stop), indicators_to_update=indicator_ids,
+                                logger=logger, repo=incremental, incremental=True)
+
+    assert_same_indicators(incremental, full, chart.symbol, indicator_ids)
+
+
+@pytest.mark.parametrize('nan_density', [0., 0.04, 0.2])
+def test_incremental_update_only_loads_the_warmup_period(tmp_path: Path, nan_density: float):
+    chart = get_chart(2500, nan_density)
+    # (EMA200 and OBV need (nearly) the complete history)
+    indicator_ids = [indicator_id for indicator_id in get_stock_indicator_registry().list_ids()
+                     if indicator_id not in ('EMA200', 'OBV')]
+    (tmp_path / 'values').mkdir()
+    values = StockValueFileRepository(base_path=tmp_path / 'values', logger=logger)
+
+    incremental = create_repo(tmp_path / 'incremental')
+    for stop in (2000, 2020):
+        values.store(chart.symbol, get_chart_until(chart, stop))
+        if stop == 2020:
+            window = load_incremental_chart(stock_value_repo=values, stock_indicator_repo=incremental,
+                                            symbol=chart.symbol, indicators_to_update=indicator_ids)
+            assert window.get_dates()[-1] == chart.get_dates()[stop - 1] and len(window.columns) < stop
+
+        update_all_stock_indicators_for_active_stocks(logger=logger, stock_value_repo=values,
+                                                      stock_indicator_repo=incremental,
+                                                      indicators_to_update=indicator_ids, incremental=True)
+
+    full = create_repo(tmp_path / 'full')
+    update_stock_indicators(stock_info=get_chart_until(chart, 2020), indicators_to_update=indicator_ids,
+                            logger=logger, repo=full)
+
+    assert_same_indicators(incremental, full, chart.symbol, indicator_ids)
+@pytest.mark.parametrize('nan_density', [0., 0.04, 0.2])
+def test_update_from_date_matches_full_update(tmp_path: Path, nan_density: float):
+    chart = get_chart(1200, nan_density)
+    indicator_ids = get_stock_indicator_registry().list_ids()
+
+    full = create_repo(tmp_path / 'full')
+    update_stock_indicators(stock_info=chart, indicators_to_update=indicator_ids, logger=logger, repo=full)
+
+    partial = create_repo(tmp_path / 'partial')
+    update_stock_indicators(stock_info=get_chart_until(chart, 1000), indicators_to_update=indicator_ids,
+                            logger=logger, repo=partial)
+    update_stock_indicators(stock_info=chart, indicators_to_update=indicator_ids, logger=logger, repo=partial,
+                            from_date=chart.get_dates()[1000])
+
+    assert_same_indicators(partial, full, chart.symbol, indicator_ids)
+
+
+@pytest.mark.parametrize('nan_density', [0., 0.04, 0.2])
+def test_partial_cache_hit_matches_update_without_cache(tmp_path: Path, nan_density: float):
+    chart = get_chart(1200, nan_density)
+    indicator_ids = get_stock_indicator_registry().list_ids()
+    (tmp_path / 'values').mkdir()
+    values = StockValueFileRepository(base_path=tmp_path / 'values', logger=logger)
+
+    cached = create_repo(tmp_path / 'cached')
+    cache = StockIndicatorCache()
+    for stop in (1000, 1020):
+        values.store(chart.symbol, get_chart_until(chart, stop))
+        update_all_stock_indicators_for_active_stocks(logger=logger, stock_value_repo=values,
+                                                      stock_indicator_repo=cached,
+                                                      indicators_to_update=indicator_ids, cache=cache)
+    assert cache.stats.partial_hits == 1
+
+    uncached = create_repo(tmp_path / 'uncached')
+    update_all_stock_indicators_for_active_stocks(logger=logger, stock_value_repo=values,
+                                                  stock_indicator_repo=uncached, indicators_to_update=indicator_ids)
+
+    assert_same_indicators(cached, uncached, chart.symbol, indicator_ids)
+
+
+@pytest.mark.parametrize('backend', ['files', 'sqlite'])
+def test_shrunk_chart_drops_indicators_past_its_end(tmp_path: Path, backend: str):
+    chart = get_chart(1200, 0.04)
+    indicator_ids = get_stock_indicator_registry().list_ids()
+    cache = StockIndicatorCache()
+    # the shorter chart consists of the leading (unchanged) blocks of the longer one only
+    long_rows, short_rows = 16 * cache.block_size, 15 * cache.block_size
+
+    if backend == 'sqlite':
+        cached: IStockIndicatorRepository = StockIndicatorSqliteRepository(
+            database=SqliteDatabase(tmp_path / 'indicators.sqlite'), logger=logger)
+    else:
+        cached = create_repo(tmp_path / 'cached')
+
+    for name, rows in (('long', long_rows), ('short', short_rows)):
+        (tmp_path / name).mkdir()
+        values = StockValueFileRepository(base_path=tmp_path / name, logger=logger)
+        values.store(chart.symbol, get_chart_until(chart, rows))
+        update_all_stock_indicators_for_active_stocks(logger=logger, stock_value_repo=values,
+                                                      stock_indicator_repo=cached,
+                                                      indicators_to_update=indicator_ids, cache=cache)
+    assert cache.stats.misses == 2 and cache.stats.hits == 0
+
+    uncached = create_repo(tmp_path / 'uncached')
+    update_all_stock_indicators_for_active_stocks(logger=logger, stock_value_repo=values,
+                                                  stock_indicator_repo=uncached, indicators_to_update=indicator_ids)
+
+    assert_same_indicators(cached, uncached, chart.symbol, indicator_ids)
@@ -0,0 +1,50 @@
+#########################################################################
+# {Stock GPT - Prompt Templates for LLM Stock Analysis}					#
+# Copyright (C) 2023 Richard Vogel     									#
+#																		#
+# This program is free software: you can redistribute it and/or modify	#
+# it under the terms of the GNU General Public License as published by	#
+# the Free Software Foundation, either version 3 of the License, or     #
+# (at your option) any later version.									#
+#																		#
+# This program is distributed in the hope that it will be useful,		#
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 		#
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 		#
+# GNU General Public License for more details. 							#
+# #######################################################################
+# Brief: News article file repository round trips                       #
+#########################################################################
+from __future__ import annotations
+
+import datetime
+import logging
+from pathlib import Path
+
+from datatypes.news_article import NewsArticle
+from repository.news.news_article_file_repository import NewsArticleFileRepository
+
+logger = logging.getLogger(__name__)
+
+
+def get_articles(count: int, first: int = 0) -> list[NewsArticle]:
+    return [NewsArticle(title=f'Title {i}, "quoted"',
+                        source='Source',
+                        published_at=datetime.datetime(2023, 4, 10) + datetime.timedelta(minutes=i),
+                        url=f'https://example.com/{i}',
+                        summary=None if i % 7 == 0 else f'First line of {i},\nsecond line\n\nafter a blank line ' * 4)
+            for i in range(first, first + count)]
+
+
+def test_store_and_get_multi_line_summaries(tmp_path: Path):
+    repo = NewsArticleFileRepository(base_path=tmp_path, logger=logger)
+    # large enough for the parser to split the file into several blocks (within the summaries)
+    articles = get_articles(5000)
+
+    repo.store('SYM', articles)
+    assert repo.get('SYM') == articles
+
+    # storing again reads the existing archive and upserts by url
+    updated = get_articles(10, first=4995)
+    updated[0].summary = 'revised\nsummary'
+    repo.store('SYM', updated)
+    assert repo.get('SYM') == articles[:4995] + updated